@@ -1,54 +1,306 @@
-from flask import Flask, render_template, request, redirect, url_for, g, flash
-from cars.database import CarDatabase
+from flask import Flask, Response, before_render_template, template_rendered, render_template, stream_template, stream_with_context, request, redirect, url_for, g, flash, jsonify, session, make_response
+from cars.pool import ConnectionPool
+from cars.replica import ReplicaReader, replica_uri
+from cars.analytics import run_reports
+from cars.writebehind import WriteBehindQueue, WriteQueueFullError
+from cars.cache import make_cache
+from cars.catalog import Catalog
+from cars.database import StaleCarError, CarNotFoundError, ROW_FIELDS
+from cars.apiargs import (ApiRequestError, API_DEFAULT_LIMIT, API_MAX_LIMIT, decode_cursor, encode_cursor,
+                          load_env, parse_batch, parse_car_list_args, parse_changes_args)
 from cars.car import Car
+from cars import metrics
+from concurrent.futures import TimeoutError as WriteTimeoutError
 import os
-from dotenv import load_dotenv
+import atexit
+import gzip
+import hashlib
+import json
+import zlib
+import threading
+import time
+from functools import wraps
+from urllib.parse import urlencode
 
-# Load environment variables from .env file
-load_dotenv()
+# Load environment variables from the .env file next to this one, if any
+load_env(os.path.dirname(os.path.abspath(__file__)))
 
 # Create Flask app
 app = Flask(__name__)
 app.secret_key = os.getenv("SECRET_KEY", 'fallback-dev-secret-key')
+app.config['DATABASE'] = os.getenv("DATABASE", 'cars.db')
+app.config['DB_POOL_SIZE'] = int(os.getenv("DB_POOL_SIZE", 8))
+app.config['DB_POOL_TIMEOUT'] = float(os.getenv("DB_POOL_TIMEOUT", 10))
+
+# Opt-in write-behind mode: /add and the batch API queue their writes and a
+# background thread commits them in groups (see cars.writebehind)
+app.config['WRITE_BEHIND'] = os.getenv("WRITE_BEHIND", '0') == '1'
+app.config['WRITE_BEHIND_BATCH'] = int(os.getenv("WRITE_BEHIND_BATCH", 500))
+app.config['WRITE_BEHIND_DELAY_MS'] = int(os.getenv("WRITE_BEHIND_DELAY_MS", 20))
+app.config['WRITE_BEHIND_QUEUE'] = int(os.getenv("WRITE_BEHIND_QUEUE", 10000))
+app.config['WRITE_BEHIND_TIMEOUT'] = float(os.getenv("WRITE_BEHIND_TIMEOUT", 10))
+
+# Read-replica mode: when set, the read-only pages and API reads come from
+# the newest snapshot published into this directory by
+# `python -m cars.replica publish --interval N` (they may lag writes by up
+# to N seconds); writes still go to DATABASE
+app.config['READ_REPLICA_DIR'] = os.getenv("READ_REPLICA_DIR") or None
+app.config['READ_REPLICA_CHECK_INTERVAL'] = float(os.getenv("READ_REPLICA_CHECK_INTERVAL", 1))
+
+# Worker processes for /reports (cars.analytics); the page is cached per
+# generation like the others, so it is only recomputed after writes
+app.config['REPORT_WORKERS'] = int(os.getenv("REPORT_WORKERS", 1))
+
+# Performance instrumentation (cars.metrics), served at /metrics when on
+app.config['METRICS'] = os.getenv("METRICS", '0') == '1'
+app.config['SLOW_QUERY_MS'] = float(os.getenv("SLOW_QUERY_MS", 100))
+if app.config['METRICS']:
+    metrics.enable(slow_ms=app.config['SLOW_QUERY_MS'])
+
+app.config['PAGE_CACHE'] = os.getenv("PAGE_CACHE", 'memory')
+app.config['PAGE_CACHE_DIR'] = os.getenv("PAGE_CACHE_DIR", '.page_cache')
+app.config['PAGE_CACHE_SIZE'] = int(os.getenv("PAGE_CACHE_SIZE", 256))
+app.config['PAGE_CACHE_TTL'] = int(os.getenv("PAGE_CACHE_TTL", 300))
+
+# Home page pagination
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# JSON API compression
+app.config['API_GZIP_MIN_SIZE'] = 1024
+
+# Rendered pages, keyed by route + normalized parameters + data generation
+page_cache = make_cache(
+    app.config['PAGE_CACHE'],
+    directory=app.config['PAGE_CACHE_DIR'],
+    max_entries=app.config['PAGE_CACHE_SIZE'],
+    ttl=app.config['PAGE_CACHE_TTL']
+)
+
+
+# One connection pool per process. It is created on first use, so under
+# gunicorn each worker builds its own pool after the fork.
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    # Get (or create) the connection pool for the configured database
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.db_name != app.config['DATABASE']:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(
+                app.config['DATABASE'],
+                size=app.config['DB_POOL_SIZE'],
+                timeout=app.config['DB_POOL_TIMEOUT']
+            )
+        return _pool
+
+
+def close_pool():
+    # Close all pooled connections (e.g. before swapping database files),
+    # committing any queued write-behind writes first
+    global _pool, _catalog, _write_queue, _replica
+    with _pool_lock:
+        if _replica is not None:
+            _replica.close()
+            _replica = None
+        if _write_queue is not None:
+            _write_queue.close()
+            _write_queue = None
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+        if _catalog is not None:
+            _catalog.close()
+            _catalog = None
+
+
+# Write-behind queue, created on first use when WRITE_BEHIND is on
+_write_queue = None
+
+
+def get_write_queue():
+    # The shared write-behind queue, or None if the mode is off
+    global _write_queue
+    if not app.config['WRITE_BEHIND']:
+        return None
+    with _pool_lock:
+        if _write_queue is None or _write_queue.db_name != app.config['DATABASE']:
+            if _write_queue is not None:
+                _write_queue.close()
+            _write_queue = WriteBehindQueue(
+                app.config['DATABASE'],
+                max_batch=app.config['WRITE_BEHIND_BATCH'],
+                max_delay_ms=app.config['WRITE_BEHIND_DELAY_MS'],
+                max_queue=app.config['WRITE_BEHIND_QUEUE']
+            )
+        return _write_queue
+
+
+# Flush queued writes when the process exits
+atexit.register(close_pool)
+
+
+# Make/model reference catalog (filled by `python -m cars.catalog sync`)
+_catalog = None
+
+
+def get_catalog():
+    # Get (or open) the shared catalog for the configured database
+    global _catalog
+    with _pool_lock:
+        if _catalog is None or _catalog.db_name != app.config['DATABASE']:
+            if _catalog is not None:
+                _catalog.close()
+            _catalog = Catalog(app.config['DATABASE'])
+        return _catalog
+
+
+def check_catalog(brand, model):
+    # Flash a warning (the car is still saved) if the catalog has been
+    # synced and doesn't know this brand/model
+    catalog = get_catalog()
+    if catalog.is_empty():
+        return
+    result = catalog.check(brand, model)
+    if result['brand'] is None:
+        hint = f" Did you mean {', '.join(result['brand_suggestions'])}?" if result['brand_suggestions'] else ''
+        flash(f"⚠️ '{brand}' is not a known brand.{hint}", 'warning')
+    elif result['model'] is None:
+        hint = f" Did you mean {', '.join(result['model_suggestions'])}?" if result['model_suggestions'] else ''
+        flash(f"⚠️ '{model}' is not a known {result['brand']} model.{hint}", 'warning')
 
 
 def get_db():
-    # Get database connection for current request
+    # Check out a pooled database connection for the current request
     if 'db' not in g:
-        g.db = CarDatabase("cars.db")
+        g.db_pool = get_pool()
+        g.db = g.db_pool.acquire()
     return g.db
 
 
+_replica = None
+
+
+def get_read_db():
+    # Connection for read-only views: the replica when READ_REPLICA_DIR is
+    # set, otherwise the pooled primary connection
+    global _replica
+    replica_dir = app.config['READ_REPLICA_DIR']
+    if not replica_dir:
+        return get_db()
+    if 'read_db' not in g:
+        with _pool_lock:
+            if _replica is None or _replica.replica_dir != replica_dir:
+                _replica = ReplicaReader(replica_dir, app.config['READ_REPLICA_CHECK_INTERVAL'])
+        g.read_db = _replica.connection()
+    return g.read_db
+
+
 @app.teardown_appcontext
 def close_db(error):
-    # Close database connection at end of request
+    # Return the connection to the pool at end of request
     db = g.pop('db', None)
     if db is not None:
-        db.close()
+        g.pop('db_pool').release(db)
+
+
+def cached_page(view):
+    # Serve a view from page_cache. The key includes the cars generation
+    # (bumped by every write), so any add/edit/delete invalidates it.
+    # GET responses carry an ETag/Last-Modified and answer If-None-Match
+    # with 304 before touching the cache or the template. If-Modified-Since
+    # alone never gets a 304: changed_at has one-second resolution, so two
+    # writes in the same second would look unchanged; the ETag would not.
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # Pages showing flash messages (or streamed) are never cached
+        if page_cache is None or session.get('_flashes') or request.args.get('stream') == '1':
+            return view(*args, **kwargs)
+
+        generation, changed_at = get_read_db().get_generation()
+        params = request.form if request.method == 'POST' else request.args
+        query = urlencode(sorted(params.items(multi=True)))
+        key = f"{app.config['DATABASE']}|{generation}|{request.method} {request.path}?{query}"
+        etag = hashlib.sha1(key.encode()).hexdigest()[:20]
+
+        if request.method == 'GET':
+            if etag in request.if_none_match:
+                response = make_response('', 304)
+                response.set_etag(etag)
+                response.last_modified = changed_at
+                return response
+
+        body = page_cache.get(key)
+        if body is None:
+            body = view(*args, **kwargs)
+            if not isinstance(body, str):
+                return body
+            page_cache.set(key, body)
+
+        response = make_response(body)
+        if request.method == 'GET':
+            response.set_etag(etag)
+            response.last_modified = changed_at
+            response.cache_control.no_cache = True
+        return response
+    return wrapper
+
+
+@app.route('/health/cache')
+def cache_status():
+    # Page cache hit/miss/eviction counters
+    if page_cache is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(page_cache.stats(), enabled=True, backend=app.config['PAGE_CACHE']))
+
+
+@app.route('/health/pool')
+def pool_status():
+    # Connection pool metrics (checkouts, waits, size, ...)
+    return jsonify(get_pool().stats())
+
+
+@app.route('/health/writes')
+def write_queue_status():
+    # Write-behind batching metrics (or {"enabled": false})
+    write_queue = get_write_queue()
+    if write_queue is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(write_queue.stats(), enabled=True))
 
 
 @app.route('/')
+@cached_page
 def index():
-    # Home page - display all cars with statistics
-    db = get_db()
-    cars = db.get_all_cars()
-    
-    # Calculate statistics
-    total_cars = len(cars)
-    total_value = sum(car.price for _, car in cars) if cars else 0
-    avg_price = total_value / total_cars if total_cars > 0 else 0
-    newest_year = max((car.year for _, car in cars), default=0) if cars else 0
-    oldest_year = min((car.year for _, car in cars), default=0) if cars else 0
-    
-    stats = {
-        'total_cars': total_cars,
-        'total_value': total_value,
-        'avg_price': avg_price,
-        'newest_year': newest_year,
-        'oldest_year': oldest_year
+    # Home page - display one page of cars with statistics.
+    # ?after=<id> / ?before=<id> move through the inventory by id (keyset
+    # pagination), ?limit=N sets the page size and ?stream=1 streams every
+    # car from the cursor onwards instead of paging.
+    db = get_read_db()
+    stats = db.get_stats()
+    after = request.args.get('after', type=int)
+    before = request.args.get('before', type=int)
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    if request.args.get('stream') == '1':
+        # stream_template wraps the template generator in stream_with_context,
+        # so the request (and g.db) stays open while rows are pulled in batches
+        cars = db.iter_cars(after=after)
+        return stream_template('index.html', cars=cars, stats=stats, pagination=None)
+
+    cars, prev_cursor, next_cursor = db.get_page(after=after, before=before, limit=limit)
+    pagination = {
+        'limit': limit,
+        'prev': prev_cursor,
+        'next': next_cursor
     }
-    
-    return render_template('index.html', cars=cars, stats=stats)
+
+    return render_template('index.html', cars=cars, stats=stats, pagination=pagination)
 
 
 @app.route('/add', methods=['GET', 'POST'])
@@ -62,9 +314,22 @@ def add_car():
         price = float(request.form['price'])
         
         # Create and save car
-        db = get_db()
         car = Car(brand, model, year, price)
-        db.add_car(car)
+        write_queue = get_write_queue()
+        if write_queue is not None:
+            # Wait until the batch holding this car has been committed
+            try:
+                write_queue.add_car(car).result(app.config['WRITE_BEHIND_TIMEOUT'])
+            except WriteQueueFullError:
+                flash('⏳ The server is busy, please try again in a moment.', 'error')
+                return render_template('add_car.html'), 503
+            except WriteTimeoutError:
+                # Still queued: it will be committed, just not yet
+                flash(f'⏳ {brand} {model} was queued and will appear shortly.', 'warning')
+                return render_template('add_car.html'), 202
+        else:
+            get_db().add_car(car)
+        check_catalog(brand, model)
 
         flash(f'✅ {brand} {model} added successfully!', 'success')
         
@@ -95,35 +360,40 @@ def edit_car(car_id):
         model = request.form['model']
         year = int(request.form['year'])
         price = float(request.form['price'])
+        version = request.form.get('version', type=int)
 
-        # Update car in database
-        # First delete the old car
-        db.delete_car(car_id)
-        # Then add the updated car
-        car = Car(brand, model, year, price)
-        db.add_car(car)
+        # Update the car in place (keeps its ID); the version check stops
+        # us overwriting an edit made since this form was loaded
+        try:
+            updated = db.update_car(car_id, expected_version=version,
+                                    brand=brand, model=model, year=year, price=price)
+        except StaleCarError:
+            flash('⚠️ This car was changed by someone else. Please review and try again.', 'error')
+            return redirect(url_for('edit_car', car_id=car_id))
+
+        if not updated:
+            flash('❌ Car not found!', 'error')
+            return redirect(url_for('index'))
 
+        check_catalog(brand, model)
         flash(f'✏️ {brand} {model} updated successfully!', 'success')
         return redirect(url_for('index'))
-    
+
     # GET request - show form with current car data
-    all_cars = db.get_all_cars()
-    current_car = None
-    for cid, car in all_cars:
-        if cid == car_id:
-            current_car = car
-            break
-
-    if current_car is None:
+    found = db.get_car_with_version(car_id)
+
+    if found is None:
         flash('❌ Car not found!', 'error')
         return redirect(url_for('index'))
-    
-    return render_template('edit_car.html', car=current_car, car_id=car_id)
+
+    current_car, version = found
+    return render_template('edit_car.html', car=current_car, car_id=car_id, version=version)
 
 @app.route('/search', methods=['GET', 'POST'])
+@cached_page
 def search():
     # Search and filter page
-    db = get_db()
+    db = get_read_db()
     results = []
     search_performed = False
 
@@ -132,27 +402,241 @@ def search():
         search_type = request.form.get('search_type')
 
         if search_type == 'brand':
-            # Search by brand
+            # Full-text search on brand and model
             brand = request.form['brand']
-            results = db.search_by_brand(brand)
-            # Convert to same format as get_all_cars (with IDs)
-            results = [(None, car) for car in results]
+            results = db.search(brand)
 
         elif search_type == 'year':
             # Filter by year
             year = int(request.form['year'])
-            all_cars = db.get_all_cars()
-            results = [(car_id, car) for car_id, car in all_cars if car.year == year]
+            results = db.find_by_year(year)
 
         elif search_type == 'price':
             # Filter by price range
             min_price = float(request.form['min_price'])
             max_price = float(request.form['max_price'])
-            all_cars = db.get_all_cars()
-            results = [(car_id, car) for car_id, car in all_cars if min_price <= car.price <= max_price]
+            results = db.find_by_price_range(min_price, max_price)
 
     return render_template('search.html', results=results, search_performed=search_performed)
 
+@app.route('/reports')
+@cached_page
+def reports():
+    # Inventory reports: value by brand, price percentiles per model year,
+    # depreciation and vintage share
+    if app.config['READ_REPLICA_DIR']:
+        get_read_db()
+        path = os.path.join(_replica.replica_dir, _replica.current())
+        source, uri = replica_uri(path), True
+    else:
+        source, uri = app.config['DATABASE'], False
+    results = run_reports(source, workers=app.config['REPORT_WORKERS'], uri=uri)
+    return render_template('reports.html', reports=results)
+
+@app.route('/api/catalog/makes')
+def catalog_makes():
+    # Autocomplete for the brand field: prefix matches, or fuzzy
+    # suggestions when nothing starts with the text typed so far
+    q = request.args.get('q', '')
+    catalog = get_catalog()
+    matches = catalog.complete_makes(q) if q else []
+    suggestions = catalog.suggest_makes(q) if q and not matches else []
+    return jsonify({'query': q, 'matches': matches, 'suggestions': suggestions})
+
+
+@app.route('/api/catalog/models')
+def catalog_models():
+    # Autocomplete for the model field of a given make
+    make = request.args.get('make', '')
+    q = request.args.get('q', '')
+    catalog = get_catalog()
+    matches = catalog.complete_models(make, q) if make else []
+    suggestions = catalog.suggest_models(make, q) if make and q and not matches else []
+    return jsonify({'make': make, 'query': q, 'matches': matches, 'suggestions': suggestions})
+
+# ---------------------------------------------------------------------------
+# JSON REST API (/api/v1). Rows are serialized straight from SQLite tuples;
+# no Car objects are built on the read path.
+# ---------------------------------------------------------------------------
+
+@app.errorhandler(ApiRequestError)
+def api_request_error(e):
+    return jsonify({'error': str(e)}), e.status
+
+
+def wants_ndjson():
+    return (request.args.get('format') == 'ndjson'
+            or request.accept_mimetypes.best == 'application/x-ndjson')
+
+
+@app.route('/api/v1/cars', methods=['GET'])
+def api_list_cars():
+    # List cars: ?brand=&year_min=&year_max=&price_min=&price_max=
+    # &sort=[-]field&fields=a,b&limit=N&cursor=... ; format=ndjson streams
+    # every matching row as one JSON object per line
+    options = parse_car_list_args(request.args)
+    fields = options.pop('fields')
+    order_by = options['order_by']
+    # Always read the sort key and id so the next cursor can be built
+    columns = list(dict.fromkeys(fields + [order_by, 'id']))
+    after = decode_cursor(request.args['cursor'], order_by) if request.args.get('cursor') else None
+    db = get_read_db()
+
+    if wants_ndjson():
+        limit = request.args.get('limit', type=int)
+        rows = db.select_rows(columns, after=after, limit=limit, **options)
+        return ndjson_response(rows, columns, fields)
+
+    limit = request.args.get('limit', API_DEFAULT_LIMIT, type=int)
+    limit = max(1, min(limit, API_MAX_LIMIT))
+    rows = list(db.select_rows(columns, after=after, limit=limit + 1, **options))
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = dict(zip(columns, rows[-1]))
+        key = last['id'] if order_by == 'id' else [last[order_by], last['id']]
+        next_cursor = encode_cursor(key)
+
+    width = len(fields)
+    data = [dict(zip(fields, row[:width])) for row in rows]
+    return jsonify({'data': data, 'next_cursor': next_cursor})
+
+
+def ndjson_response(rows, columns, fields):
+    # Stream rows as NDJSON, gzip-compressed on the fly if accepted
+    width = len(fields)
+    compress = 'gzip' in request.headers.get('Accept-Encoding', '')
+
+    def generate():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        chunk = []
+        for row in rows:
+            chunk.append(json.dumps(dict(zip(fields, row[:width])), separators=(',', ':')))
+            if len(chunk) == 500:
+                data = ('\n'.join(chunk) + '\n').encode()
+                chunk = []
+                yield compressor.compress(data) if compressor else data
+        data = ('\n'.join(chunk) + '\n').encode() if chunk else b''
+        if compressor:
+            yield compressor.compress(data) + compressor.flush()
+        elif data:
+            yield data
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+@app.route('/api/v1/cars/<int:car_id>', methods=['GET'])
+def api_get_car(car_id):
+    fields = [field for field in request.args.get('fields', ','.join(ROW_FIELDS)).split(',') if field]
+    if not fields or any(field not in ROW_FIELDS for field in fields):
+        raise ApiRequestError('Unknown field(s)')
+    row = get_read_db().get_row(car_id, fields)
+    if row is None:
+        raise ApiRequestError(f'No car with ID {car_id}', 404)
+    return jsonify(dict(zip(fields, row)))
+
+
+@app.route('/changes', methods=['GET'])
+def api_changes():
+    # Change feed: the add/update/delete events after ?since=<seq>, oldest
+    # first. Clients apply them and ask again with the returned last_seq
+    # (while 'more' is true, straight away). Without since, only reports
+    # the current last_seq, the place to start from. The asgi.py server
+    # also pushes the same events live over SSE at /stream.
+    since, limit = parse_changes_args(request.args)
+    db = get_read_db()
+    if since is None:
+        return jsonify({'changes': [], 'last_seq': db.get_last_seq(), 'more': False})
+    rows = db.get_changes(since, limit + 1)
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return jsonify({'changes': rows, 'last_seq': rows[-1]['seq'] if rows else since, 'more': more})
+
+
+@app.route('/api/v1/cars/batch', methods=['POST'])
+def api_batch():
+    # {"create": [{car}], "update": [{"id": 1, "version": 2, ...fields}],
+    #  "delete": [ids]} -- all applied in one transaction, or none
+    creates, updates, deletes = parse_batch(request.get_json(silent=True))
+
+    try:
+        write_queue = get_write_queue()
+        if write_queue is not None:
+            future = write_queue.apply_changes(creates, updates, deletes)
+            result = future.result(app.config['WRITE_BEHIND_TIMEOUT'])
+        else:
+            result = get_db().apply_changes(creates, updates, deletes)
+    except CarNotFoundError as e:
+        raise ApiRequestError(str(e), 404)
+    except StaleCarError as e:
+        raise ApiRequestError(str(e), 409)
+    except WriteQueueFullError as e:
+        raise ApiRequestError(str(e), 503)
+    except WriteTimeoutError:
+        # Accepted but not committed yet; it may still fail (e.g. 409)
+        return jsonify({'pending': True, 'message': 'The changes were queued but not committed within '
+                        f"{app.config['WRITE_BEHIND_TIMEOUT']}s; check for them before retrying"}), 202
+    return jsonify(result)
+
+
+@app.after_request
+def compress_api_response(response):
+    # gzip JSON API responses for clients that accept it
+    if (request.path.startswith('/api/v1/') and not response.direct_passthrough
+            and not response.is_streamed and 'Content-Encoding' not in response.headers
+            and 'gzip' in request.headers.get('Accept-Encoding', '')):
+        data = response.get_data()
+        if len(data) >= app.config['API_GZIP_MIN_SIZE']:
+            response.set_data(gzip.compress(data, compresslevel=6))
+            response.headers['Content-Encoding'] = 'gzip'
+            response.vary.add('Accept-Encoding')
+    return response
+
+@app.before_request
+def start_request_timer():
+    if metrics.enabled:
+        g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_latency(response):
+    # Per-route latency histogram (time to build the response)
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        metrics.observe('cars_http_request_seconds', time.perf_counter() - started,
+                        route=route, method=request.method, status=response.status_code)
+    return response
+
+
+def start_template_timer(sender, template, context, **extra):
+    if metrics.enabled:
+        g.setdefault('template_started', {})[template.name] = time.perf_counter()
+
+
+def record_template_latency(sender, template, context, **extra):
+    started = g.get('template_started', {}).pop(template.name, None)
+    if started is not None:
+        metrics.observe('cars_template_render_seconds', time.perf_counter() - started,
+                        template=template.name)
+
+
+before_render_template.connect(start_template_timer, app)
+template_rendered.connect(record_template_latency, app)
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    # Prometheus scrape endpoint
+    if not metrics.enabled:
+        return Response('# metrics are disabled (set METRICS=1)\n', mimetype='text/plain')
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
 # Error Handler
 @app.errorhandler(404)
 def page_not_found(e):
@@ -160,6 +644,9 @@ def page_not_found(e):
 
 @app.errorhandler(500)
 def internal_server_error(e):
+    if request.path.startswith('/api/'):
+        # API clients get a JSON error, not a redirect to an HTML page
+        return jsonify({'error': 'Internal server error'}), 500
     flash('❌ Something went wrong! Please try again later.', 'error')
     return redirect(url_for('index'))
 
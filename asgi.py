@@ -0,0 +1,232 @@
+"""
+ASGI entry point for the JSON car API, backed by AsyncCarDatabase.
+
+Serves the same /api/v1/cars endpoints as app.py without tying up a thread
+per request, so a few workers can handle many concurrent clients:
+
+    uvicorn asgi:application --workers 2
+
+It also serves the change feed: GET /changes?since=N (as in app.py) and
+GET /stream, a Server-Sent Events stream of every add/update/delete, where
+each connected client is a waiting coroutine rather than a thread.
+
+The HTML pages are still served by the Flask app (app.py).
+"""
+
+import asyncio
+import json
+import os
+from urllib.parse import parse_qsl
+
+from cars.apiargs import (ApiRequestError, API_DEFAULT_LIMIT, API_MAX_LIMIT, decode_cursor,
+                          encode_cursor, load_env, parse_batch, parse_car_list_args,
+                          parse_changes_args)
+from cars.aio import AsyncCarDatabase
+from cars.changefeed import ChangeFeed
+from cars.database import CarNotFoundError, StaleCarError, ROW_FIELDS
+
+# Same .env and DATABASE setting as app.py, without importing Flask
+load_env(os.path.dirname(os.path.abspath(__file__)))
+DATABASE = os.getenv("DATABASE", 'cars.db')
+DB_READERS = 8
+# Seconds between SSE keep-alive comments on an idle stream
+STREAM_HEARTBEAT = 15
+# car_events kinds as SSE event names
+SSE_EVENTS = {'insert': 'add', 'update': 'update', 'delete': 'delete'}
+
+_db = None
+_feed = None
+
+
+def get_db():
+    # The process-wide AsyncCarDatabase, opened on first use
+    global _db
+    if _db is None:
+        _db = AsyncCarDatabase(DATABASE, readers=DB_READERS)
+    return _db
+
+
+def get_feed():
+    # The process-wide ChangeFeed shared by every /stream client
+    global _feed
+    if _feed is None:
+        _feed = ChangeFeed(get_db())
+    return _feed
+
+
+async def close_db():
+    global _db, _feed
+    if _feed is not None:
+        await _feed.close()
+        _feed = None
+    if _db is not None:
+        await _db.close()
+        _db = None
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+    if scope['path'].rstrip('/') == '/stream' and scope['method'] == 'GET':
+        await stream(scope, receive, send)
+        return
+
+    try:
+        status, payload = await dispatch(scope, receive)
+    except ApiRequestError as e:
+        status, payload = e.status, {'error': str(e)}
+    body = json.dumps(payload).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            get_db()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await close_db()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def dispatch(scope, receive):
+    # Route a request; returns (status, JSON payload)
+    method, path = scope['method'], scope['path'].rstrip('/')
+    args = dict(parse_qsl(scope.get('query_string', b'').decode()))
+    if path == '/api/v1/cars' and method == 'GET':
+        return 200, await list_cars(args)
+    if path == '/changes' and method == 'GET':
+        return 200, await changes(args)
+    if path == '/api/v1/cars/batch' and method == 'POST':
+        return 200, await batch(await read_json(receive))
+    if path.startswith('/api/v1/cars/') and method == 'GET':
+        car_id = path.rsplit('/', 1)[1]
+        if car_id.isdigit():
+            return 200, await get_car(int(car_id), args)
+    raise ApiRequestError('Not found', 404)
+
+
+async def read_json(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    try:
+        return json.loads(body)
+    except ValueError:
+        raise ApiRequestError('Expected a JSON object')
+
+
+async def list_cars(args):
+    # Same parameters and response as GET /api/v1/cars in app.py (no NDJSON)
+    options = parse_car_list_args(args)
+    fields = options.pop('fields')
+    order_by = options['order_by']
+    columns = list(dict.fromkeys(fields + [order_by, 'id']))
+    after = decode_cursor(args['cursor'], order_by) if args.get('cursor') else None
+    try:
+        limit = int(args.get('limit', API_DEFAULT_LIMIT))
+    except ValueError:
+        limit = API_DEFAULT_LIMIT
+    limit = max(1, min(limit, API_MAX_LIMIT))
+
+    rows = await get_db().select_rows(columns, after=after, limit=limit + 1, **options)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = dict(zip(columns, rows[-1]))
+        key = last['id'] if order_by == 'id' else [last[order_by], last['id']]
+        next_cursor = encode_cursor(key)
+    width = len(fields)
+    return {'data': [dict(zip(fields, row[:width])) for row in rows], 'next_cursor': next_cursor}
+
+
+async def get_car(car_id, args):
+    fields = [field for field in args.get('fields', ','.join(ROW_FIELDS)).split(',') if field]
+    if not fields or any(field not in ROW_FIELDS for field in fields):
+        raise ApiRequestError('Unknown field(s)')
+    row = await get_db().get_row(car_id, fields)
+    if row is None:
+        raise ApiRequestError(f'No car with ID {car_id}', 404)
+    return dict(zip(fields, row))
+
+
+async def batch(body):
+    # Same body and response as POST /api/v1/cars/batch in app.py.
+    # Batches posted concurrently are committed together by the writer.
+    creates, updates, deletes = parse_batch(body)
+    try:
+        return await get_db().apply_changes(creates, updates, deletes)
+    except CarNotFoundError as e:
+        raise ApiRequestError(str(e), 404)
+    except StaleCarError as e:
+        raise ApiRequestError(str(e), 409)
+
+
+async def changes(args):
+    # Same parameters and response as GET /changes in app.py
+    since, limit = parse_changes_args(args)
+    if since is None:
+        return {'changes': [], 'last_seq': await get_db().get_last_seq(), 'more': False}
+    rows = await get_db().get_changes(since, limit + 1)
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {'changes': rows, 'last_seq': rows[-1]['seq'] if rows else since, 'more': more}
+
+
+async def stream(scope, receive, send):
+    # Server-Sent Events: one "add"/"update"/"delete" event per change,
+    # with the change's seq as the event id. Starts after ?since=N, the
+    # Last-Event-ID header of a reconnecting EventSource, or else now.
+    args = dict(parse_qsl(scope.get('query_string', b'').decode()))
+    headers = dict(scope.get('headers', []))
+    since = args.get('since') or headers.get(b'last-event-id', b'').decode()
+    feed = get_feed()
+    since = int(since) if since.isdigit() else await feed.last_seq()
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', b'text/event-stream'),
+                    (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no')],
+    })
+    pump = asyncio.ensure_future(send_changes(feed, since, send))
+    try:
+        # Runs until the client goes away
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+    finally:
+        pump.cancel()
+        try:
+            await pump
+        except (asyncio.CancelledError, OSError):
+            pass
+
+
+async def send_changes(feed, since, send):
+    await send({'type': 'http.response.body', 'body': b': connected\n\n', 'more_body': True})
+    while True:
+        rows = await feed.wait(since, timeout=STREAM_HEARTBEAT)
+        if not rows:
+            body = b': keep-alive\n\n'
+        else:
+            body = ''.join(
+                f"id: {row['seq']}\nevent: {SSE_EVENTS[row['kind']]}\ndata: {json.dumps(row)}\n\n"
+                for row in rows
+            ).encode()
+            since = rows[-1]['seq']
+        await send({'type': 'http.response.body', 'body': body, 'more_body': True})
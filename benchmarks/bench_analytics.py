@@ -0,0 +1,66 @@
+"""
+Benchmark: inventory reports, one Python loop vs. cars.analytics
+
+The baseline computes the same reports the old way: loop over
+get_all_cars() building Car objects, keeping every price per model year to
+take percentiles. cars.analytics runs with 1, 2, 4, ... worker processes.
+
+Usage: python benchmarks/bench_analytics.py [size ...]   e.g. 1M 10M
+"""
+
+import math
+import os
+import sys
+import tempfile
+
+from common import timed
+from datagen import parse_size, size_label, write_dataset
+from cars.analytics import PERCENTILES, run_reports
+from cars.database import CarDatabase
+
+
+def python_loop(path):
+    db = CarDatabase(path, create_schema=False)
+    brands, prices_by_year, by_age = {}, {}, {}
+    vintage = 0
+    for _, car in db.get_all_cars():
+        value = brands.setdefault(car.brand, [0, 0.0])
+        value[0] += 1
+        value[1] += car.price
+        prices_by_year.setdefault(car.year, []).append(car.price)
+        point = by_age.setdefault(car.get_age(), [0, 0.0])
+        point[0] += 1
+        point[1] += car.price
+        vintage += car.is_vintage()
+    for prices in prices_by_year.values():
+        prices.sort()
+        [prices[max(1, math.ceil(p / 100 * len(prices))) - 1] for p in PERCENTILES]
+    db.close()
+
+
+def worker_counts():
+    counts, workers = [], 1
+    while workers <= (os.cpu_count() or 1):
+        counts.append(workers)
+        workers *= 2
+    return counts
+
+
+def run(sizes):
+    counts = worker_counts()
+    header = "".join(f"{f'{n} worker(s)':>13}" for n in counts)
+    print(f"{'cars':>6} | {'python loop':>11} |{header}   (ms)")
+    print("-" * (25 + 13 * len(counts)))
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, f"cars-{size}.db")
+            write_dataset(size, path)
+            baseline = timed(lambda: python_loop(path), repeat=1)
+            cells = "".join(f"{timed(lambda: run_reports(path, workers=n), repeat=3):>13,.0f}"
+                            for n in counts)
+            print(f"{size_label(size):>6} | {baseline:>11,.0f} |{cells}")
+
+
+if __name__ == "__main__":
+    sizes = [parse_size(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    run(sizes)
@@ -0,0 +1,144 @@
+"""
+Load test: sync Flask API on a fixed worker pool vs. the ASGI app on
+AsyncCarDatabase, under many concurrent clients.
+
+Each client sends requests back to back: mostly list/detail reads and some
+single-car batch creates. The sync path runs every request on one of
+`workers` threads (like a threaded WSGI server); the async path runs them all
+on one event loop. Reports requests/sec and p50/p99 latency.
+
+Usage: python benchmarks/bench_async.py [clients ...]
+"""
+
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import random_cars
+from cars.database import CarDatabase
+
+ROWS = 50_000
+REQUESTS_PER_CLIENT = 50
+WORKERS = 8
+WRITE_SHARE = 0.1
+
+
+def make_requests(count, seed):
+    # (method, path, query, body) tuples
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < WRITE_SHARE:
+            car = {"brand": "Bench", "model": "Load", "year": 2024, "price": 1000.0}
+            requests.append(("POST", "/api/v1/cars/batch", "", json.dumps({"create": [car]})))
+        elif roll < 0.5:
+            requests.append(("GET", f"/api/v1/cars/{rng.randint(1, ROWS)}", "", None))
+        else:
+            year = rng.randint(1960, 2020)
+            requests.append(("GET", "/api/v1/cars", f"year_min={year}&year_max={year + 5}&limit=20", None))
+    return requests
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run_sync(client_count, workers):
+    from app import app
+    client = app.test_client()
+
+    def handle(method, path, query, body):
+        url = f"{path}?{query}" if query else path
+        if method == "GET":
+            response = client.get(url)
+        else:
+            response = client.post(url, data=body, content_type="application/json")
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    loop = asyncio.get_running_loop()
+    latencies = []
+    with ThreadPoolExecutor(max_workers=workers) as server:
+        async def client_loop(seed):
+            for request in make_requests(REQUESTS_PER_CLIENT, seed):
+                start = time.perf_counter()
+                await loop.run_in_executor(server, handle, *request)
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(seed) for seed in range(client_count)))
+        elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+async def run_async(client_count, db_name):
+    import asgi
+    asgi.DATABASE = db_name
+
+    async def handle(method, path, query, body):
+        sent = []
+        body_bytes = body.encode() if body else b""
+
+        async def receive():
+            return {"type": "http.request", "body": body_bytes, "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": method, "path": path, "query_string": query.encode()}
+        await asgi.application(scope, receive, send)
+        assert sent[0]["status"] == 200, sent[1]["body"]
+
+    latencies = []
+
+    async def client_loop(seed):
+        for request in make_requests(REQUESTS_PER_CLIENT, seed):
+            start = time.perf_counter()
+            await handle(*request)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop(seed) for seed in range(client_count)))
+    elapsed = time.perf_counter() - start
+    stats = asgi.get_db().stats()
+    await asgi.close_db()
+    return latencies, elapsed, stats
+
+
+def report(name, clients, latencies, elapsed, extra=""):
+    print(f"{clients:>8} | {name:<22} | {len(latencies) / elapsed:>9,.0f} | "
+          f"{percentile(latencies, 0.5) * 1000:>8.2f} | {percentile(latencies, 0.99) * 1000:>8.2f} {extra}")
+
+
+def main(client_counts):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench.db")
+        db = CarDatabase(db_name)
+        db.enable_wal()
+        db.add_cars(random_cars(ROWS))
+        db.close()
+
+        from app import app, close_pool
+        app.config["DATABASE"] = db_name
+        app.config["DB_POOL_SIZE"] = WORKERS
+
+        print(f"{'clients':>8} | {'path':<22} | {'req/sec':>9} | {'p50 ms':>8} | {'p99 ms':>8}")
+        print("-" * 68)
+        for clients in client_counts:
+            latencies, elapsed = asyncio.run(run_sync(clients, WORKERS))
+            report(f"sync, {WORKERS} threads", clients, latencies, elapsed)
+            latencies, elapsed, stats = asyncio.run(run_async(clients, db_name))
+            report("async (ASGI)", clients, latencies, elapsed,
+                   f"(write batches avg {stats['avg_batch']}, max {stats['largest_batch']})")
+        close_pool()
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [10, 100, 500]
+    main(counts)
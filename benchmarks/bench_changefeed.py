@@ -0,0 +1,93 @@
+"""
+Benchmark: fan-out latency of the SSE change feed vs. polling "/"
+
+N clients hold /stream open on the ASGI app (coroutines, no threads). One
+write is made and the time until every client has received its event is
+measured. For comparison, the cost of the same N clients each re-rendering
+the home page once (what the showroom screens did every few seconds).
+
+Usage: python benchmarks/bench_changefeed.py [clients ...]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from common import random_cars
+from cars.car import Car
+from cars.database import CarDatabase
+
+ROWS = 10_000
+
+
+async def listen(asgi, received, disconnect):
+    async def receive():
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if b"event: add" in message.get("body", b""):
+            received.append(time.perf_counter())
+
+    scope = {"type": "http", "method": "GET", "path": "/stream", "query_string": b"", "headers": []}
+    await asgi.application(scope, receive, send)
+
+
+async def fan_out(asgi, clients):
+    feed = asgi.get_feed()
+    feed.poll_interval = 0.05
+    await feed.last_seq()
+    disconnect = asyncio.Event()
+    received = []
+    tasks = [asyncio.ensure_future(listen(asgi, received, disconnect)) for _ in range(clients)]
+    while feed.waiting < clients:
+        await asyncio.sleep(0.01)
+    threads = threading.active_count()
+    start = time.perf_counter()
+    await asgi.get_db().add_car(Car("Bench", "Stream", 2024, 10000))
+    while len(received) < clients:
+        await asyncio.sleep(0.001)
+    elapsed = max(received) - start
+    disconnect.set()
+    await asyncio.gather(*tasks)
+    return elapsed * 1000, threads
+
+
+def poll_pages(client, clients):
+    start = time.perf_counter()
+    for _ in range(clients):
+        client.get("/")
+    return (time.perf_counter() - start) * 1000
+
+
+def run(counts):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cars.db")
+        db = CarDatabase(path)
+        db.enable_wal()
+        db.add_cars(random_cars(ROWS))
+        db.close()
+
+        from app import app, page_cache
+        import asgi
+        app.config['DATABASE'] = path
+        asgi.DATABASE = path
+        client = app.test_client()
+
+        print(f"{'clients':>8} | {'SSE fan-out ms':>14} | {'threads':>7} | {'poll / once ms':>14}")
+        print("-" * 54)
+        for clients in counts:
+            latency, threads = asyncio.run(fan_out(asgi, clients))
+            asyncio.run(asgi.close_db())
+            if page_cache is not None:
+                page_cache.clear()
+            polled = poll_pages(client, clients)
+            print(f"{clients:>8,} | {latency:>14,.1f} | {threads:>7} | {polled:>14,.1f}")
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [10, 100, 1000]
+    run(counts)
@@ -0,0 +1,72 @@
+"""
+Benchmark: indexed Inventory vs. a plain list scan
+
+Usage: python benchmarks/bench_inventory.py [cars ...]
+"""
+
+import sys
+import time
+
+from common import random_cars, timed
+from cars.inventory import Inventory
+
+
+def scan_brand(cars, brand):
+    # The old find_by_brand: lower-case both sides for every car
+    return [car for car in cars if car.brand.lower() == brand.lower()]
+
+
+def scan_find(cars, brand, year_range, price_range):
+    brand = brand.lower()
+    return [car for car in cars
+            if car.brand.lower() == brand
+            and year_range[0] <= car.year <= year_range[1]
+            and price_range[0] <= car.price <= price_range[1]]
+
+
+def run(sizes):
+    print(f"{'cars':>10} | {'operation':<28} | {'list scan':>10} | {'indexed':>10}")
+    print("-" * 68)
+    for size in sizes:
+        cars = list(random_cars(size))
+        inv = Inventory()
+        start = time.perf_counter()
+        for car in cars:
+            inv.add_car(car)
+        inv.find(year_range=(2000, 2000))  # first range query sorts the indexes
+        build_ms = (time.perf_counter() - start) * 1000
+
+        cases = (
+            ("brand = bmw",
+             lambda: scan_brand(cars, "bmw"),
+             lambda: inv.find_by_brand("bmw")),
+            ("year 2001..2002",
+             lambda: [c for c in cars if 2001 <= c.year <= 2002],
+             lambda: inv.find(year_range=(2001, 2002))),
+            ("price 49,000..50,000",
+             lambda: [c for c in cars if 49000 <= c.price <= 50000],
+             lambda: inv.find(price_range=(49000, 50000))),
+            ("bmw + 2001..2010 + <20k",
+             lambda: scan_find(cars, "bmw", (2001, 2010), (0, 20000)),
+             lambda: inv.find("bmw", (2001, 2010), (0, 20000))),
+        )
+        print(f"{size:>10,} | {'build (add + sort)':<28} | {'':>10} | {build_ms:>10.2f}")
+        for name, scan, indexed in cases:
+            print(f"{size:>10,} | {name:<28} | {timed(scan, 3):>10.2f} | {timed(indexed, 3):>10.2f}")
+
+        # Removing by position from a list vs. by id
+        ids = list(range(1, min(size, 1000) + 1))
+        start = time.perf_counter()
+        for car_id in ids:
+            inv.remove(car_id)
+        remove_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        for _ in ids:
+            cars.pop(0)
+        pop_ms = (time.perf_counter() - start) * 1000
+        print(f"{size:>10,} | {f'remove {len(ids)} cars':<28} | {pop_ms:>10.2f} | {remove_ms:>10.2f}  (ms)")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    run(sizes)
@@ -0,0 +1,64 @@
+"""
+Benchmark: memory held by a query result in different layouts
+  - list of (id, Car) tuples with a __dict__-based Car (the old layout)
+  - list of (id, Car) tuples with the slotted Car
+  - columnar CarBatch
+
+Usage: python benchmarks/bench_memory.py [rows ...]
+"""
+
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from common import random_cars
+from cars.database import CarDatabase
+
+
+class DictCar:
+    # The pre-__slots__ Car layout, for comparison
+    def __init__(self, brand, model, year, price):
+        self.brand = brand
+        self.model = model
+        self.year = year
+        self.price = price
+
+
+def measure(build):
+    # Bytes still allocated by the result of build()
+    tracemalloc.start()
+    result = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, peak
+
+
+def dict_cars(db):
+    db.cursor.execute('SELECT id, brand, model, year, price FROM cars')
+    return [(row[0], DictCar(row[1], row[2], row[3], row[4])) for row in db.cursor.fetchall()]
+
+
+def run(sizes):
+    print(f"{'rows':>10} | {'layout':<22} | {'held MB':>8} | {'peak MB':>8} | {'bytes/row':>9}")
+    print("-" * 70)
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = CarDatabase(os.path.join(tmp, "bench.db"))
+            db.add_cars(random_cars(rows), batch_size=10_000)
+            layouts = (
+                ("tuples + dict Car", lambda: dict_cars(db)),
+                ("tuples + slotted Car", lambda: db.get_all_cars()),
+                ("CarBatch (columnar)", lambda: db.get_all_cars(as_batch=True)),
+            )
+            for name, build in layouts:
+                current, peak = measure(build)
+                print(f"{rows:>10,} | {name:<22} | {current / 1e6:>8.1f} | "
+                      f"{peak / 1e6:>8.1f} | {current / rows:>9.0f}")
+            db.close()
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    run(sizes)
@@ -0,0 +1,49 @@
+"""
+Benchmark: cost of cars.metrics instrumentation on common queries
+
+Usage: python benchmarks/bench_metrics.py [rows ...]
+"""
+
+import os
+import sys
+import tempfile
+
+from common import random_cars, timed
+from cars import metrics
+from cars.database import CarDatabase
+
+
+def workload(db, rows):
+    for car_id in range(1, 1001):
+        db.get_car(car_id % rows + 1)
+    db.query(year_range=(2000, 2005), limit=100)
+    list(db.select_rows(["id", "price"], limit=1000))
+
+
+def run(sizes):
+    print(f"{'rows':>10} | {'disabled ms':>11} | {'enabled ms':>10} | {'overhead':>8}")
+    print("-" * 50)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, f"bench-{size}.db")
+            db = CarDatabase(path)
+            db.add_cars(random_cars(size))
+            db.close()
+
+            metrics.disable()
+            db = CarDatabase(path)
+            off = timed(lambda: workload(db, size))
+            db.close()
+
+            metrics.enable(slow_ms=1000)
+            db = CarDatabase(path)
+            on = timed(lambda: workload(db, size))
+            db.close()
+            metrics.disable()
+            metrics.reset()
+            print(f"{size:>10,} | {off:>11.2f} | {on:>10.2f} | {(on / off - 1) * 100:>7.1f}%")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    run(sizes)
@@ -0,0 +1,48 @@
+"""
+Benchmark: year / price filters in SQL vs. scanning get_all_cars()
+Shows that indexed query latency stays flat as the table grows.
+
+Usage: python benchmarks/bench_query.py [rows ...]
+"""
+
+import os
+import sys
+import tempfile
+
+from common import random_cars, timed
+from cars.database import CarDatabase
+
+
+def scan_year(db, year):
+    return [(i, c) for i, c in db.get_all_cars() if c.year == year]
+
+
+def scan_price(db, lo, hi):
+    return [(i, c) for i, c in db.get_all_cars() if lo <= c.price <= hi]
+
+
+def run(sizes):
+    print(f"{'rows':>10} | {'scan year':>10} | {'sql year':>9} | "
+          f"{'scan price':>10} | {'sql price':>9} | {'brand+year':>10}")
+    print("-" * 74)
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = CarDatabase(os.path.join(tmp, "bench.db"))
+            db.add_cars(random_cars(rows), batch_size=10_000)
+            lo, hi = 49000.0, 50000.0
+            results = (
+                timed(lambda: scan_year(db, 2001), repeat=2),
+                timed(lambda: db.find_by_year(2001)),
+                timed(lambda: scan_price(db, lo, hi), repeat=2),
+                timed(lambda: db.find_by_price_range(lo, hi)),
+                timed(lambda: db.query(brand="bmw", year_range=(2001, 2001))),
+            )
+            db.close()
+        print(f"{rows:>10,} | " + " | ".join(
+            f"{ms:>{w}.2f}" for ms, w in zip(results, (10, 9, 10, 9, 10))
+        ) + "  (ms)")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    run(sizes)
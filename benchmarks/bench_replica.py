@@ -0,0 +1,100 @@
+"""
+Benchmark: read throughput vs. worker processes, primary vs. read replica
+
+Worker processes run a read mix (point lookups, a page, a brand search) for a
+few seconds while one writer process keeps inserting into the primary. The
+"primary" rows read the live database (WAL mode); the "replica" rows read an
+immutable snapshot published with cars.replica.
+
+Usage: python benchmarks/bench_replica.py [workers ...]
+"""
+
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+from common import random_cars
+from cars.car import Car
+from cars.database import CarDatabase
+from cars.replica import ReplicaReader, publish
+
+ROWS = 100_000
+DURATION = 3.0
+
+
+def read_mix(db, rng):
+    for _ in range(20):
+        db.get_car(rng.randint(1, ROWS))
+    db.get_page(after=rng.randint(1, ROWS - 100), limit=50)
+    db.query(brand="bmw", year_range=(2000, 2005), limit=50)
+
+
+def reader(target, start_at, results):
+    # target: ("primary", db path) or ("replica", replica dir)
+    kind, path = target
+    if kind == "primary":
+        db = CarDatabase(path, create_schema=False)
+    else:
+        db = ReplicaReader(path).connection()
+    rng = random.Random(os.getpid())
+    while time.time() < start_at:
+        time.sleep(0.001)
+    deadline = start_at + DURATION
+    rounds = 0
+    while time.time() < deadline:
+        read_mix(db, rng)
+        rounds += 1
+    results.put(rounds)
+
+
+def writer(path, stop):
+    db = CarDatabase(path, create_schema=False)
+    car = Car("Bench", "Writer", 2024, 10000.0)
+    while not stop.is_set():
+        db.cursor.execute('INSERT INTO cars (brand, model, year, price) VALUES (?, ?, ?, ?)',
+                          (car.brand, car.model, car.year, car.price))
+        db.conn.commit()
+
+
+def measure(target, workers, db_path):
+    results = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    write_process = multiprocessing.Process(target=writer, args=(db_path, stop))
+    write_process.start()
+    start_at = time.time() + 0.5
+    processes = [multiprocessing.Process(target=reader, args=(target, start_at, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    rounds = sum(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    stop.set()
+    write_process.join()
+    return rounds / DURATION
+
+
+def run(worker_counts):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "primary.db")
+        replica_dir = os.path.join(tmp, "replica")
+        db = CarDatabase(db_path)
+        db.enable_wal()
+        db.add_cars(random_cars(ROWS))
+        db.close()
+        publish(db_path, replica_dir)
+
+        print(f"{'workers':>8} | {'primary mix/s':>14} | {'replica mix/s':>14} | {'speedup':>8}")
+        print("-" * 54)
+        for workers in worker_counts:
+            primary = measure(("primary", db_path), workers, db_path)
+            replica = measure(("replica", replica_dir), workers, db_path)
+            print(f"{workers:>8} | {primary:>14,.0f} | {replica:>14,.0f} | {replica / primary:>7.2f}x")
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [1, 2, 4, 8]
+    run(counts)
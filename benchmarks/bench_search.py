@@ -0,0 +1,35 @@
+"""
+Benchmark: FTS5 search() vs. the LIKE '%brand%' scan in search_by_brand()
+
+Usage: python benchmarks/bench_search.py [rows ...]
+"""
+
+import os
+import sys
+import tempfile
+
+from common import random_cars, timed
+from cars.database import CarDatabase
+
+QUERIES = ["bmw", "tesla model", "cx"]
+
+
+def run(sizes):
+    print(f"{'rows':>10} | {'query':<12} | {'LIKE':>9} | {'FTS5':>9} | {'FTS5 top 50':>11}")
+    print("-" * 64)
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = CarDatabase(os.path.join(tmp, "bench.db"))
+            db.add_cars(random_cars(rows), batch_size=10_000)
+            for text in QUERIES:
+                like_ms = timed(lambda: db.search_by_brand(text), repeat=3)
+                fts_ms = timed(lambda: db.search(text), repeat=3)
+                top_ms = timed(lambda: db.search(text, limit=50))
+                print(f"{rows:>10,} | {text:<12} | {like_ms:>9.2f} | "
+                      f"{fts_ms:>9.2f} | {top_ms:>11.2f}  (ms)")
+            db.close()
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    run(sizes)
@@ -0,0 +1,58 @@
+"""
+Benchmark: Inventory startup from JSON vs. a memory-mapped snapshot
+
+Usage: python benchmarks/bench_snapshot.py [cars ...]
+"""
+
+import os
+import sys
+import tempfile
+
+from common import random_cars, timed
+from cars.inventory import Inventory
+
+
+def quiet(func):
+    # Inventory prints on load/save; keep the table readable
+    def run():
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+        try:
+            return func()
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+    return run
+
+
+def open_and_sum(path):
+    # Open the snapshot and aggregate a column without building any Car
+    with Inventory.open_snapshot(path, verify=False) as snap:
+        return sum(snap.prices)
+
+
+def run(sizes):
+    print(f"{'cars':>10} | {'json load':>10} | {'snap load':>10} | {'snap open':>10} | {'open+sum':>10} | {'json MB':>8} | {'snap MB':>8}")
+    print("-" * 86)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "cars.json")
+        snap_path = os.path.join(tmp, "cars.snap")
+        for size in sizes:
+            inv = Inventory()
+            for car in random_cars(size):
+                inv.add_car(car)
+            quiet(lambda: inv.save_to_file(json_path))()
+            quiet(lambda: inv.save_snapshot(snap_path))()
+
+            json_ms = timed(quiet(lambda: Inventory().load_from_file(json_path)), 3)
+            snap_ms = timed(quiet(lambda: Inventory().load_snapshot(snap_path)), 3)
+            open_ms = timed(lambda: Inventory.open_snapshot(snap_path).close(), 3)
+            sum_ms = timed(lambda: open_and_sum(snap_path), 3)
+            json_mb = os.path.getsize(json_path) / 1e6
+            snap_mb = os.path.getsize(snap_path) / 1e6
+            print(f"{size:>10,} | {json_ms:>10.2f} | {snap_ms:>10.2f} | {open_ms:>10.2f} | {sum_ms:>10.2f} | {json_mb:>8.1f} | {snap_mb:>8.1f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    run(sizes)
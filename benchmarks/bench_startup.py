@@ -0,0 +1,72 @@
+"""
+Benchmark: import time of the entry points used by scripts and cron jobs
+
+Each target is imported in a fresh interpreter under `python -X importtime`
+and the cumulative time of its top-level module is reported (best of N).
+With --check, exits 1 if a target is over its budget or imports a module
+that should only load once a command runs (sqlite3, Flask, ...).
+
+Usage: python benchmarks/bench_startup.py [--repeat N] [--check]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (module, budget ms). Budgets are generous so a slow CI box still passes;
+# pulling Flask or sqlite3 back into one of these blows straight through.
+TARGETS = [
+    ("cars", 15),
+    ("cars.car", 25),
+    ("cars.cli", 40),
+    ("main", 50),
+    ("asgi", 150),
+]
+# Modules only loaded once a command actually opens a database
+DEFERRED = ("sqlite3", "cars.database", "cars.catalog", "flask")
+
+
+def import_time(module):
+    # Cumulative import time of `module` in ms, and every module it loaded
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    loaded = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            loaded[name.strip()] = int(cumulative) / 1000
+    return loaded[module], loaded
+
+
+def run(repeat, check):
+    print(f"{'module':<10} | {'import ms':>9} | {'budget ms':>9} | {'modules':>7}")
+    print("-" * 46)
+    over = []
+    for module, budget in TARGETS:
+        best, loaded = min(import_time(module) for _ in range(repeat))
+        flag = "  OVER" if best > budget else ""
+        eager = [name for name in DEFERRED if name in loaded] if module != "asgi" else []
+        if eager:
+            flag += f"  loads {', '.join(eager)}"
+        print(f"{module:<10} | {best:>9.1f} | {budget:>9} | {len(loaded):>7}{flag}")
+        if flag:
+            over.append(module)
+    if check and over:
+        print(f"Over budget: {', '.join(over)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--check", action="store_true", help="exit 1 if any target is over budget")
+    args = parser.parse_args()
+    sys.exit(run(args.repeat, args.check))
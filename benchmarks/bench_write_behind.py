@@ -0,0 +1,100 @@
+"""
+Benchmark: concurrent inserts, one commit each vs. the write-behind queue
+
+Several "feeds" (threads) insert cars at the same time. The baseline gives
+each thread its own connection and commits every add_car, as /add does; the
+write-behind runs push through one WriteBehindQueue with different batch
+sizes and wait for every future.
+
+Usage: python benchmarks/bench_write_behind.py [cars_per_feed ...]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from common import random_cars
+from cars.database import CarDatabase
+from cars.writebehind import WriteBehindQueue
+
+FEEDS = 8
+BATCH_SIZES = (1, 10, 100, 1000)
+
+
+def fresh_db(directory, name):
+    path = os.path.join(directory, name)
+    db = CarDatabase(path)
+    db.enable_wal()
+    db.close()
+    return path
+
+
+def run_feeds(cars_per_feed, target):
+    # Run target(cars) on FEEDS threads; returns (seconds, errors)
+    errors = []
+    threads = []
+    for feed in range(FEEDS):
+        cars = list(random_cars(cars_per_feed, seed=feed))
+
+        def work(cars=cars):
+            try:
+                target(cars)
+            except Exception as e:
+                errors.append(e)
+        threads.append(threading.Thread(target=work))
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, errors
+
+
+def commit_each(path):
+    def target(cars):
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for car in cars:
+            conn.execute("INSERT INTO cars (brand, model, year, price) VALUES (?, ?, ?, ?)",
+                         (car.brand, car.model, car.year, car.price))
+            conn.commit()
+        conn.close()
+    return target
+
+
+def queued(writes):
+    def target(cars):
+        futures = [writes.add_car(car) for car in cars]
+        for future in futures:
+            future.result()
+    return target
+
+
+def run(sizes):
+    print(f"{'feeds x cars':>13} | {'mode':<24} | {'rows/sec':>10} | {'commits':>8} | {'avg batch':>9}")
+    print("-" * 76)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            label = f"{FEEDS} x {size:,}"
+            path = fresh_db(tmp, f"each-{size}.db")
+            elapsed, errors = run_feeds(size, commit_each(path))
+            note = f"  ({len(errors)} feeds failed: {errors[0]})" if errors else ""
+            print(f"{label:>13} | {'commit per insert':<24} | {FEEDS * size / elapsed:>10,.0f} | {FEEDS * size:>8,} | {1:>9}{note}")
+
+            for batch_size in BATCH_SIZES:
+                path = fresh_db(tmp, f"queue-{size}-{batch_size}.db")
+                writes = WriteBehindQueue(path, max_batch=batch_size, max_delay_ms=20)
+                elapsed, errors = run_feeds(size, queued(writes))
+                writes.close()
+                stats = writes.stats()
+                note = f"  ({len(errors)} feeds failed)" if errors else ""
+                print(f"{label:>13} | {f'write-behind, batch {batch_size}':<24} | {FEEDS * size / elapsed:>10,.0f} | "
+                      f"{stats['batches']:>8,} | {stats['avg_batch']:>9}{note}")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000]
+    run(sizes)
@@ -0,0 +1,44 @@
+"""
+Shared helpers for the benchmark scripts
+"""
+
+import os
+import random
+import sys
+import time
+
+# Make the project importable when a benchmark is run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cars.car import Car
+
+MODELS_BY_BRAND = {
+    "Toyota": ["Camry", "Corolla", "RAV4", "Highlander", "Tacoma"],
+    "Honda": ["Civic", "Accord", "CR-V", "Pilot", "Fit"],
+    "Ford": ["Mustang", "F-150", "Focus", "Explorer", "Escape"],
+    "BMW": ["M3", "X5", "X3", "330i", "i4"],
+    "Audi": ["A4", "A6", "Q5", "Q7", "TT"],
+    "Tesla": ["Model 3", "Model S", "Model X", "Model Y"],
+    "Kia": ["Rio", "Soul", "Sportage", "Sorento"],
+    "Mazda": ["Mazda3", "CX-5", "MX-5 Miata", "CX-9"],
+}
+BRANDS = list(MODELS_BY_BRAND)
+
+
+def random_cars(rows, seed=42):
+    # Yield `rows` random Car objects, reproducible for a given seed
+    rng = random.Random(seed)
+    for _ in range(rows):
+        brand = rng.choice(BRANDS)
+        yield Car(brand, rng.choice(MODELS_BY_BRAND[brand]),
+                  rng.randint(1960, 2025), round(rng.uniform(2000, 150000), 2))
+
+
+def timed(func, repeat=5):
+    # Best-of-N wall time in milliseconds
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
@@ -0,0 +1,131 @@
+"""
+Seeded generator of realistic car inventories for benchmarks
+
+Brands follow rough US market shares, models within a brand a Zipf-like
+popularity curve, years skew towards recent model years with a long tail of
+classics, and prices depend on brand, age and mileage-style noise
+(log-normal), with collectible cars appreciating instead of depreciating.
+The same seed always produces the same cars.
+
+Usage: python benchmarks/datagen.py SIZE OUTPUT [--seed N]
+       e.g. python benchmarks/datagen.py 100k cars.ndjson
+            python benchmarks/datagen.py 1M cars.db
+"""
+
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cars.car import Car
+
+# brand: (market share weight, typical new price, models by popularity)
+BRANDS = {
+    "Toyota": (14.0, 32000, ["Camry", "RAV4", "Corolla", "Tacoma", "Highlander", "Tundra", "Prius", "4Runner", "Sienna"]),
+    "Ford": (12.0, 38000, ["F-150", "Explorer", "Escape", "Mustang", "Ranger", "Bronco", "Edge", "Focus"]),
+    "Chevrolet": (10.0, 36000, ["Silverado", "Equinox", "Malibu", "Tahoe", "Traverse", "Camaro", "Colorado", "Corvette"]),
+    "Honda": (9.0, 30000, ["Civic", "CR-V", "Accord", "Pilot", "HR-V", "Odyssey", "Fit"]),
+    "Nissan": (7.0, 29000, ["Rogue", "Altima", "Sentra", "Frontier", "Pathfinder", "Murano", "Leaf"]),
+    "Hyundai": (6.0, 28000, ["Tucson", "Elantra", "Santa Fe", "Sonata", "Kona", "Palisade"]),
+    "Jeep": (5.0, 40000, ["Grand Cherokee", "Wrangler", "Cherokee", "Compass", "Gladiator"]),
+    "Kia": (5.0, 27000, ["Sportage", "Sorento", "Forte", "Telluride", "Soul", "Rio"]),
+    "Subaru": (4.0, 31000, ["Outback", "Forester", "Crosstrek", "Impreza", "Ascent", "WRX"]),
+    "Volkswagen": (3.5, 31000, ["Tiguan", "Jetta", "Atlas", "Golf", "Passat", "Beetle"]),
+    "BMW": (3.5, 55000, ["X5", "3 Series", "X3", "5 Series", "M3", "i4", "X7"]),
+    "Mercedes-Benz": (3.5, 60000, ["GLE", "C-Class", "GLC", "E-Class", "S-Class", "G-Class"]),
+    "Mazda": (3.0, 29000, ["CX-5", "Mazda3", "CX-30", "CX-9", "MX-5 Miata"]),
+    "Tesla": (3.0, 52000, ["Model Y", "Model 3", "Model S", "Model X"]),
+    "Audi": (2.5, 52000, ["Q5", "A4", "Q7", "A6", "Q3", "TT"]),
+    "Lexus": (2.5, 50000, ["RX", "NX", "ES", "IS", "GX"]),
+    "Volvo": (1.5, 50000, ["XC90", "XC60", "XC40", "S60"]),
+    "Porsche": (0.6, 95000, ["911", "Cayenne", "Macan", "Taycan", "Boxster"]),
+    "Ferrari": (0.1, 280000, ["F8", "Roma", "296 GTB", "Testarossa"]),
+}
+NEWEST_YEAR = 2025
+OLDEST_YEAR = 1950
+# Mean age of the used-car fleet, and the share of collectible classics
+MEAN_AGE = 6.0
+CLASSIC_SHARE = 0.03
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1M": 1_000_000, "10M": 10_000_000}
+
+
+def parse_size(text):
+    # "100k", "1M", "250000" -> number of rows
+    if text in SIZES:
+        return SIZES[text]
+    suffix = text[-1:].lower()
+    if suffix in ("k", "m"):
+        return int(float(text[:-1]) * (1_000 if suffix == "k" else 1_000_000))
+    return int(text)
+
+
+def size_label(rows):
+    for label, value in SIZES.items():
+        if value == rows:
+            return label
+    return str(rows)
+
+
+def realistic_cars(rows, seed=42):
+    # Yield `rows` Car objects; reproducible for a given seed
+    rng = random.Random(seed)
+    brands = list(BRANDS)
+    brand_weights = []
+    total = 0.0
+    for brand in brands:
+        total += BRANDS[brand][0]
+        brand_weights.append(total)
+    model_weights = {}
+    for brand, (_, _, models) in BRANDS.items():
+        cumulative, running = [], 0.0
+        for rank in range(len(models)):
+            running += 1.0 / (rank + 1)
+            cumulative.append(running)
+        model_weights[brand] = cumulative
+
+    choices = rng.choices
+    for _ in range(rows):
+        brand = choices(brands, cum_weights=brand_weights)[0]
+        _, base_price, models = BRANDS[brand]
+        model = choices(models, cum_weights=model_weights[brand])[0]
+
+        if rng.random() < CLASSIC_SHARE:
+            age = rng.randint(25, NEWEST_YEAR - OLDEST_YEAR)
+            # Collectibles: worth more than new, with a wide spread
+            value = base_price * (0.4 + rng.lognormvariate(0, 0.8))
+        else:
+            age = min(int(rng.expovariate(1 / MEAN_AGE)), 24)
+            value = base_price * 0.85 ** age * rng.lognormvariate(0, 0.2)
+        # Half the listings use "charm" prices like 24,990
+        price = round(value, -2) - 10 if rng.random() < 0.5 else round(value, 2)
+        yield Car(brand, model, NEWEST_YEAR - age, max(500.0, price))
+
+
+def write_dataset(rows, output, seed=42):
+    # Write a dataset to a .db (SQLite) or any feed format Inventory reads
+    cars = realistic_cars(rows, seed)
+    if output.endswith(".db"):
+        from cars.database import CarDatabase
+        db = CarDatabase(output)
+        count = db.add_cars(cars, batch_size=10000)
+        db.close()
+        return count
+    from cars.feeds import write_file
+    return write_file(cars, output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a realistic, seeded car dataset.")
+    parser.add_argument("size", help="number of cars: 1k, 100k, 1M, 10M or a number")
+    parser.add_argument("output", help="cars.db, or a .json/.ndjson/.csv feed (optionally .gz)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    count = write_dataset(parse_size(args.size), args.output, args.seed)
+    print(f"Wrote {count:,} cars to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
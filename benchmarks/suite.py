@@ -0,0 +1,517 @@
+"""
+Benchmark suite: times CarDatabase, Inventory, JSON load/save and the Flask
+routes on a realistic seeded dataset, and compares runs.
+
+Usage:
+    python benchmarks/suite.py run [--size 100k] [--only database,flask] [--out FILE]
+    python benchmarks/suite.py compare BASELINE.json CURRENT.json [--threshold 0.1]
+
+`run` writes machine-readable JSON (best and median milliseconds per
+operation plus environment details). `compare` prints the change per
+operation and exits with status 1 if anything got slower than the threshold
+(10% by default). Operations that would need the whole dataset in Python
+objects are skipped above 1M rows.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import timed  # noqa: F401  (sets up sys.path)
+from datagen import parse_size, realistic_cars, size_label
+from cars.car import Car
+from cars.database import CarDatabase
+from cars.inventory import Inventory
+
+SEED = 42
+# Largest dataset the in-memory cases (Inventory, JSON, get_all_cars) run on
+IN_MEMORY_MAX_ROWS = 1_000_000
+GROUPS = ("database", "inventory", "json", "flask")
+
+CASES = []
+
+
+def case(group, name, repeat=5, max_rows=None):
+    # Register a benchmark. The decorated function gets the Fixture, does
+    # any setup, and returns the zero-argument callable to time.
+    def register(func):
+        CASES.append((group, name, repeat, max_rows, func))
+        return func
+    return register
+
+
+class Fixture:
+    # Shared state for one run: the database file, a connection, and a
+    # lazily built Inventory / JSON file / Flask client
+    def __init__(self, rows, directory, seed=SEED):
+        self.rows = rows
+        self.directory = directory
+        self.rng = random.Random(seed)
+        self.db_path = os.path.join(directory, "bench.db")
+        self.json_path = os.path.join(directory, "bench.json")
+        self.load_ms = None
+        self._inventory = None
+        self._client = None
+
+        db = CarDatabase(self.db_path)
+        db.enable_wal()
+        start = time.perf_counter()
+        db.add_cars(realistic_cars(rows, seed), batch_size=10000)
+        self.load_ms = (time.perf_counter() - start) * 1000
+        db.close()
+        self.db = CarDatabase(self.db_path)
+
+    def sample_ids(self, count):
+        return [self.rng.randint(1, self.rows) for _ in range(count)]
+
+    @property
+    def inventory(self):
+        if self._inventory is None:
+            self._inventory = self.new_inventory()
+        return self._inventory
+
+    def new_inventory(self):
+        # A private Inventory for cases that modify it, so the shared one
+        # timed by later cases keeps every car at its original price
+        inventory = Inventory()
+        for car in realistic_cars(self.rows, SEED):
+            inventory.add_car(car)
+        return inventory
+
+    @property
+    def client(self):
+        if self._client is None:
+            from app import app
+            app.config['DATABASE'] = self.db_path
+            app.config['TESTING'] = True
+            self._client = app.test_client()
+        return self._client
+
+    def close(self):
+        self.db.close()
+        if self._client is not None:
+            from app import close_pool
+            close_pool()
+
+
+# --- CarDatabase -------------------------------------------------------------
+
+@case("database", "get_car x1000")
+def db_get_car(fx):
+    ids = fx.sample_ids(1000)
+    return lambda: [fx.db.get_car(car_id) for car_id in ids]
+
+
+@case("database", "get_row x1000")
+def db_get_row(fx):
+    ids = fx.sample_ids(1000)
+    return lambda: [fx.db.get_row(car_id, ("id", "price")) for car_id in ids]
+
+
+@case("database", "get_all_cars", repeat=3, max_rows=IN_MEMORY_MAX_ROWS)
+def db_get_all_cars(fx):
+    return fx.db.get_all_cars
+
+
+@case("database", "get_all_cars(as_batch)", repeat=3, max_rows=IN_MEMORY_MAX_ROWS)
+def db_get_all_cars_batch(fx):
+    return lambda: fx.db.get_all_cars(as_batch=True)
+
+
+@case("database", "iter_cars (full scan)", repeat=3)
+def db_iter_cars(fx):
+    return lambda: sum(1 for _ in fx.db.iter_cars(batch_size=5000))
+
+
+@case("database", "find_by_year")
+def db_find_by_year(fx):
+    return lambda: fx.db.find_by_year(2019)
+
+
+@case("database", "find_by_price_range")
+def db_find_by_price(fx):
+    return lambda: fx.db.find_by_price_range(20000, 20500)
+
+
+@case("database", "query brand+year, by price, limit 50")
+def db_query(fx):
+    return lambda: fx.db.query(brand="toyota", year_range=(2015, 2020), order_by="price", limit=50)
+
+
+@case("database", "select_rows filtered page of 100")
+def db_select_rows(fx):
+    return lambda: list(fx.db.select_rows(("id", "brand", "price"), brand="bmw",
+                                          price_range=(30000, None), order_by="price", limit=100))
+
+
+@case("database", "search (full text)")
+def db_search(fx):
+    return lambda: fx.db.search("bmw x5")
+
+
+@case("database", "search_by_brand (LIKE)")
+def db_search_by_brand(fx):
+    return lambda: fx.db.search_by_brand("Porsche")
+
+
+@case("database", "get_page first")
+def db_get_page(fx):
+    return lambda: fx.db.get_page(limit=50)
+
+
+@case("database", "get_page deep")
+def db_get_page_deep(fx):
+    after = fx.rows - 100
+    return lambda: fx.db.get_page(after=after, limit=50)
+
+
+@case("database", "get_stats")
+def db_get_stats(fx):
+    return fx.db.get_stats
+
+
+@case("database", "check_stats (recount)", repeat=3)
+def db_check_stats(fx):
+    return fx.db.check_stats
+
+
+@case("database", "add_car x100")
+def db_add_car(fx):
+    car = Car("Bench", "Insert", 2024, 12345.0)
+    return lambda: [fx.db.add_car(car) for _ in range(100)]
+
+
+@case("database", "add_cars 10k (bulk)", repeat=3)
+def db_add_cars(fx):
+    cars = list(realistic_cars(10_000, seed=7))
+    return lambda: fx.db.add_cars(cars)
+
+
+@case("database", "update_car x100")
+def db_update_car(fx):
+    ids = fx.sample_ids(100)
+    return lambda: [fx.db.update_car(car_id, price=9999.0) for car_id in ids]
+
+
+@case("database", "apply_changes 100 updates")
+def db_apply_changes(fx):
+    ids = fx.sample_ids(100)
+    return lambda: fx.db.apply_changes(update=[(car_id, None, {"price": 8888.0}) for car_id in ids])
+
+
+@case("database", "apply_discount + undo (one brand)", repeat=3)
+def db_apply_discount(fx):
+    def run():
+        change_id, _ = fx.db.apply_discount(5, brand="Ford")
+        fx.db.undo_price_change(change_id)
+    return run
+
+
+@case("database", "delete_car x100")
+def db_delete_car(fx):
+    def run():
+        fx.db.cursor.execute("SELECT id FROM cars ORDER BY id DESC LIMIT 100")
+        for (car_id,) in fx.db.cursor.fetchall():
+            fx.db.delete_car(car_id)
+    return run
+
+
+# --- Inventory ---------------------------------------------------------------
+
+@case("inventory", "build (add_car all rows)", repeat=1, max_rows=IN_MEMORY_MAX_ROWS)
+def inv_build(fx):
+    cars = list(realistic_cars(fx.rows, SEED))
+
+    def run():
+        inventory = Inventory()
+        for car in cars:
+            inventory.add_car(car)
+        inventory.find(year_range=(2000, 2000))  # sorts the range indexes
+        fx._inventory = inventory
+    return run
+
+
+@case("inventory", "find_by_brand", max_rows=IN_MEMORY_MAX_ROWS)
+def inv_find_by_brand(fx):
+    return lambda: fx.inventory.find_by_brand("BMW")
+
+
+@case("inventory", "find brand+year+price", max_rows=IN_MEMORY_MAX_ROWS)
+def inv_find(fx):
+    return lambda: fx.inventory.find("toyota", (2015, 2020), (10000, 20000))
+
+
+@case("inventory", "find year range", max_rows=IN_MEMORY_MAX_ROWS)
+def inv_find_year(fx):
+    return lambda: fx.inventory.find(year_range=(2019, 2020))
+
+
+@case("inventory", "apply_discount (one brand)", repeat=3, max_rows=IN_MEMORY_MAX_ROWS)
+def inv_apply_discount(fx):
+    inventory = fx.new_inventory()
+    return lambda: inventory.apply_discount(1, brand="Ford")
+
+
+@case("inventory", "remove x1000", repeat=1, max_rows=IN_MEMORY_MAX_ROWS)
+def inv_remove(fx):
+    inventory = fx.new_inventory()
+    ids = list(range(1, min(fx.rows, 1000) + 1))
+    return lambda: [inventory.remove(car_id) for car_id in ids]
+
+
+# --- JSON load/save ----------------------------------------------------------
+
+@case("json", "save_to_file", repeat=3, max_rows=IN_MEMORY_MAX_ROWS)
+def json_save(fx):
+    return lambda: fx.inventory.save_to_file(fx.json_path)
+
+
+@case("json", "load_from_file", repeat=3, max_rows=IN_MEMORY_MAX_ROWS)
+def json_load(fx):
+    if not os.path.exists(fx.json_path):
+        fx.inventory.save_to_file(fx.json_path)
+    return lambda: Inventory().load_from_file(fx.json_path)
+
+
+@case("json", "save_snapshot", repeat=3, max_rows=IN_MEMORY_MAX_ROWS)
+def json_save_snapshot(fx):
+    path = os.path.join(fx.directory, "bench.snap")
+    return lambda: fx.inventory.save_snapshot(path)
+
+
+@case("json", "open_snapshot + sum(prices)", max_rows=IN_MEMORY_MAX_ROWS)
+def json_open_snapshot(fx):
+    path = os.path.join(fx.directory, "bench.snap")
+    if not os.path.exists(path):
+        fx.inventory.save_snapshot(path)
+
+    def run():
+        with Inventory.open_snapshot(path) as snapshot:
+            return sum(snapshot.prices)
+    return run
+
+
+# --- Flask routes (test client, page cache cleared before each request) -----
+
+def get(fx, url):
+    from app import page_cache
+
+    def run():
+        page_cache.clear()
+        response = fx.client.get(url)
+        response.get_data()
+        assert response.status_code == 200, (url, response.status_code)
+    return run
+
+
+@case("flask", "GET /")
+def flask_index(fx):
+    return get(fx, "/")
+
+
+@case("flask", "GET /?after=<deep>")
+def flask_index_deep(fx):
+    return get(fx, f"/?after={max(fx.rows - 100, 0)}")
+
+
+@case("flask", "GET /?stream=1 (last 1000 cars)", repeat=3)
+def flask_index_stream(fx):
+    # Earlier write cases add rows, so count back from the current last id
+    fx.db.cursor.execute("SELECT MAX(id) FROM cars")
+    last_id = fx.db.cursor.fetchone()[0]
+    return get(fx, f"/?stream=1&after={max(last_id - 1000, 0)}")
+
+
+def post(fx, url, form):
+    from app import page_cache
+
+    def run():
+        page_cache.clear()
+        response = fx.client.post(url, data=form)
+        response.get_data()
+        assert response.status_code == 200, (url, response.status_code)
+    return run
+
+
+@case("flask", "POST /search year")
+def flask_search_year(fx):
+    return post(fx, "/search", {"search_type": "year", "year": "2019"})
+
+
+@case("flask", "POST /search text")
+def flask_search_text(fx):
+    return post(fx, "/search", {"search_type": "brand", "brand": "bmw x5"})
+
+
+@case("flask", "GET /api/v1/cars page of 100")
+def flask_api_list(fx):
+    return get(fx, "/api/v1/cars?brand=honda&sort=-price&limit=100")
+
+
+@case("flask", "GET /api/v1/cars ndjson 10k rows", repeat=3)
+def flask_api_ndjson(fx):
+    return get(fx, "/api/v1/cars?format=ndjson&limit=10000")
+
+
+@case("flask", "GET /api/v1/cars/<id> x100")
+def flask_api_get(fx):
+    ids = fx.sample_ids(100)
+    calls = [get(fx, f"/api/v1/cars/{car_id}") for car_id in ids]
+    return lambda: [call() for call in calls]
+
+
+@case("flask", "POST /add x20")
+def flask_add(fx):
+    form = {"brand": "Bench", "model": "Route", "year": "2024", "price": "15000"}
+
+    def run():
+        for _ in range(20):
+            assert fx.client.post("/add", data=form).status_code == 302
+    return run
+
+
+# --- Running and comparing ---------------------------------------------------
+
+def measure(func, repeat):
+    # Best and median wall time in milliseconds; stdout (Inventory and
+    # CarDatabase print progress) is discarded while timing
+    samples = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+    return min(samples), statistics.median(samples)
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "commit": commit or None,
+    }
+
+
+def run(rows, groups, out):
+    results = {}
+    print(f"Building a {size_label(rows)}-row dataset (seed {SEED})...")
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            fixture = Fixture(rows, directory)
+        results["database.add_cars (initial load)"] = {
+            "best_ms": round(fixture.load_ms, 3), "median_ms": round(fixture.load_ms, 3), "repeat": 1
+        }
+        print(f"{'operation':<48} | {'best ms':>10} | {'median ms':>10}")
+        print("-" * 74)
+        try:
+            for group, name, repeat, max_rows, setup in CASES:
+                if group not in groups:
+                    continue
+                key = f"{group}.{name}"
+                if max_rows is not None and rows > max_rows:
+                    print(f"{key:<48} | {'skipped':>10} |")
+                    continue
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    func = setup(fixture)
+                best, median = measure(func, repeat)
+                results[key] = {"best_ms": round(best, 3), "median_ms": round(median, 3), "repeat": repeat}
+                print(f"{key:<48} | {best:>10.2f} | {median:>10.2f}")
+        finally:
+            fixture.close()
+
+    report = {
+        "suite": "cars-benchmarks",
+        "version": 1,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "rows": rows,
+        "seed": SEED,
+        "environment": environment(),
+        "results": results,
+    }
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {out}")
+    return report
+
+
+def compare(baseline, current, threshold=0.10, min_ms=0.05):
+    # Print per-operation changes; returns the list of regressed operations.
+    # Operations faster than min_ms in both runs are too noisy to judge.
+    old, new = baseline["results"], current["results"]
+    if baseline.get("rows") != current.get("rows"):
+        print(f"Warning: comparing {baseline.get('rows')} rows against {current.get('rows')} rows")
+    print(f"{'operation':<48} | {'baseline':>10} | {'current':>10} | {'change':>8}")
+    print("-" * 86)
+    regressions = []
+    for key in sorted(set(old) | set(new)):
+        if key not in old or key not in new:
+            status = "only in current" if key in new else "only in baseline"
+            print(f"{key:<48} | {'':>10} | {'':>10} | {'':>8}  {status}")
+            continue
+        before, after = old[key]["best_ms"], new[key]["best_ms"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold and max(before, after) >= min_ms:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        elif change < -threshold and max(before, after) >= min_ms:
+            flag = "  faster"
+        print(f"{key:<48} | {before:>10.2f} | {after:>10.2f} | {change:>+7.1%}{flag}")
+    print(f"\n{len(regressions)} regression(s) beyond {threshold:.0%}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Car inventory benchmark suite.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks and write JSON results")
+    run_parser.add_argument("--size", default="100k", help="rows: 1k, 100k, 1M, 10M or a number")
+    run_parser.add_argument("--only", help=f"comma-separated groups ({', '.join(GROUPS)})")
+    run_parser.add_argument("--out", help="results file (default: bench-<size>.json)")
+
+    compare_parser = commands.add_parser("compare", help="flag regressions between two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="relative slowdown to flag (default 0.10 = 10%%)")
+    compare_parser.add_argument("--min-ms", type=float, default=0.05,
+                                help="ignore operations faster than this in both runs")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        rows = parse_size(args.size)
+        groups = args.only.split(",") if args.only else GROUPS
+        unknown = set(groups) - set(GROUPS)
+        if unknown:
+            parser.error(f"unknown group(s): {', '.join(sorted(unknown))}")
+        run(rows, groups, args.out or f"bench-{size_label(rows)}.json")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold, args.min_ms)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,28 @@
 # Car Project Package
 # This file makes the 'cars' folder a Python package
 
-from .car import Car
-from .database import CarDatabase
-from .inventory import Inventory
+from importlib import import_module
+
+# Car, CarDatabase and Inventory are imported on first use (module
+# __getattr__), so `import cars.car` or a CLI that only needs one of them
+# doesn't pay for sqlite3, json and the feed/snapshot modules at startup.
+_LAZY = {
+    'Car': '.car',
+    'CarDatabase': '.database',
+    'Inventory': '.inventory',
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module 'cars' has no attribute '{name}'")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
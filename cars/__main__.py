@@ -0,0 +1,5 @@
+import sys
+from .cli import main
+
+# python -m cars <command>: the non-interactive CLI (see cars.cli)
+sys.exit(main())
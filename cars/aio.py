@@ -0,0 +1,218 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .database import CarDatabase
+
+
+class AsyncCarDatabase:
+    # CarDatabase operations as coroutines, for asyncio/ASGI servers.
+    #
+    # sqlite calls never run on the event loop. Reads go to a pool of reader
+    # threads, each with its own connection (WAL lets them run alongside the
+    # writer). All writes go to ONE writer thread; writes that arrive while
+    # it is busy are queued and then committed together in a single
+    # transaction, each inside its own savepoint so one failing write only
+    # fails its own caller. Use one instance per event loop, and a file
+    # database (":memory:" would give every thread its own empty database).
+    def __init__(self, db_name, readers=4, max_batch=500):
+        self.db_name = db_name
+        self.max_batch = max_batch
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cars-writer")
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="cars-reader")
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._pending = []
+        self._writing = False
+        self._idle = None
+        self._closed = False
+        # Create the schema and switch to WAL once, up front, on the writer
+        self._writer.submit(self._open_writer).result()
+        self.batches = 0
+        self.writes = 0
+        self.largest_batch = 0
+
+    # --- Threads -------------------------------------------------------------
+
+    def _open_writer(self):
+        db = CarDatabase(self.db_name, check_same_thread=False)
+        db.enable_wal()
+        self._write_db = db
+        with self._connections_lock:
+            self._connections.append(db)
+
+    def _reader_db(self):
+        # This reader thread's connection, opened on first use
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = CarDatabase(self.db_name, create_schema=False, check_same_thread=False)
+            self._local.db = db
+            with self._connections_lock:
+                self._connections.append(db)
+        return db
+
+    def _call_reader(self, func, args, kwargs):
+        return func(self._reader_db(), *args, **kwargs)
+
+    # --- Plumbing ------------------------------------------------------------
+
+    async def _read(self, func, *args, **kwargs):
+        # Run func(connection, *args, **kwargs) on a reader thread
+        if self._closed:
+            raise RuntimeError("AsyncCarDatabase is closed")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, self._call_reader, func, args, kwargs)
+
+    def _write(self, op, *args):
+        # Queue a write (a CarDatabase.run_writes op name and its arguments)
+        # and return a future for its result. The flush is
+        # scheduled with call_soon so writes issued in the same event loop
+        # iteration (e.g. by concurrent requests) share one batch.
+        if self._closed:
+            raise RuntimeError("AsyncCarDatabase is closed")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((op, args, future))
+        if not self._writing:
+            self._writing = True
+            loop.call_soon(self._flush, loop)
+        return future
+
+    def _flush(self, loop):
+        batch = self._pending[:self.max_batch]
+        del self._pending[:self.max_batch]
+        job = loop.run_in_executor(self._writer, self._write_db.run_writes,
+                                   [(op, args) for op, args, _ in batch])
+        job.add_done_callback(lambda job: self._written(loop, batch, job))
+
+    def _written(self, loop, batch, job):
+        self.batches += 1
+        self.writes += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        error = job.exception()
+        for index, (_, _, future) in enumerate(batch):
+            if future.done():
+                continue  # caller was cancelled; the write still happened
+            if error is not None:
+                future.set_exception(error)
+                continue
+            ok, value = job.result()[index]
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+        if self._pending:
+            self._flush(loop)
+        else:
+            self._writing = False
+            if self._idle is not None:
+                self._idle.set()
+
+    async def flush(self):
+        # Wait until every queued write has been committed
+        while self._writing:
+            self._idle = asyncio.Event()
+            await self._idle.wait()
+
+    async def close(self):
+        # Commit queued writes, stop the threads and close all connections
+        await self.flush()
+        self._closed = True
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._shutdown)
+
+    def _shutdown(self):
+        self._readers.shutdown(wait=True)
+        self._writer.shutdown(wait=True)
+        with self._connections_lock:
+            for db in self._connections:
+                db.close()
+            self._connections = []
+
+    def stats(self):
+        # Write batching counters
+        return {
+            "batches": self.batches,
+            "writes": self.writes,
+            "largest_batch": self.largest_batch,
+            "avg_batch": round(self.writes / self.batches, 2) if self.batches else 0.0,
+            "queued": len(self._pending),
+        }
+
+    # --- Reads ---------------------------------------------------------------
+
+    async def get_all_cars(self, as_batch=False):
+        return await self._read(CarDatabase.get_all_cars, as_batch)
+
+    async def get_car(self, car_id):
+        return await self._read(CarDatabase.get_car, car_id)
+
+    async def get_car_with_version(self, car_id):
+        return await self._read(CarDatabase.get_car_with_version, car_id)
+
+    async def get_row(self, car_id, fields):
+        return await self._read(CarDatabase.get_row, car_id, fields)
+
+    async def select_rows(self, fields, **options):
+        # Like CarDatabase.select_rows, but returns a list; pass a limit
+        return await self._read(_select_list, fields, **options)
+
+    async def query(self, brand=None, year_range=None, price_range=None,
+                    order_by='id', limit=None, offset=None, as_batch=False):
+        return await self._read(CarDatabase.query, brand, year_range, price_range,
+                                order_by, limit, offset, as_batch)
+
+    async def find_by_year(self, year, as_batch=False):
+        return await self._read(CarDatabase.find_by_year, year, as_batch)
+
+    async def find_by_price_range(self, min_price, max_price, as_batch=False):
+        return await self._read(CarDatabase.find_by_price_range, min_price, max_price, as_batch)
+
+    async def search(self, text, limit=None):
+        return await self._read(CarDatabase.search, text, limit)
+
+    async def get_page(self, after=None, before=None, limit=50):
+        return await self._read(CarDatabase.get_page, after, before, limit)
+
+    async def get_stats(self):
+        return await self._read(CarDatabase.get_stats)
+
+    async def get_generation(self):
+        return await self._read(CarDatabase.get_generation)
+
+    async def get_changes(self, since=0, limit=1000):
+        return await self._read(CarDatabase.get_changes, since, limit)
+
+    async def get_last_seq(self):
+        return await self._read(CarDatabase.get_last_seq)
+
+    # --- Writes --------------------------------------------------------------
+    # These return the same values as the CarDatabase methods but do not
+    # print, since they run inside a server.
+
+    async def add_car(self, car):
+        # Returns the new car's id
+        return await self._write('_insert', car)
+
+    async def update_car(self, car_id, expected_version=None, **fields):
+        # Returns False if no car has this id; raises StaleCarError
+        return await self._write('_update', car_id, expected_version, fields)
+
+    async def delete_car(self, car_id):
+        # Returns False if no car has this id
+        return await self._write('_delete', car_id)
+
+    async def apply_changes(self, create=(), update=(), delete=()):
+        # All-or-nothing, as in CarDatabase.apply_changes
+        return await self._write('_apply', list(create), list(update), list(delete))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+def _select_list(db, fields, **options):
+    # Reader thread: materialize select_rows() before leaving the thread
+    return list(db.select_rows(fields, **options))
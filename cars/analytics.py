@@ -0,0 +1,293 @@
+import argparse
+import json
+import math
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from .car import Car
+from .database import CarDatabase
+
+# Inventory reports: value by brand, price percentiles per model year,
+# depreciation curves and vintage share.
+#
+# The table is split into id ranges and each range is aggregated on its own
+# (in a process pool when workers > 1): the grouping itself runs in SQL
+# (GROUP BY brand, year and GROUP BY year, price bucket), so only a few
+# thousand group rows per range ever reach Python. The partial aggregates
+# are merged and the reports are derived from the merged groups, using
+# Car.get_age / Car.is_vintage per model year.
+
+PERCENTILES = (10, 25, 50, 75, 90)
+# Percentiles are estimated from log-spaced price buckets, within this
+# relative error of the exact value
+PERCENTILE_ACCURACY = 0.005
+LOG_BUCKET_WIDTH = math.log((1 + PERCENTILE_ACCURACY) / (1 - PERCENTILE_ACCURACY))
+# Bucket for prices <= 0, sorted below every real bucket
+ZERO_BUCKET = -(1 << 40)
+# Ranges per worker (so a slow range doesn't leave the other cores idle),
+# and the fewest ids worth sending to another process
+CHUNKS_PER_WORKER = 4
+MIN_CHUNK_IDS = 50_000
+REPORTS = ('brands', 'years', 'depreciation', 'vintage')
+
+
+class PriceSketch:
+    # Mergeable price distribution: counts per bucket, where bucket i holds
+    # prices in (g**(i-1), g**i] for g = exp(LOG_BUCKET_WIDTH)
+    __slots__ = ('counts', 'count')
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+
+    def add(self, price, count=1):
+        if price > 0:
+            self.add_bucket(math.ceil(math.log(price) / LOG_BUCKET_WIDTH), count)
+        else:
+            self.add_bucket(ZERO_BUCKET, count)
+
+    def add_bucket(self, bucket, count):
+        self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += count
+
+    def merge(self, other):
+        for bucket, count in other.counts.items():
+            self.add_bucket(bucket, count)
+
+    def percentile(self, percent):
+        # Nearest-rank percentile (None when empty)
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(percent / 100 * self.count))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return _bucket_value(bucket)
+        return _bucket_value(max(self.counts))
+
+
+def _bucket_value(bucket):
+    # The value within PERCENTILE_ACCURACY of every price in the bucket
+    if bucket == ZERO_BUCKET:
+        return 0.0
+    gamma = math.exp(LOG_BUCKET_WIDTH)
+    return 2 * gamma ** bucket / (gamma + 1)
+
+
+class Partial:
+    # Aggregates over some of the rows: groups[(brand, year)] is
+    # [cars, total price, min price, max price], sketches[year] the price
+    # distribution of that model year
+    __slots__ = ('groups', 'sketches')
+
+    def __init__(self):
+        self.groups = {}
+        self.sketches = {}
+
+    def sketch(self, year):
+        sketch = self.sketches.get(year)
+        if sketch is None:
+            sketch = self.sketches[year] = PriceSketch()
+        return sketch
+
+    def merge(self, other):
+        for key, (count, total, low, high) in other.groups.items():
+            group = self.groups.get(key)
+            if group is None:
+                self.groups[key] = [count, total, low, high]
+            else:
+                group[0] += count
+                group[1] += total
+                group[2] = min(group[2], low)
+                group[3] = max(group[3], high)
+        for year, sketch in other.sketches.items():
+            self.sketch(year).merge(sketch)
+
+
+def scan_chunk(db_name, id_range=None, uri=False):
+    # Aggregate one slice of ids (or the whole table) into a Partial; runs
+    # in a worker process with its own connection
+    db = CarDatabase(db_name, create_schema=False, uri=uri)
+    try:
+        partial = Partial()
+        for brand, year, count, total, low, high in db.summarize(id_range):
+            partial.groups[(brand, year)] = [count, total, low, high]
+        try:
+            buckets = db.price_histogram(LOG_BUCKET_WIDTH, id_range)
+        except sqlite3.OperationalError:
+            # SQLite without math functions: bucket the prices here instead
+            for year, price in db.select_rows(fields=('year', 'price'), id_range=id_range):
+                partial.sketch(year).add(price)
+        else:
+            for year, bucket, count in buckets:
+                partial.sketch(year).add_bucket(ZERO_BUCKET if bucket is None else bucket, count)
+        return partial
+    finally:
+        db.close()
+
+
+def split_ids(id_range, workers):
+    # Cut (low, high) into inclusive id slices: CHUNKS_PER_WORKER per
+    # worker, but none smaller than MIN_CHUNK_IDS
+    if id_range is None:
+        return []
+    low, high = id_range
+    span = high - low + 1
+    chunks = max(1, min(workers * CHUNKS_PER_WORKER, span // MIN_CHUNK_IDS))
+    step = -(-span // chunks)
+    return [(start, min(start + step - 1, high)) for start in range(low, high + 1, step)]
+
+
+def analyze(db_name="cars.db", workers=None, uri=False):
+    # Aggregate the whole table into one Partial, using up to `workers`
+    # processes (default: one per core)
+    workers = workers or os.cpu_count() or 1
+    db = CarDatabase(db_name, create_schema=False, uri=uri)
+    try:
+        chunks = split_ids(db.get_id_range(), workers)
+    finally:
+        db.close()
+
+    merged = Partial()
+    if workers == 1 or len(chunks) <= 1:
+        # Not worth starting processes for
+        for chunk in chunks:
+            merged.merge(scan_chunk(db_name, chunk, uri))
+        return merged
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+        for partial in pool.map(scan_chunk, repeat(db_name), chunks, repeat(uri)):
+            merged.merge(partial)
+    return merged
+
+
+def build_reports(partial):
+    # Turn merged aggregates into report rows (plain dicts and lists, ready
+    # for JSON or a template)
+    years = {year for _, year in partial.groups}
+    ages = {}
+    vintage_years = set()
+    for year in years:
+        car = Car(None, None, year, 0)
+        ages[year] = car.get_age()
+        if car.is_vintage():
+            vintage_years.add(year)
+
+    brands = {}
+    by_age = {}
+    brand_ages = {}
+    for (brand, year), (count, total, low, high) in partial.groups.items():
+        row = brands.get(brand)
+        if row is None:
+            row = brands[brand] = {'brand': brand, 'cars': 0, 'total_value': 0.0,
+                                   'min_price': low, 'max_price': high, 'vintage': 0}
+        row['cars'] += count
+        row['total_value'] += total
+        row['min_price'] = min(row['min_price'], low)
+        row['max_price'] = max(row['max_price'], high)
+        if year in vintage_years:
+            row['vintage'] += count
+        age = ages[year]
+        for curve in (by_age, brand_ages.setdefault(brand, {})):
+            point = curve.setdefault(age, [0, 0.0])
+            point[0] += count
+            point[1] += total
+
+    total_cars = sum(row['cars'] for row in brands.values())
+    total_value = sum(row['total_value'] for row in brands.values())
+    vintage_cars = sum(row['vintage'] for row in brands.values())
+    for row in brands.values():
+        row['avg_price'] = row['total_value'] / row['cars']
+        row['share'] = row['cars'] / total_cars
+        row['vintage_share'] = row['vintage'] / row['cars']
+
+    price_percentiles = []
+    for year in sorted(partial.sketches):
+        sketch = partial.sketches[year]
+        row = {'year': year, 'cars': sketch.count}
+        for percent in PERCENTILES:
+            row[f'p{percent}'] = sketch.percentile(percent)
+        price_percentiles.append(row)
+
+    return {
+        'total_cars': total_cars,
+        'total_value': total_value,
+        'by_brand': sorted(brands.values(), key=lambda row: row['total_value'], reverse=True),
+        'price_percentiles': price_percentiles,
+        'depreciation': _curve(by_age),
+        'depreciation_by_brand': {brand: _curve(curve) for brand, curve in sorted(brand_ages.items())},
+        'vintage': {'cars': vintage_cars, 'share': vintage_cars / total_cars if total_cars else 0.0},
+    }
+
+
+def _curve(points):
+    # Average price per age, and the share of the newest cars' average it
+    # retains
+    curve = []
+    base = None
+    for age in sorted(points):
+        count, total = points[age]
+        avg_price = total / count
+        if base is None:
+            base = avg_price
+        curve.append({'age': age, 'cars': count, 'avg_price': avg_price,
+                      'retained': avg_price / base if base else None})
+    return curve
+
+
+def run_reports(db_name="cars.db", workers=None, uri=False):
+    # analyze() + build_reports(), with timing
+    start = time.perf_counter()
+    reports = build_reports(analyze(db_name, workers, uri))
+    reports['seconds'] = time.perf_counter() - start
+    return reports
+
+
+def print_reports(reports, only=REPORTS):
+    print(f"{reports['total_cars']:,} cars worth ${reports['total_value']:,.2f} "
+          f"(computed in {reports['seconds']:.2f}s)")
+    if 'brands' in only:
+        print(f"\n{'Brand':<16} {'Cars':>10} {'Share':>7} {'Total value':>18} {'Avg price':>12} {'Vintage':>8}")
+        for row in reports['by_brand']:
+            print(f"{row['brand']:<16} {row['cars']:>10,} {row['share']:>7.1%} {row['total_value']:>18,.0f} "
+                  f"{row['avg_price']:>12,.0f} {row['vintage_share']:>8.1%}")
+    if 'years' in only:
+        header = "".join(f"{f'p{percent}':>10}" for percent in PERCENTILES)
+        print(f"\n{'Year':<6} {'Cars':>10}{header}")
+        for row in reports['price_percentiles']:
+            values = "".join(f"{row[f'p{percent}']:>10,.0f}" for percent in PERCENTILES)
+            print(f"{row['year']:<6} {row['cars']:>10,}{values}")
+    if 'depreciation' in only:
+        print(f"\n{'Age':>4} {'Cars':>10} {'Avg price':>12} {'Retained':>9}")
+        for point in reports['depreciation']:
+            # retained is None when the newest cohort averages $0
+            retained = "n/a" if point['retained'] is None else f"{point['retained']:.1%}"
+            print(f"{point['age']:>4} {point['cars']:>10,} {point['avg_price']:>12,.0f} {retained:>9}")
+    if 'vintage' in only:
+        vintage = reports['vintage']
+        print(f"\nVintage (25+ years): {vintage['cars']:,} cars, {vintage['share']:.2%} of the inventory")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m cars.analytics",
+        description="Inventory reports, aggregated in parallel across processes."
+    )
+    parser.add_argument("--db", default="cars.db", help="database file (default: cars.db)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--report", action="append", choices=REPORTS,
+                        help="only print this report (repeatable)")
+    parser.add_argument("--json", action="store_true", help="print every report as JSON")
+    args = parser.parse_args(argv)
+
+    reports = run_reports(args.db, args.workers)
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        print_reports(reports, args.report or REPORTS)
+
+
+if __name__ == "__main__":
+    main()
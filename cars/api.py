@@ -1,28 +1,229 @@
-import urllib.request
+import http.client
 import json
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from . import metrics
 
-def fetch_car_makes():
-    # Fetch list of car manufacturers from API
-    url = "https://vpic.nhtsa.dot.gov/api/vehicles/getallmakes?format=json"
+VPIC_URL = "https://vpic.nhtsa.dot.gov/api/vehicles"
+# A cache hit refreshes the entry's LRU timestamp at most this often (seconds)
+ACCESS_RESOLUTION = 60
 
+
+def default_cache_path():
+    # $VPIC_CACHE, or vpic_cache.db in the user's cache directory
+    # ($XDG_CACHE_HOME/cars, else ~/.cache/cars) -- never the working directory
+    path = os.environ.get("VPIC_CACHE")
+    if not path:
+        cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        path = os.path.join(cache_home, "cars", "vpic_cache.db")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return path
+
+
+class ApiError(Exception):
+    # Raised when the API cannot be reached or keeps failing after retries
+    pass
+
+
+class ResponseCache:
+    def __init__(self, path, ttl=24 * 3600, max_entries=10000):
+        # On-disk cache of API responses. Entries expire after `ttl` seconds;
+        # beyond `max_entries` the least recently used ones are evicted.
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        ''')
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)'
+        )
+        self.conn.commit()
+
+    def get(self, key):
+        # Cached body for key, or None if missing/expired
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT body, expires_at, accessed_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self.conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self.conn.commit()
+                return None
+            # Most hits are read-only: the LRU order only needs refreshing
+            # once per ACCESS_RESOLUTION, not a commit per lookup
+            if now - row[2] >= ACCESS_RESOLUTION:
+                self.conn.execute(
+                    'UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key)
+                )
+                self.conn.commit()
+            return row[0]
+
+    def set(self, key, body):
+        # Store a body and evict expired / least recently used entries
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO responses (key, body, expires_at, accessed_at) '
+                'VALUES (?, ?, ?, ?)',
+                (key, body, now + self.ttl, now)
+            )
+            self.conn.execute('DELETE FROM responses WHERE expires_at <= ?', (now,))
+            self.conn.execute(
+                'DELETE FROM responses WHERE key IN ('
+                '    SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?'
+                ')',
+                (self.max_entries,)
+            )
+            self.conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class VpicClient:
+    def __init__(self, base_url=VPIC_URL, cache_path=None, ttl=24 * 3600,
+                 max_cache_entries=10000, timeout=10, retries=3, backoff=0.5,
+                 max_workers=8):
+        # Client for the NHTSA vPIC API. Each thread keeps one keep-alive
+        # connection; responses are cached on disk in cache_path (None, the
+        # default, disables it; see default_cache_path()); failed requests
+        # are retried with exponential backoff.
+        # Concurrent fetches share one thread pool, so the number of open
+        # connections stays at most max_workers + 1 however many are made.
+        parts = urllib.parse.urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.netloc
+        self.base_path = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_workers = max_workers
+        self.cache = ResponseCache(cache_path, ttl, max_cache_entries) if cache_path else None
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vpic")
+
+    def get_all_makes(self):
+        # Every manufacturer vPIC knows about
+        return self._get_json("/getallmakes")["Results"]
+
+    def get_models_for_make(self, make_name):
+        # All models for one make
+        make = urllib.parse.quote(str(make_name).strip(), safe="")
+        return self._get_json(f"/getmodelsformake/{make}")["Results"]
+
+    def get_models_for_makes(self, make_names):
+        # Models for many makes, fetched concurrently (at most max_workers
+        # requests in flight). Returns {make_name: [models]}.
+        make_names = list(make_names)
+        results = self._pool.map(self.get_models_for_make, make_names)
+        return dict(zip(make_names, results))
+
+    def close(self):
+        # Stop the worker threads, then close every connection and the cache
+        self._pool.shutdown()
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        if self.cache is not None:
+            self.cache.close()
+
+    def _get_json(self, path):
+        endpoint = path.strip("/").split("/")[0].lower()
+        path = f"{self.base_path}{path}?format=json"
+        if self.cache is not None:
+            body = self.cache.get(path)
+            if body is not None:
+                return json.loads(body)
+        with metrics.timer("cars_api_request_seconds", endpoint=endpoint):
+            body = self._request(path)
+        data = json.loads(body)
+        if self.cache is not None:
+            self.cache.set(path, body)
+        return data
+
+    def _request(self, path):
+        # GET with retries on connection errors, 429 and 5xx responses
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            conn = self._connection()
+            try:
+                conn.request("GET", path, headers={"Accept": "application/json"})
+                response = conn.getresponse()
+                body = response.read().decode()
+            except (OSError, http.client.HTTPException) as e:
+                # Stale keep-alive socket or network failure: reconnect
+                conn.close()
+                last_error = e
+                continue
+            if response.status == 200:
+                return body
+            last_error = ApiError(f"HTTP {response.status} for {path}")
+            if response.status != 429 and response.status < 500:
+                break
+        raise ApiError(f"Request for {path} failed: {last_error}")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.scheme == "https":
+                conn = http.client.HTTPSConnection(self.host, timeout=self.timeout)
+            else:
+                conn = http.client.HTTPConnection(self.host, timeout=self.timeout)
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+
+_default_client = None
+
+
+def get_client():
+    # Shared client used by the functions below
+    global _default_client
+    if _default_client is None:
+        _default_client = VpicClient(cache_path=default_cache_path())
+    return _default_client
+
+
+def fetch_car_makes(limit=10):
+    # Fetch list of car manufacturers from API (limit=None for all)
     try:
-        with urllib.request.urlopen(url) as response:
-            data = json.loads(response.read().decode())
-            makes = data["Results"][:10] # Get first 10 
-            return makes
+        makes = get_client().get_all_makes()
+        return makes[:limit] if limit is not None else makes
     except Exception as e:
         print(f"Error fetching data: {e}")
         return []
     
-def fetch_models_by_make(make_name):
-    # Fetch models for a specific car make
-    url = f"https://vpic.nhtsa.dot.gov/api/vehicles/getmodelsformake/{make_name}?format=json"
-    
+def fetch_models_by_make(make_name, limit=5):
+    # Fetch models for a specific car make (limit=None for all)
     try:
-        with urllib.request.urlopen(url) as response:
-            data = json.loads(response.read().decode())
-            models = data["Results"][:5] # Get first 5
-            return models
+        models = get_client().get_models_for_make(make_name)
+        return models[:limit] if limit is not None else models
     except Exception as e:
         print(f"Error fetching data: {e}")
         return []
@@ -37,4 +238,4 @@ if __name__ == "__main__":
     print("\n=== Honda Models ===")
     models = fetch_models_by_make("honda")
     for model in models:
-        print(f"  {model['Model_Name']}")   
\ No newline at end of file
+        print(f"  {model['Model_Name']}")   
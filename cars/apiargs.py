@@ -0,0 +1,150 @@
+import base64
+import json
+import math
+import os
+from .car import Car
+from .database import ROW_FIELDS
+
+# Request parsing for the JSON API, shared by the Flask app (app.py) and the
+# ASGI server (asgi.py). Nothing here imports a web framework, so the ASGI
+# server and scripts that only need these helpers start without Flask.
+
+
+def load_env(directory):
+    # Load directory/.env into os.environ, like python-dotenv's
+    # load_dotenv(); python-dotenv is only imported when the file exists
+    path = os.path.join(directory, ".env")
+    if os.path.exists(path):
+        from dotenv import load_dotenv
+        load_dotenv(path)
+
+
+# JSON API paging
+API_DEFAULT_LIMIT = 100
+API_MAX_LIMIT = 1000
+# Change feed (/changes) page size
+CHANGES_DEFAULT_LIMIT = 500
+CHANGES_MAX_LIMIT = 5000
+
+
+class ApiRequestError(Exception):
+    # Bad input to the JSON API; becomes a 400 (or given status) response
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def encode_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, order_by):
+    # An id cursor is one int; any other sort has [sort value, id] as
+    # built by encode_cursor, checked here so a forged cursor is a 400
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise ApiRequestError('Invalid cursor')
+    if order_by == 'id':
+        if not _is_int(value):
+            raise ApiRequestError('Invalid cursor')
+    elif not (isinstance(value, list) and len(value) == 2 and _is_int(value[1])
+              and isinstance(value[0], (str, int, float)) and not isinstance(value[0], bool)):
+        raise ApiRequestError('Invalid cursor')
+    return value
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def parse_car_list_args(args):
+    # Filters, sort, projection and paging shared by the list/export views
+    def number(name, kind):
+        value = args.get(name)
+        if value is None or value == '':
+            return None
+        try:
+            return kind(value)
+        except ValueError:
+            raise ApiRequestError(f"'{name}' must be a number")
+
+    sort = args.get('sort', 'id')
+    descending = sort.startswith('-')
+    order_by = sort.lstrip('-')
+    if order_by not in ROW_FIELDS or order_by == 'model':
+        raise ApiRequestError(f"Cannot sort by '{order_by}'")
+
+    fields = [field for field in args.get('fields', ','.join(ROW_FIELDS)).split(',') if field]
+    unknown = [field for field in fields if field not in ROW_FIELDS]
+    if unknown or not fields:
+        raise ApiRequestError(f"Unknown field(s): {', '.join(unknown) or '(none)'}")
+
+    year_range = (number('year_min', int), number('year_max', int))
+    price_range = (number('price_min', float), number('price_max', float))
+    return {
+        'fields': fields,
+        'brand': args.get('brand') or None,
+        'year_range': year_range if year_range != (None, None) else None,
+        'price_range': price_range if price_range != (None, None) else None,
+        'order_by': order_by,
+        'descending': descending,
+    }
+
+
+def parse_changes_args(args):
+    # (since or None, limit) for the change feed
+    try:
+        since = int(args['since']) if args.get('since') not in (None, '') else None
+        limit = int(args.get('limit', CHANGES_DEFAULT_LIMIT))
+    except ValueError:
+        raise ApiRequestError("'since' and 'limit' must be integers")
+    if since is not None and since < 0:
+        raise ApiRequestError("'since' must not be negative")
+    return since, max(1, min(limit, CHANGES_MAX_LIMIT))
+
+
+def parse_car_fields(item, partial):
+    # Validate brand/model/year/price from a JSON object
+    if not isinstance(item, dict):
+        raise ApiRequestError('Each car must be a JSON object')
+    fields = {}
+    for name, kinds in (('brand', (str,)), ('model', (str,)), ('year', (int,)), ('price', (int, float))):
+        if name not in item:
+            if partial:
+                continue
+            raise ApiRequestError(f"Missing '{name}'")
+        value = item[name]
+        if isinstance(value, bool) or not isinstance(value, kinds) or value == '':
+            raise ApiRequestError(f"Invalid '{name}'")
+        if name == 'price' and not math.isfinite(value):
+            raise ApiRequestError("Invalid 'price'")
+        fields[name] = float(value) if name == 'price' else value
+    return fields
+
+
+def parse_batch(body):
+    # (creates, updates, deletes) from a POST /api/v1/cars/batch body:
+    # Car objects, (id, version or None, fields) tuples and ids
+    if not isinstance(body, dict):
+        raise ApiRequestError('Expected a JSON object')
+    lists = {}
+    for name in ('create', 'update', 'delete'):
+        lists[name] = body.get(name, [])
+        if not isinstance(lists[name], list):
+            raise ApiRequestError(f"'{name}' must be a list")
+    creates = [Car(**parse_car_fields(item, partial=False)) for item in lists['create']]
+    updates = []
+    for item in lists['update']:
+        fields = parse_car_fields(item, partial=True)
+        if not _is_int(item.get('id')) or not fields:
+            raise ApiRequestError("Updates need an integer 'id' and at least one field")
+        version = item.get('version')
+        if version is not None and not _is_int(version):
+            raise ApiRequestError("'version' must be an integer")
+        updates.append((item['id'], version, fields))
+    deletes = lists['delete']
+    if not all(_is_int(car_id) for car_id in deletes):
+        raise ApiRequestError("'delete' must be a list of integer IDs")
+    return creates, updates, deletes
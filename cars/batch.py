@@ -0,0 +1,117 @@
+from array import array
+from .car import Car
+
+
+class CarBatch:
+    # Column-oriented query result. Instead of one Car object (plus one
+    # tuple) per row, ids/years/prices live in typed arrays and brand/model
+    # are dictionary-encoded: each distinct string is stored once and rows
+    # hold its integer code. Car objects are only built when a row is read.
+    # Iterating yields (id, Car) tuples, like CarDatabase.get_all_cars().
+
+    def __init__(self):
+        self.ids = array('q')
+        self.years = array('i')
+        self.prices = array('d')
+        self.brand_codes = array('I')
+        self.model_codes = array('I')
+        self.brands = []
+        self.models = []
+        self._brand_index = {}
+        self._model_index = {}
+
+    @classmethod
+    def from_rows(cls, rows):
+        # Build a batch from (id, brand, model, year, price) rows
+        batch = cls()
+        for row in rows:
+            batch.append(*row)
+        return batch
+
+    def append(self, car_id, brand, model, year, price):
+        # Add one row
+        self.ids.append(car_id)
+        self.brand_codes.append(self._encode(brand, self.brands, self._brand_index))
+        self.model_codes.append(self._encode(model, self.models, self._model_index))
+        self.years.append(year)
+        self.prices.append(price)
+
+    def car(self, index):
+        # Materialize the Car for one row
+        return Car(
+            self.brands[self.brand_codes[index]],
+            self.models[self.model_codes[index]],
+            self.years[index],
+            self.prices[index]
+        )
+
+    def column(self, name):
+        # Values of one column in row order; strings are decoded into a list
+        if name == 'brand':
+            return [self.brands[code] for code in self.brand_codes]
+        if name == 'model':
+            return [self.models[code] for code in self.model_codes]
+        if name in ('id', 'year', 'price'):
+            return getattr(self, name + 's')
+        raise KeyError(name)
+
+    def select(self, brand=None, year_range=None, price_range=None):
+        # Row indexes matching the filters (same meaning as CarDatabase.query).
+        # Brand is compared once per distinct string, then rows by code.
+        rows = range(len(self.ids))
+        if brand is not None:
+            wanted = brand.casefold()
+            codes = {code for code, value in enumerate(self.brands)
+                     if value.casefold() == wanted}
+            brand_codes = self.brand_codes
+            rows = [i for i in rows if brand_codes[i] in codes]
+        for column, bounds in ((self.years, year_range), (self.prices, price_range)):
+            if bounds is None:
+                continue
+            low, high = bounds
+            if low is not None:
+                rows = [i for i in rows if column[i] >= low]
+            if high is not None:
+                rows = [i for i in rows if column[i] <= high]
+        return list(rows)
+
+    def apply_discount(self, percent, brand=None, year_range=None, price_range=None):
+        # Reduce matching prices by `percent`, working on the price column
+        # directly (no Car objects). Returns the number of rows repriced.
+        if not 0 <= percent <= 100:
+            raise ValueError("Discount percent must be between 0 and 100")
+        factor = 1 - percent / 100
+        if brand is None and year_range is None and price_range is None:
+            self.prices = array('d', [price * factor for price in self.prices])
+            return len(self.prices)
+        rows = self.select(brand, year_range, price_range)
+        prices = self.prices
+        for i in rows:
+            prices[i] *= factor
+        return len(rows)
+
+    def to_list(self):
+        # Materialize as a list of (id, Car) tuples
+        return list(self)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.ids)
+        if not 0 <= index < len(self.ids):
+            raise IndexError("CarBatch index out of range")
+        return self.ids[index], self.car(index)
+
+    def __iter__(self):
+        for index in range(len(self.ids)):
+            yield self.ids[index], self.car(index)
+
+    @staticmethod
+    def _encode(value, values, index):
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(values)
+            values.append(value)
+        return code
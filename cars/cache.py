@@ -0,0 +1,192 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import suppress
+
+
+class CacheBackend(ABC):
+    # Interface for page/query caches. Subclasses implement _get/_set and
+    # call _count() so every backend reports the same statistics.
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0}
+
+    def get(self, key):
+        # Cached value for key, or None
+        value = self._get(key)
+        self._count('hits' if value is not None else 'misses')
+        return value
+
+    def set(self, key, value):
+        self._set(key, value)
+        self._count('sets')
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['size'] = len(self)
+        return stats
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    @abstractmethod
+    def _get(self, key):
+        pass
+
+    @abstractmethod
+    def _set(self, key, value):
+        pass
+
+    @abstractmethod
+    def __len__(self):
+        pass
+
+
+class MemoryCache(CacheBackend):
+    def __init__(self, max_entries=256, ttl=300):
+        # In-process LRU cache whose entries also expire after `ttl` seconds
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key, value):
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self._count('evictions', evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class FileCache(CacheBackend):
+    def __init__(self, directory, max_entries=1024, ttl=300):
+        # Cache stored as one pickle file per key in `directory`, so it
+        # survives restarts and can be shared by worker processes.
+        # Beyond max_entries the least recently written files are removed.
+        # The entry count is tracked per process and the directory is only
+        # scanned when it goes over, so a write is O(1); each scan evicts
+        # down to 90% of max_entries. Other workers may remove files at any
+        # time, so a file vanishing mid-scan is expected.
+        super().__init__()
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+        self._size_lock = threading.Lock()
+        self._size = len(self)
+
+    def _path(self, key):
+        name = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.directory, name + '.cache')
+
+    def _get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                expires_at, stored_key, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if stored_key != key:
+            return None
+        if expires_at <= time.time():
+            with suppress(FileNotFoundError):
+                os.remove(path)
+                self._resize(-1)
+            return None
+        return value
+
+    def _set(self, key, value):
+        # Write to a temp file and rename, so readers never see half a file
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((time.time() + self.ttl, key, value), f)
+        path = self._path(key)
+        is_new = not os.path.exists(path)
+        os.replace(tmp, path)
+        if is_new and self._resize(1) > self.max_entries:
+            self._evict(keep=path)
+
+    def _resize(self, change):
+        with self._size_lock:
+            self._size += change
+            return self._size
+
+    def _evict(self, keep):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.cache') and entry.path != keep:
+                with suppress(FileNotFoundError):
+                    entries.append((entry.stat().st_mtime_ns, entry.path))
+        target = self.max_entries - self.max_entries // 10
+        excess = len(entries) + 1 - target
+        entries.sort()
+        evicted = 0
+        for _, path in entries[:max(excess, 0)]:
+            with suppress(FileNotFoundError):
+                os.remove(path)
+                evicted += 1
+        with self._size_lock:
+            self._size = len(entries) + 1 - evicted
+        if evicted:
+            self._count('evictions', evicted)
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.cache'):
+                with suppress(FileNotFoundError):
+                    os.remove(entry.path)
+        with self._size_lock:
+            self._size = 0
+
+    def __len__(self):
+        return sum(1 for entry in os.scandir(self.directory) if entry.name.endswith('.cache'))
+
+
+def make_cache(kind, **options):
+    # Build a backend by name: 'memory', 'filesystem' or 'none'
+    if kind == 'memory':
+        return MemoryCache(options.get('max_entries', 256), options.get('ttl', 300))
+    if kind == 'filesystem':
+        return FileCache(options['directory'], options.get('max_entries', 1024),
+                         options.get('ttl', 300))
+    if kind == 'none':
+        return None
+    raise ValueError(f"Unknown cache backend '{kind}'")
@@ -1,4 +1,10 @@
+from datetime import datetime
+
+
 class Car: 
+    # No per-instance __dict__: large result sets hold millions of these
+    __slots__ = ('brand', 'model', 'year', 'price')
+
     def __init__(self, brand, model, year, price):
         self.brand = brand
         self.model = model
@@ -15,7 +21,6 @@ class Car:
     
     def get_age(self):
         # Calculate car's age in years
-        from datetime import datetime
         current_year = datetime.now().year
         return current_year - self.year 
     
@@ -0,0 +1,247 @@
+import argparse
+import difflib
+import sqlite3
+import threading
+import time
+
+
+class Catalog:
+    def __init__(self, db_name="cars.db"):
+        # Local copy of the vPIC makes/models reference data, so brands and
+        # models can be checked without a network call. One instance can be
+        # shared by several threads; lookups are serialized by a lock.
+        self.db_name = db_name
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_name, check_same_thread=False)
+        self.cursor = self.conn.cursor()
+        self._create_tables()
+        self._make_keys = None
+        self._data_version = None
+
+    def _create_tables(self):
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS catalog_makes (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                name_key TEXT NOT NULL,
+                models_synced_at REAL
+            )
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS catalog_models (
+                id INTEGER PRIMARY KEY,
+                make_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                name_key TEXT NOT NULL
+            )
+        ''')
+        self.cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_catalog_makes_key ON catalog_makes (name_key)'
+        )
+        self.cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_catalog_models_make_key '
+            'ON catalog_models (make_id, name_key)'
+        )
+        self.conn.commit()
+
+    def sync(self, client, batch_size=50, max_age=None, progress=None):
+        # Pull makes and their models from the API (a VpicClient) into the
+        # local tables. Models are fetched only for makes never synced, or
+        # synced more than `max_age` seconds ago, and each batch of makes
+        # is committed on its own, so an interrupted sync resumes where it
+        # stopped. Returns (makes stored, makes whose models were synced).
+        makes = client.get_all_makes()
+        self.cursor.executemany(
+            'INSERT INTO catalog_makes (id, name, name_key) VALUES (?, ?, ?) '
+            'ON CONFLICT (id) DO UPDATE SET name = excluded.name, name_key = excluded.name_key',
+            [(make['Make_ID'], make['Make_Name'].strip(), _key(make['Make_Name']))
+             for make in makes]
+        )
+        self.conn.commit()
+        self._make_keys = None
+
+        if max_age is None:
+            self.cursor.execute(
+                'SELECT id, name FROM catalog_makes WHERE models_synced_at IS NULL ORDER BY id'
+            )
+        else:
+            self.cursor.execute(
+                'SELECT id, name FROM catalog_makes '
+                'WHERE models_synced_at IS NULL OR models_synced_at < ? ORDER BY id',
+                (time.time() - max_age,)
+            )
+        pending = self.cursor.fetchall()
+
+        synced = 0
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            results = client.get_models_for_makes([name for _, name in chunk])
+            self._store_models(chunk, results)
+            synced += len(chunk)
+            if progress is not None:
+                progress(synced, len(pending))
+        return len(makes), synced
+
+    def _store_models(self, makes, results):
+        # Replace the models of a batch of makes in one transaction
+        try:
+            for make_id, name in makes:
+                self.cursor.execute('DELETE FROM catalog_models WHERE make_id = ?', (make_id,))
+                self.cursor.executemany(
+                    'INSERT OR REPLACE INTO catalog_models (id, make_id, name, name_key) '
+                    'VALUES (?, ?, ?, ?)',
+                    [(model['Model_ID'], make_id, model['Model_Name'].strip(),
+                      _key(model['Model_Name']))
+                     for model in results[name]]
+                )
+                self.cursor.execute(
+                    'UPDATE catalog_makes SET models_synced_at = ? WHERE id = ?',
+                    (time.time(), make_id)
+                )
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+
+    def is_empty(self):
+        # True until the catalog has been synced at least once
+        return not self._fetchall('SELECT 1 FROM catalog_makes LIMIT 1')
+
+    def find_make(self, name):
+        # Canonical make name for `name` (case-insensitive), or None
+        return self._makes().get(_key(name))
+
+    def find_model(self, make, name):
+        # Canonical model name for `name` under `make`, or None
+        rows = self._fetchall(
+            'SELECT m.name FROM catalog_models AS m '
+            'JOIN catalog_makes AS k ON k.id = m.make_id '
+            'WHERE k.name_key = ? AND m.name_key = ? LIMIT 1',
+            (_key(make), _key(name))
+        )
+        return rows[0][0] if rows else None
+
+    def complete_makes(self, prefix, limit=10):
+        # Make names starting with `prefix` (index range scan)
+        low, high = _prefix_range(prefix)
+        rows = self._fetchall(
+            'SELECT name FROM catalog_makes WHERE name_key >= ? AND name_key < ? '
+            'ORDER BY name_key LIMIT ?',
+            (low, high, limit)
+        )
+        return [row[0] for row in rows]
+
+    def complete_models(self, make, prefix, limit=10):
+        # Model names of `make` starting with `prefix`
+        low, high = _prefix_range(prefix)
+        rows = self._fetchall(
+            'SELECT m.name FROM catalog_models AS m '
+            'JOIN catalog_makes AS k ON k.id = m.make_id '
+            'WHERE k.name_key = ? AND m.name_key >= ? AND m.name_key < ? '
+            'ORDER BY m.name_key LIMIT ?',
+            (_key(make), low, high, limit)
+        )
+        return [row[0] for row in rows]
+
+    def suggest_makes(self, name, limit=5, cutoff=0.75):
+        # Closest make names to a (possibly misspelled) name
+        makes = self._makes()
+        keys = difflib.get_close_matches(_key(name), makes.keys(), limit, cutoff)
+        return [makes[key] for key in keys]
+
+    def suggest_models(self, make, name, limit=5, cutoff=0.5):
+        # Closest model names of `make` to a (possibly misspelled) name
+        models = dict(self._fetchall(
+            'SELECT m.name_key, m.name FROM catalog_models AS m '
+            'JOIN catalog_makes AS k ON k.id = m.make_id WHERE k.name_key = ?',
+            (_key(make),)
+        ))
+        keys = difflib.get_close_matches(_key(name), models.keys(), limit, cutoff)
+        return [models[key] for key in keys]
+
+    def check(self, brand, model):
+        # Validate a brand/model pair. Returns a dict with the canonical names
+        # (None if unknown) and suggestions for anything not found.
+        make = self.find_make(brand)
+        result = {
+            'brand': make,
+            'model': self.find_model(make, model) if make else None,
+            'brand_suggestions': [] if make else self.suggest_makes(brand),
+            'model_suggestions': []
+        }
+        if make and result['model'] is None:
+            result['model_suggestions'] = self.suggest_models(make, model)
+        return result
+
+    def close(self):
+        self.conn.close()
+
+    def _makes(self):
+        # name_key -> name for every make, cached in memory. PRAGMA
+        # data_version changes when another connection commits (e.g. a sync
+        # run from the CLI), which tells us to reload.
+        data_version = self._fetchall('PRAGMA data_version')[0][0]
+        if self._make_keys is None or data_version != self._data_version:
+            self._make_keys = dict(self._fetchall('SELECT name_key, name FROM catalog_makes'))
+            self._data_version = data_version
+        return self._make_keys
+
+    def _fetchall(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+
+def _key(name):
+    return " ".join(str(name).split()).casefold()
+
+
+def _prefix_range(prefix):
+    # [low, high) bounds matching every key that starts with prefix
+    low = _key(prefix)
+    return low, low + "\U0010ffff"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m cars.catalog",
+        description="Local vPIC makes/models catalog."
+    )
+    parser.add_argument("--db", default="cars.db", help="database file (default: cars.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sync = commands.add_parser("sync", help="download makes and models from vPIC")
+    sync.add_argument("--max-age-days", type=float, default=None,
+                      help="also refresh makes synced more than this many days ago")
+    sync.add_argument("--batch-size", type=int, default=50,
+                      help="makes committed per batch (default: 50)")
+    sync.add_argument("--workers", type=int, default=8,
+                      help="concurrent API requests (default: 8)")
+
+    check = commands.add_parser("check", help="validate a brand and model")
+    check.add_argument("brand")
+    check.add_argument("model", nargs="?", default="")
+
+    args = parser.parse_args(argv)
+    catalog = Catalog(args.db)
+    try:
+        if args.command == "sync":
+            from .api import VpicClient, default_cache_path
+            client = VpicClient(cache_path=default_cache_path(), max_workers=args.workers)
+            max_age = args.max_age_days * 86400 if args.max_age_days is not None else None
+
+            def progress(done, total):
+                print(f"  models synced for {done}/{total} makes", end="\r")
+
+            try:
+                makes, synced = catalog.sync(client, args.batch_size, max_age, progress)
+            finally:
+                client.close()
+            print(f"\nCatalog has {makes:,} makes; synced models for {synced:,}.")
+        else:
+            print(catalog.check(args.brand, args.model))
+    finally:
+        catalog.close()
+
+
+if __name__ == "__main__":
+    main()
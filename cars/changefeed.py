@@ -0,0 +1,128 @@
+import asyncio
+import sqlite3
+from bisect import bisect_right
+
+# Live change feed for many clients at once (e.g. Server-Sent Events).
+#
+# ONE poller task per process asks the database for the newest car_events
+# seq every poll_interval seconds (a single rowid seek) and, when it moved,
+# reads the new events once into an in-memory buffer. Clients are plain
+# coroutines waiting on an asyncio.Event, so hundreds of idle connections
+# cost no threads and no queries; they are woken together and each slices
+# the buffer from its own seq. A client further behind than the buffer
+# reads its backlog from the database in pages.
+
+
+class ChangeFeed:
+    def __init__(self, db, poll_interval=0.25, buffer_size=10000, page_size=500):
+        # db is an AsyncCarDatabase
+        self.db = db
+        self.poll_interval = poll_interval
+        self.buffer_size = buffer_size
+        self.page_size = page_size
+        self._seqs = []
+        self._changes = []
+        self._seq = None
+        self._changed = None
+        self._started = None
+        self._poller = None
+        self.polls = 0
+        self.waiting = 0
+        self.last_error = None
+
+    async def last_seq(self):
+        # Newest seq the feed knows about
+        await self._start()
+        return self._seq
+
+    async def wait(self, since, timeout=None):
+        # Changes after `since` (at most page_size), waiting up to `timeout`
+        # seconds for one to happen; [] if none did
+        await self._start()
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            # Taken before looking, so a poll that lands while the backlog
+            # is being read still wakes this client
+            changed = self._changed
+            changes = await self._after(since)
+            if changes:
+                return changes
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                return []
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return []
+            finally:
+                self.waiting -= 1
+
+    async def _after(self, since):
+        if since >= self._seq:
+            return []
+        if self._seqs and since >= self._seqs[0] - 1:
+            # Everything after `since` is buffered
+            start = bisect_right(self._seqs, since)
+            return self._changes[start:start + self.page_size]
+        return await self.db.get_changes(since, self.page_size)
+
+    async def _start(self):
+        # Start the poller once, however many clients arrive together
+        if self._started is None:
+            self._started = asyncio.ensure_future(self._begin())
+        await self._started
+
+    async def _begin(self):
+        self._seq = await self.db.get_last_seq()
+        self._changed = asyncio.Event()
+        self._poller = asyncio.ensure_future(self._poll())
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll()
+                self.last_error = None
+            except sqlite3.Error as e:
+                # Keep the clients connected; try again next time
+                self.last_error = e
+
+    async def poll(self):
+        # Read any new changes into the buffer and wake the waiting clients
+        self.polls += 1
+        newest = await self.db.get_last_seq()
+        if newest <= self._seq:
+            return
+        while self._seq < newest:
+            page = await self.db.get_changes(self._seq, self.page_size)
+            if not page:
+                break
+            self._seqs.extend(change['seq'] for change in page)
+            self._changes.extend(page)
+            self._seq = page[-1]['seq']
+        if len(self._seqs) > 2 * self.buffer_size:
+            del self._seqs[:-self.buffer_size]
+            del self._changes[:-self.buffer_size]
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def stats(self):
+        return {
+            'seq': self._seq,
+            'buffered': len(self._seqs),
+            'waiting': self.waiting,
+            'polls': self.polls,
+            'last_error': str(self.last_error) if self.last_error else None,
+        }
+
+    async def close(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+            self._poller = None
+        self._started = None
@@ -0,0 +1,107 @@
+import argparse
+import json
+import sys
+from .car import Car
+
+# Non-interactive commands for scripts and cron jobs, e.g.
+#
+#   python -m cars list --year 2020 --json
+#   python main.py search "bmw x5"
+#
+# Each command opens the database, does one thing and exits; the
+# interactive menu in main.py is only started when no command is given.
+
+LIST_FIELDS = ('id', 'brand', 'model', 'year', 'price')
+
+
+def add_commands(commands):
+    # Register the subcommands on an argparse subparsers object
+    list_parser = commands.add_parser("list", help="list cars, optionally filtered")
+    list_parser.add_argument("--brand")
+    list_parser.add_argument("--year", type=int, help="only this model year")
+    list_parser.add_argument("--min-year", type=int)
+    list_parser.add_argument("--max-year", type=int)
+    list_parser.add_argument("--min-price", type=float)
+    list_parser.add_argument("--max-price", type=float)
+    list_parser.add_argument("--sort", default="id", choices=("id", "brand", "year", "price"))
+    list_parser.add_argument("--desc", action="store_true", help="sort in descending order")
+    list_parser.add_argument("--limit", type=int)
+    list_parser.add_argument("--json", action="store_true", help="print a JSON array")
+    search_parser = commands.add_parser("search", help="full-text search on brand and model")
+    search_parser.add_argument("text")
+    search_parser.add_argument("--limit", type=int, help="at most this many matches (default: all)")
+    search_parser.add_argument("--json", action="store_true", help="print a JSON array")
+    add_parser = commands.add_parser("add", help="add a car")
+    add_parser.add_argument("brand")
+    add_parser.add_argument("model")
+    add_parser.add_argument("year", type=int)
+    add_parser.add_argument("price", type=float)
+    delete_parser = commands.add_parser("delete", help="delete a car by ID")
+    delete_parser.add_argument("car_id", type=int)
+    stats_parser = commands.add_parser("stats", help="inventory statistics")
+    stats_parser.add_argument("--json", action="store_true", help="print a JSON object")
+
+
+def run(args, db_name):
+    # Run the parsed command; returns the process exit status. The
+    # database layer (and sqlite3) is only imported once a command runs.
+    from .database import CarDatabase
+    db = CarDatabase(db_name)
+    try:
+        if args.command == "list":
+            if args.year is not None:
+                args.min_year = args.max_year = args.year
+            rows = db.select_rows(
+                LIST_FIELDS, brand=args.brand,
+                year_range=_bounds(args.min_year, args.max_year),
+                price_range=_bounds(args.min_price, args.max_price),
+                order_by=args.sort, descending=args.desc, limit=args.limit
+            )
+            print_rows(rows, args.json)
+        elif args.command == "search":
+            rows = [(car_id, car.brand, car.model, car.year, car.price)
+                    for car_id, car in db.search(args.text, limit=args.limit)]
+            print_rows(rows, args.json)
+        elif args.command == "add":
+            db.add_car(Car(args.brand, args.model, args.year, args.price))
+        elif args.command == "delete":
+            if not db.get_row(args.car_id, ('id',)):
+                print(f"No car with ID {args.car_id}", file=sys.stderr)
+                return 1
+            db.delete_car(args.car_id)
+        elif args.command == "stats":
+            stats = db.get_stats()
+            if args.json:
+                print(json.dumps(stats))
+            else:
+                print(f"Total cars: {stats['total_cars']:,}")
+                print(f"Total value: ${stats['total_value']:,.2f}")
+                print(f"Average price: ${stats['avg_price']:,.2f}")
+                print(f"Model years: {stats['oldest_year']} - {stats['newest_year']}")
+    finally:
+        db.close()
+    return 0
+
+
+def _bounds(low, high):
+    return None if low is None and high is None else (low, high)
+
+
+def print_rows(rows, as_json):
+    # Stream rows as a JSON array or as one line per car
+    if as_json:
+        sys.stdout.write("[")
+        for index, row in enumerate(rows):
+            sys.stdout.write(("," if index else "") + json.dumps(dict(zip(LIST_FIELDS, row))))
+        sys.stdout.write("]\n")
+        return
+    for car_id, brand, model, year, price in rows:
+        print(f"ID {car_id}: {Car(brand, model, year, price).get_info()}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m cars", description="Car inventory commands.")
+    parser.add_argument("--db", default="cars.db", help="database file (default: cars.db)")
+    add_commands(parser.add_subparsers(dest="command", required=True))
+    args = parser.parse_args(argv)
+    return run(args, args.db)
@@ -1,12 +1,87 @@
+import json
+import math
+import os
+import re
 import sqlite3
+from urllib.parse import quote
 from .car import Car
+from .batch import CarBatch
+from . import metrics
+
+# Columns query() may sort by, mapped to their ORDER BY clause
+ORDER_BY_COLUMNS = {
+    'id': 'id',
+    'brand': 'brand COLLATE NOCASE, id',
+    'year': 'year, id',
+    'price': 'price, id',
+}
+
+# Columns update_car() may change
+UPDATABLE_COLUMNS = ('brand', 'model', 'year', 'price')
+
+
+# julianday() of 1970-01-01, for unix timestamps in SQL
+UNIX_EPOCH_JULIAN = 2440587.5
+
+# Columns select_rows() can return
+ROW_FIELDS = ('id', 'brand', 'model', 'year', 'price', 'version')
+
+
+def _timestamp(value):
+    # Unix time from a number or a datetime
+    return value.timestamp() if hasattr(value, 'timestamp') else float(value)
+
+
+def open_read_only(db_name):
+    # Open an existing car database read-only, for tools that only read it
+    # (export, snapshot conversion): nothing is created or migrated, so a
+    # mistyped path or a foreign SQLite file is reported, not modified.
+    if not os.path.isfile(db_name):
+        raise FileNotFoundError(f"No such database: {db_name}")
+    db = CarDatabase(f"file:{quote(os.path.abspath(db_name))}?mode=ro", create_schema=False, uri=True)
+    try:
+        db.cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cars'")
+        is_car_db = db.cursor.fetchone() is not None
+    except sqlite3.DatabaseError:
+        is_car_db = False
+    if not is_car_db:
+        db.close()
+        raise ValueError(f"{db_name} is not a car database")
+    return db
+
+
+class CarNotFoundError(LookupError):
+    # Raised by apply_changes() when a car to update/delete doesn't exist
+    pass
+
+
+class StaleCarError(Exception):
+    # Raised by update_car() when the car changed since it was read
+    pass
+
 
 class CarDatabase:
-    def __init__(self, db_name):
-        # Connect to database (creates file if not exists)
-        self.conn = sqlite3.connect(db_name)
-        self.cursor = self.conn.cursor()
-        self._create_table()
+    def __init__(self, db_name, create_schema=True, check_same_thread=True, uri=False):
+        # Connect to database (creates file if not exists).
+        # Pass create_schema=False when the schema is known to exist (e.g.
+        # pooled connections) and check_same_thread=False when the
+        # connection is handed between threads one at a time. uri=True
+        # treats db_name as a "file:...?mode=ro" style URI.
+        self.conn = sqlite3.connect(db_name, check_same_thread=check_same_thread, uri=uri)
+        self.cursor = self._new_cursor()
+        if create_schema:
+            self._create_table()
+        else:
+            self.cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cars_fts'"
+            )
+            self.has_fts = self.cursor.fetchone() is not None
+
+    def _new_cursor(self):
+        # A cursor on this connection; timed per statement when cars.metrics
+        # instrumentation is enabled
+        cursor = self.conn.cursor()
+        return metrics.TimedCursor(cursor) if metrics.enabled else cursor
 
     def _create_table(self):
         # Create cars table if it doesn't exist
@@ -16,26 +91,877 @@ class CarDatabase:
                 brand TEXT NOT NULL,
                 model TEXT NOT NULL,
                 year INTEGER NOT NULL,
-                price REAL NOT NULL
+                price REAL NOT NULL,
+                version INTEGER NOT NULL DEFAULT 1
             )
         ''')
+        # Databases created before optimistic locking lack the version column
+        self.cursor.execute('PRAGMA table_info(cars)')
+        if 'version' not in [row[1] for row in self.cursor.fetchall()]:
+            self.cursor.execute(
+                'ALTER TABLE cars ADD COLUMN version INTEGER NOT NULL DEFAULT 1'
+            )
+        # Indexes used by the year/price/brand queries below
+        self.cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_cars_year ON cars (year)'
+        )
+        self.cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_cars_price ON cars (price)'
+        )
+        self.cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_cars_brand_year '
+            'ON cars (brand COLLATE NOCASE, year)'
+        )
+        self._create_stats_table()
+        self._create_search_index()
+        self._create_price_change_tables()
+        self._create_generation_table()
+        self._create_event_log()
         self.conn.commit()
 
+    def _create_generation_table(self):
+        # Change counter for caches: every insert/update/delete on cars bumps
+        # the generation, in the same transaction, from any connection
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS cars_generation (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                generation INTEGER NOT NULL,
+                changed_at INTEGER NOT NULL
+            )
+        ''')
+        self.cursor.execute(
+            "INSERT OR IGNORE INTO cars_generation (id, generation, changed_at) "
+            "VALUES (1, 0, CAST(strftime('%s', 'now') AS INTEGER))"
+        )
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            self.cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS cars_generation_{event.lower()}
+                AFTER {event} ON cars
+                BEGIN
+                    UPDATE cars_generation
+                    SET generation = generation + 1,
+                        changed_at = CAST(strftime('%s', 'now') AS INTEGER)
+                    WHERE id = 1;
+                END
+            ''')
+
+    def _create_event_log(self):
+        # Append-only history of every insert/update/delete on cars, written
+        # by triggers in the same transaction as the change, from any
+        # connection. Each event stores the car as it was after the change
+        # (NULL columns for a delete); ts is unix time in seconds.
+        # car_event_snapshots are compacted copies of the whole inventory at
+        # an event seq, so as-of queries only replay the events after one.
+        self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'car_events'"
+        )
+        exists = self.cursor.fetchone() is not None
+        self.cursor.executescript('''
+            CREATE TABLE IF NOT EXISTS car_events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                car_id INTEGER NOT NULL,
+                ts REAL NOT NULL,
+                kind TEXT NOT NULL CHECK (kind IN ('insert', 'update', 'delete')),
+                brand TEXT,
+                model TEXT,
+                year INTEGER,
+                price REAL,
+                version INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_car_events_car_ts ON car_events (car_id, ts);
+            CREATE TABLE IF NOT EXISTS car_event_snapshots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                seq INTEGER NOT NULL,
+                ts REAL NOT NULL,
+                cars INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_car_event_snapshots_ts ON car_event_snapshots (ts);
+            CREATE TABLE IF NOT EXISTS car_snapshot_rows (
+                snapshot_id INTEGER NOT NULL REFERENCES car_event_snapshots (id),
+                car_id INTEGER NOT NULL,
+                brand TEXT NOT NULL,
+                model TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                price REAL NOT NULL,
+                PRIMARY KEY (snapshot_id, car_id)
+            ) WITHOUT ROWID;
+        ''')
+        now = f"(julianday('now') - {UNIX_EPOCH_JULIAN}) * 86400.0"
+        self.cursor.executescript(f'''
+            CREATE TRIGGER IF NOT EXISTS car_events_insert AFTER INSERT ON cars
+            BEGIN
+                INSERT INTO car_events (car_id, ts, kind, brand, model, year, price, version)
+                VALUES (NEW.id, {now}, 'insert', NEW.brand, NEW.model, NEW.year, NEW.price, NEW.version);
+            END;
+            CREATE TRIGGER IF NOT EXISTS car_events_update AFTER UPDATE ON cars
+            WHEN OLD.brand IS NOT NEW.brand OR OLD.model IS NOT NEW.model
+              OR OLD.year IS NOT NEW.year OR OLD.price IS NOT NEW.price
+            BEGIN
+                INSERT INTO car_events (car_id, ts, kind, brand, model, year, price, version)
+                VALUES (NEW.id, {now}, 'update', NEW.brand, NEW.model, NEW.year, NEW.price, NEW.version);
+            END;
+            CREATE TRIGGER IF NOT EXISTS car_events_delete AFTER DELETE ON cars
+            BEGIN
+                INSERT INTO car_events (car_id, ts, kind) VALUES (OLD.id, {now}, 'delete');
+            END;
+        ''')
+        if not exists:
+            # Cars stored before the log existed: recorded as inserted at
+            # ts 0, since their real history is unknown
+            self.cursor.execute(
+                "INSERT INTO car_events (car_id, ts, kind, brand, model, year, price, version) "
+                "SELECT id, 0, 'insert', brand, model, year, price, version FROM cars ORDER BY id"
+            )
+
+    def _create_price_change_tables(self):
+        # Audit log for apply_discount(): one row per run, plus the old
+        # price of every car it touched so the run can be undone
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS price_changes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at TEXT NOT NULL DEFAULT (datetime('now')),
+                percent REAL NOT NULL,
+                filters TEXT NOT NULL,
+                cars INTEGER NOT NULL DEFAULT 0,
+                undone_at TEXT
+            )
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS price_change_items (
+                change_id INTEGER NOT NULL REFERENCES price_changes (id),
+                car_id INTEGER NOT NULL,
+                old_price REAL NOT NULL,
+                PRIMARY KEY (change_id, car_id)
+            ) WITHOUT ROWID
+        ''')
+
+    def _create_stats_table(self):
+        # Single-row summary of the inventory kept current by triggers, so the
+        # home page statistics never have to scan the cars table
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS car_stats (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                total_cars INTEGER NOT NULL,
+                total_value REAL NOT NULL
+            )
+        ''')
+        self.cursor.executescript('''
+            CREATE TRIGGER IF NOT EXISTS car_stats_insert AFTER INSERT ON cars
+            BEGIN
+                UPDATE car_stats SET total_cars = total_cars + 1,
+                                     total_value = total_value + NEW.price
+                WHERE id = 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS car_stats_delete AFTER DELETE ON cars
+            BEGIN
+                UPDATE car_stats SET total_cars = total_cars - 1,
+                                     total_value = total_value - OLD.price
+                WHERE id = 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS car_stats_update AFTER UPDATE OF price ON cars
+            BEGIN
+                UPDATE car_stats SET total_value = total_value - OLD.price + NEW.price
+                WHERE id = 1;
+            END;
+        ''')
+        # Seed the summary the first time (e.g. a database from before stats)
+        self.cursor.execute(
+            'INSERT OR IGNORE INTO car_stats (id, total_cars, total_value) '
+            'SELECT 1, COUNT(*), COALESCE(SUM(price), 0) FROM cars'
+        )
+
+    def _create_search_index(self):
+        # FTS5 index over brand and model, kept in sync with cars by triggers.
+        # Falls back to LIKE matching if this SQLite was built without FTS5.
+        self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cars_fts'"
+        )
+        exists = self.cursor.fetchone() is not None
+        try:
+            self.cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS cars_fts USING fts5(
+                    brand, model,
+                    content='cars', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            ''')
+        except sqlite3.OperationalError:
+            self.has_fts = False
+            return
+        self.has_fts = True
+        self.cursor.executescript('''
+            CREATE TRIGGER IF NOT EXISTS cars_fts_insert AFTER INSERT ON cars
+            BEGIN
+                INSERT INTO cars_fts (rowid, brand, model)
+                VALUES (NEW.id, NEW.brand, NEW.model);
+            END;
+            CREATE TRIGGER IF NOT EXISTS cars_fts_delete AFTER DELETE ON cars
+            BEGIN
+                INSERT INTO cars_fts (cars_fts, rowid, brand, model)
+                VALUES ('delete', OLD.id, OLD.brand, OLD.model);
+            END;
+            CREATE TRIGGER IF NOT EXISTS cars_fts_update AFTER UPDATE OF brand, model ON cars
+            BEGIN
+                INSERT INTO cars_fts (cars_fts, rowid, brand, model)
+                VALUES ('delete', OLD.id, OLD.brand, OLD.model);
+                INSERT INTO cars_fts (rowid, brand, model)
+                VALUES (NEW.id, NEW.brand, NEW.model);
+            END;
+        ''')
+        if not exists:
+            # Index any cars that were stored before the FTS table existed
+            self.cursor.execute("INSERT INTO cars_fts (cars_fts) VALUES ('rebuild')")
+
     def add_car(self, car):
         # Insert a car into database
+        self._insert(car)
+        self.conn.commit()
+        print(f"Added: {car.get_info()}")
+
+    def add_cars(self, cars, batch_size=1000):
+        # Insert many cars with executemany, one transaction per batch.
+        # `cars` can be any iterable (including a generator); only one batch
+        # is held in memory at a time. Returns the number of rows inserted.
+        total = 0
+        batch = []
+        for car in cars:
+            batch.append((car.brand, car.model, car.year, car.price))
+            if len(batch) >= batch_size:
+                total += self._insert_batch(batch)
+                batch = []
+        if batch:
+            total += self._insert_batch(batch)
+        return total
+
+    def _insert_batch(self, rows):
+        # Write one batch atomically; a failure rolls back only this batch
+        try:
+            self.cursor.executemany(
+                'INSERT INTO cars (brand, model, year, price) VALUES (?, ?, ?, ?)',
+                rows
+            )
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        return len(rows)
+
+    def enable_wal(self, synchronous='NORMAL'):
+        # Switch to write-ahead logging; with synchronous=NORMAL commits no
+        # longer fsync, which makes bulk loads and concurrent readers cheaper
+        if synchronous not in ('OFF', 'NORMAL', 'FULL'):
+            raise ValueError(f"Unknown synchronous mode '{synchronous}'")
+        self.cursor.execute('PRAGMA journal_mode=WAL')
+        self.cursor.execute(f'PRAGMA synchronous={synchronous}')
+
+    def get_all_cars(self, as_batch=False):
+        # Retrieve all cars from database.
+        # as_batch=True returns a compact columnar CarBatch instead of a list.
+        self.cursor.execute('SELECT id, brand, model, year, price FROM cars')
+        if as_batch:
+            return self._fetch_batch()
+        rows = self.cursor.fetchall()
+        return [(row[0], Car(row[1], row[2], row[3], row[4])) for row in rows]
+
+    def _fetch_batch(self, chunk_size=10000):
+        # Read the pending result set straight into a CarBatch, chunk by
+        # chunk, without building the full list of row tuples first
+        batch = CarBatch()
+        while True:
+            rows = self.cursor.fetchmany(chunk_size)
+            if not rows:
+                return batch
+            for row in rows:
+                batch.append(*row)
+
+    def get_car(self, car_id):
+        # Look up one car by primary key; returns None if it doesn't exist
+        found = self.get_car_with_version(car_id)
+        return found[0] if found else None
+
+    def get_car_with_version(self, car_id):
+        # Look up one car and its version (for optimistic locking).
+        # Returns (Car, version) or None.
+        self.cursor.execute(
+            'SELECT brand, model, year, price, version FROM cars WHERE id = ?',
+            (car_id,)
+        )
+        row = self.cursor.fetchone()
+        if row is None:
+            return None
+        return Car(row[0], row[1], row[2], row[3]), row[4]
+
+    def update_car(self, car_id, expected_version=None, **fields):
+        # Update some of brand/model/year/price in place with a single UPDATE.
+        # The id stays the same and the version is bumped. If
+        # expected_version is given and the stored version differs, the car
+        # was changed by someone else and StaleCarError is raised.
+        # Returns False if no car has this id.
+        try:
+            updated = self._update(car_id, expected_version, fields)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        if updated:
+            print(f"Updated car with ID {car_id}")
+        return updated
+
+    def _update(self, car_id, expected_version, fields):
+        # UPDATE statement shared by update_car() and apply_changes();
+        # the caller commits or rolls back
+        unknown = set(fields) - set(UPDATABLE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Cannot update {', '.join(sorted(unknown))}")
+
+        assignments = [f'{column} = ?' for column in fields] + ['version = version + 1']
+        params = list(fields.values())
+        sql = f"UPDATE cars SET {', '.join(assignments)} WHERE id = ?"
+        params.append(car_id)
+        if expected_version is not None:
+            sql += ' AND version = ?'
+            params.append(expected_version)
+
+        self.cursor.execute(sql, params)
+        updated = self.cursor.rowcount == 1
+        if not updated and expected_version is not None:
+            self.cursor.execute('SELECT version FROM cars WHERE id = ?', (car_id,))
+            row = self.cursor.fetchone()
+            if row is not None:
+                raise StaleCarError(
+                    f"Car {car_id} is at version {row[0]}, expected {expected_version}"
+                )
+        return updated
+
+    def apply_changes(self, create=(), update=(), delete=()):
+        # Apply a mixed batch of writes in ONE transaction: either all of
+        # them happen or none do.
+        #   create: Car objects
+        #   update: (car_id, expected_version or None, {column: value}) tuples
+        #   delete: car ids
+        # Raises CarNotFoundError for unknown ids, StaleCarError for version
+        # conflicts and ValueError for bad columns.
+        # Returns {'created': [new ids], 'updated': count, 'deleted': count}.
+        try:
+            result = self._apply(create, update, delete)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return result
+
+    def _apply(self, create=(), update=(), delete=()):
+        # Body of apply_changes(); the caller commits or rolls back
+        created = [self._insert(car) for car in create]
+        updated = 0
+        for car_id, expected_version, fields in update:
+            if not self._update(car_id, expected_version, fields):
+                raise CarNotFoundError(f"No car with ID {car_id}")
+            updated += 1
+        deleted = 0
+        for car_id in delete:
+            if not self._delete(car_id):
+                raise CarNotFoundError(f"No car with ID {car_id}")
+            deleted += 1
+        return {'created': created, 'updated': updated, 'deleted': deleted}
+
+    def _insert(self, car):
+        # INSERT one car without committing; returns the new id
         self.cursor.execute(
             'INSERT INTO cars (brand, model, year, price) VALUES (?, ?, ?, ?)',
             (car.brand, car.model, car.year, car.price)
         )
-        self.conn.commit()
-        print(f"Added: {car.get_info()}")
+        return self.cursor.lastrowid
 
-    def get_all_cars(self):
-        # Retrieve all cars from database
-        self.cursor.execute('SELECT id, brand, model, year, price FROM cars')
+    def _delete(self, car_id):
+        # DELETE one car without committing; returns False if it didn't exist
+        self.cursor.execute('DELETE FROM cars WHERE id = ?', (car_id,))
+        return self.cursor.rowcount == 1
+
+    def run_writes(self, ops):
+        # Apply queued writes in ONE transaction, each inside its own
+        # savepoint so a failing write is undone without affecting the
+        # others. `ops` are (name, args) pairs naming the non-committing
+        # helpers: '_insert' (car), '_update' (car_id, expected_version,
+        # fields), '_delete' (car_id) or '_apply' (create, update, delete).
+        # Returns one (ok, result or exception) pair per write. Used by the
+        # async and write-behind front ends to batch concurrent writes.
+        results = []
+        self.cursor.execute('BEGIN IMMEDIATE')
+        try:
+            for name, args in ops:
+                self.cursor.execute('SAVEPOINT queued_write')
+                try:
+                    result = getattr(self, name)(*args)
+                except Exception as e:
+                    self.cursor.execute('ROLLBACK TO queued_write')
+                    results.append((False, e))
+                else:
+                    results.append((True, result))
+                self.cursor.execute('RELEASE queued_write')
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return results
+
+    def get_row(self, car_id, fields=ROW_FIELDS):
+        # One car as a plain tuple of the requested columns, or None
+        unknown = [field for field in fields if field not in ROW_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+        self.cursor.execute(f"SELECT {', '.join(fields)} FROM cars WHERE id = ?", (car_id,))
+        return self.cursor.fetchone()
+
+    def select_rows(self, fields=ROW_FIELDS, brand=None, year_range=None, price_range=None,
+                    order_by='id', descending=False, after=None, limit=None, id_range=None):
+        # Yield plain tuples of the requested columns (no Car objects), for
+        # serializers. Sorted by order_by then id; `after` is the
+        # (order_by value, id) keyset cursor of the last row already seen
+        # (just the id when ordering by id); id_range limits the scan to an
+        # inclusive (low, high) slice of ids. Uses its own cursor, so the
+        # result can be streamed while other queries run.
+        unknown = [field for field in fields if field not in ROW_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+        if order_by not in ROW_FIELDS or order_by == 'model':
+            raise ValueError(f"Cannot order by '{order_by}'")
+
+        where, params = self._where(brand, year_range, price_range, id_range)
+        direction = 'DESC' if descending else 'ASC'
+        comparison = '<' if descending else '>'
+        if after is not None:
+            if order_by == 'id':
+                condition, values = f'id {comparison} ?', [after]
+            else:
+                condition = f'({order_by}, id) {comparison} (?, ?)'
+                values = list(after)
+            where = f'{where} AND {condition}' if where else f' WHERE {condition}'
+            params.extend(values)
+
+        sql = f"SELECT {', '.join(fields)} FROM cars{where} ORDER BY "
+        sql += f'id {direction}' if order_by == 'id' else f'{order_by} {direction}, id {direction}'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        cursor = self._new_cursor()
+        try:
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+    def find_by_year(self, year, as_batch=False):
+        # Find cars from a given year (uses idx_cars_year)
+        return self.query(year_range=(year, year), as_batch=as_batch)
+
+    def find_by_price_range(self, min_price, max_price, as_batch=False):
+        # Find cars priced between min_price and max_price (uses idx_cars_price)
+        return self.query(price_range=(min_price, max_price), order_by='price',
+                          as_batch=as_batch)
+
+    def query(self, brand=None, year_range=None, price_range=None,
+              order_by='id', limit=None, offset=None, as_batch=False):
+        # Run a filtered query in SQL and return (id, Car) tuples, or a
+        # CarBatch if as_batch=True.
+        # year_range and price_range are inclusive (low, high) tuples; either
+        # end may be None to leave that side open.
+        if order_by not in ORDER_BY_COLUMNS:
+            raise ValueError(f"Cannot order by '{order_by}'")
+
+        where, params = self._where(brand, year_range, price_range)
+
+        sql = 'SELECT id, brand, model, year, price FROM cars' + where
+        sql += f' ORDER BY {ORDER_BY_COLUMNS[order_by]}'
+        if limit is not None or offset is not None:
+            sql += ' LIMIT ? OFFSET ?'
+            params.append(-1 if limit is None else limit)
+            params.append(offset or 0)
+
+        self.cursor.execute(sql, params)
+        if as_batch:
+            return self._fetch_batch()
         rows = self.cursor.fetchall()
         return [(row[0], Car(row[1], row[2], row[3], row[4])) for row in rows]
     
+    def _where(self, brand=None, year_range=None, price_range=None, id_range=None):
+        # Build a WHERE clause (with leading space, or '') and its parameters
+        # for the brand / year range / price range / id range filters
+        clauses = []
+        params = []
+        if brand is not None:
+            clauses.append('brand = ? COLLATE NOCASE')
+            params.append(brand)
+        for column, bounds in (('year', year_range), ('price', price_range), ('id', id_range)):
+            if bounds is None:
+                continue
+            low, high = bounds
+            if low is not None:
+                clauses.append(f'{column} >= ?')
+                params.append(low)
+            if high is not None:
+                clauses.append(f'{column} <= ?')
+                params.append(high)
+        if not clauses:
+            return '', params
+        return ' WHERE ' + ' AND '.join(clauses), params
+
+    def apply_discount(self, percent, brand=None, year_range=None, price_range=None):
+        # Reduce the price of every matching car by `percent` with one
+        # set-based UPDATE (filters as in query()). The old prices are saved
+        # in the same transaction so the run can be undone.
+        # Returns (change_id, number of cars repriced).
+        if not 0 <= percent <= 100:
+            raise ValueError("Discount percent must be between 0 and 100")
+        where, params = self._where(brand, year_range, price_range)
+        filters = json.dumps({
+            'brand': brand, 'year_range': year_range, 'price_range': price_range
+        })
+        try:
+            self.cursor.execute(
+                'INSERT INTO price_changes (percent, filters) VALUES (?, ?)',
+                (percent, filters)
+            )
+            change_id = self.cursor.lastrowid
+            self.cursor.execute(
+                'INSERT INTO price_change_items (change_id, car_id, old_price) '
+                f'SELECT ?, id, price FROM cars{where}',
+                [change_id] + params
+            )
+            self.cursor.execute(
+                'UPDATE cars SET price = price * ?, version = version + 1 '
+                'WHERE id IN (SELECT car_id FROM price_change_items WHERE change_id = ?)',
+                (1 - percent / 100, change_id)
+            )
+            count = self.cursor.rowcount
+            self.cursor.execute(
+                'UPDATE price_changes SET cars = ? WHERE id = ?', (count, change_id)
+            )
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        print(f"Applied {percent}% discount to {count} cars")
+        return change_id, count
+
+    def undo_price_change(self, change_id):
+        # Restore the prices saved by an apply_discount() run.
+        # Returns the number of cars restored (0 if already undone/unknown).
+        try:
+            self.cursor.execute(
+                'SELECT 1 FROM price_changes WHERE id = ? AND undone_at IS NULL',
+                (change_id,)
+            )
+            if self.cursor.fetchone() is None:
+                return 0
+            self.cursor.execute(
+                'UPDATE cars SET price = ('
+                '    SELECT old_price FROM price_change_items '
+                '    WHERE change_id = ? AND car_id = cars.id'
+                '), version = version + 1 '
+                'WHERE id IN (SELECT car_id FROM price_change_items WHERE change_id = ?)',
+                (change_id, change_id)
+            )
+            count = self.cursor.rowcount
+            self.cursor.execute(
+                "UPDATE price_changes SET undone_at = datetime('now') WHERE id = ?",
+                (change_id,)
+            )
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        print(f"Restored prices of {count} cars")
+        return count
+
+    def get_price_changes(self):
+        # Audit log of bulk repricing runs, newest first
+        self.cursor.execute(
+            'SELECT id, created_at, percent, filters, cars, undone_at '
+            'FROM price_changes ORDER BY id DESC'
+        )
+        return [
+            {
+                'id': row[0],
+                'created_at': row[1],
+                'percent': row[2],
+                'filters': json.loads(row[3]),
+                'cars': row[4],
+                'undone_at': row[5]
+            }
+            for row in self.cursor.fetchall()
+        ]
+
+    def get_car_history(self, car_id):
+        # Every logged change to one car, oldest first (an index range on
+        # idx_car_events_car_ts). 'car' is the car after the change, None
+        # after a delete.
+        self.cursor.execute(
+            'SELECT seq, ts, kind, brand, model, year, price, version FROM car_events '
+            'WHERE car_id = ? ORDER BY ts, seq',
+            (car_id,)
+        )
+        return [
+            {
+                'seq': row[0],
+                'ts': row[1],
+                'kind': row[2],
+                'car': None if row[2] == 'delete' else Car(row[3], row[4], row[5], row[6]),
+                'version': row[7]
+            }
+            for row in self.cursor.fetchall()
+        ]
+
+    def get_price_history(self, car_id):
+        # (ts, price) for every price the car has had, oldest first; the
+        # last price is None if the car was deleted
+        history = []
+        for event in self.get_car_history(car_id):
+            price = None if event['car'] is None else event['car'].price
+            if not history or history[-1][1] != price:
+                history.append((event['ts'], price))
+        return history
+
+    def get_changes(self, since=0, limit=1000):
+        # The change feed: up to `limit` events with seq > since, oldest
+        # first, as JSON-ready dicts. seq only ever increases (and is never
+        # reused), so a client resumes from the last seq it applied.
+        self.cursor.execute(
+            'SELECT seq, ts, kind, car_id, brand, model, year, price, version FROM car_events '
+            'WHERE seq > ? ORDER BY seq LIMIT ?',
+            (since, limit)
+        )
+        return [
+            {
+                'seq': row[0],
+                'ts': row[1],
+                'kind': row[2],
+                'id': row[3],
+                'car': None if row[2] == 'delete' else dict(zip(
+                    ('brand', 'model', 'year', 'price', 'version'), row[4:]
+                ))
+            }
+            for row in self.cursor.fetchall()
+        ]
+
+    def get_last_seq(self):
+        # Newest change feed seq (0 before the first change); a rowid seek
+        self.cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM car_events')
+        return self.cursor.fetchone()[0]
+
+    def inventory_as_of(self, ts):
+        # The inventory as it was at `ts` (unix time or a datetime), as
+        # (id, Car) tuples in id order. Starts from the newest compacted
+        # snapshot taken at or before ts and replays only the events after
+        # it (a rowid range on car_events), keeping each car's last event.
+        ts = _timestamp(ts)
+        self.cursor.execute(
+            'SELECT id, seq FROM car_event_snapshots WHERE ts <= ? '
+            'ORDER BY ts DESC, id DESC LIMIT 1',
+            (ts,)
+        )
+        snapshot_id, seq = self.cursor.fetchone() or (None, 0)
+        # NOT INDEXED keeps the planner on the seq (rowid) range instead of
+        # scanning all of idx_car_events_car_ts for the GROUP BY
+        sql = '''
+            WITH latest AS MATERIALIZED (
+                SELECT car_id, kind, brand, model, year, price, MAX(seq)
+                FROM car_events NOT INDEXED WHERE seq > ? AND ts <= ? GROUP BY car_id
+            )
+            SELECT car_id, brand, model, year, price FROM latest WHERE kind != 'delete'
+        '''
+        params = [seq, ts]
+        if snapshot_id is not None:
+            sql += '''
+            UNION ALL
+            SELECT car_id, brand, model, year, price FROM car_snapshot_rows
+            WHERE snapshot_id = ? AND car_id NOT IN (SELECT car_id FROM latest)
+            '''
+            params.append(snapshot_id)
+        self.cursor.execute(sql + ' ORDER BY car_id', params)
+        return [(row[0], Car(row[1], row[2], row[3], row[4])) for row in self.cursor.fetchall()]
+
+    def compact_events(self, min_events=1, keep=None):
+        # Store a snapshot of the whole inventory as of the newest event, so
+        # later as-of queries replay only the events after it. Run it
+        # periodically (python -m cars.history compact --every N). Skipped
+        # unless at least min_events were logged since the last snapshot.
+        # keep=N deletes all but the N newest snapshots; the events
+        # themselves are never deleted. Returns the snapshot id or None.
+        try:
+            self.cursor.execute('BEGIN IMMEDIATE')
+            self.cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM car_event_snapshots')
+            last_seq = self.cursor.fetchone()[0]
+            self.cursor.execute('SELECT seq, ts FROM car_events ORDER BY seq DESC LIMIT 1')
+            newest = self.cursor.fetchone()
+            if newest is None or newest[0] - last_seq < max(min_events, 1):
+                self.conn.rollback()
+                return None
+            # In this transaction the cars table is exactly the state after
+            # the newest event
+            self.cursor.execute(
+                'INSERT INTO car_event_snapshots (seq, ts, cars) '
+                'VALUES (?, ?, (SELECT COUNT(*) FROM cars))',
+                newest
+            )
+            snapshot_id = self.cursor.lastrowid
+            self.cursor.execute(
+                'INSERT INTO car_snapshot_rows (snapshot_id, car_id, brand, model, year, price) '
+                'SELECT ?, id, brand, model, year, price FROM cars',
+                (snapshot_id,)
+            )
+            count = self.cursor.rowcount
+            if keep is not None:
+                old = 'SELECT id FROM car_event_snapshots ORDER BY id DESC LIMIT -1 OFFSET ?'
+                self.cursor.execute(f'DELETE FROM car_snapshot_rows WHERE snapshot_id IN ({old})', (keep,))
+                self.cursor.execute(f'DELETE FROM car_event_snapshots WHERE id IN ({old})', (keep,))
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        print(f"Compacted {count} cars into history snapshot {snapshot_id}")
+        return snapshot_id
+
+    def get_page(self, after=None, before=None, limit=50):
+        # Keyset pagination on id: return up to `limit` cars with id > after
+        # (or id < before), plus the cursors for the previous/next pages.
+        # Every step is an index seek, so deep pages cost the same as page 1.
+        if before is not None:
+            self.cursor.execute(
+                'SELECT id, brand, model, year, price FROM cars '
+                'WHERE id < ? ORDER BY id DESC LIMIT ?',
+                (before, limit)
+            )
+            rows = self.cursor.fetchall()[::-1]
+        else:
+            self.cursor.execute(
+                'SELECT id, brand, model, year, price FROM cars '
+                'WHERE id > ? ORDER BY id LIMIT ?',
+                (after if after is not None else 0, limit)
+            )
+            rows = self.cursor.fetchall()
+
+        cars = [(row[0], Car(row[1], row[2], row[3], row[4])) for row in rows]
+        prev_cursor = next_cursor = None
+        if cars:
+            if self._has_row('id < ?', cars[0][0]):
+                prev_cursor = cars[0][0]
+            if self._has_row('id > ?', cars[-1][0]):
+                next_cursor = cars[-1][0]
+        elif before is not None:
+            # Paged back past the start: offer the way forward again
+            next_cursor = 0 if self._has_row('id >= ?', before) else None
+        elif after:
+            prev_cursor = after + 1 if self._has_row('id <= ?', after) else None
+        return cars, prev_cursor, next_cursor
+
+    def iter_cars(self, after=None, batch_size=500):
+        # Yield (id, Car) tuples in id order without loading the whole table.
+        # Uses its own cursor so other queries can run while this is consumed.
+        cursor = self._new_cursor()
+        try:
+            cursor.execute(
+                'SELECT id, brand, model, year, price FROM cars '
+                'WHERE id > ? ORDER BY id',
+                (after if after is not None else 0,)
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row[0], Car(row[1], row[2], row[3], row[4])
+        finally:
+            cursor.close()
+
+    def get_id_range(self):
+        # (lowest id, highest id), or None for an empty table; both ends are
+        # seeks on the rowid b-tree
+        self.cursor.execute('SELECT MIN(id), MAX(id) FROM cars')
+        low, high = self.cursor.fetchone()
+        return None if low is None else (low, high)
+
+    def summarize(self, id_range=None):
+        # One GROUP BY pass: (brand, year, cars, total price, min price,
+        # max price) per brand and model year, optionally for a slice of ids
+        where, params = self._where(id_range=id_range)
+        self.cursor.execute(
+            'SELECT brand, year, COUNT(*), SUM(price), MIN(price), MAX(price) '
+            f'FROM cars{where} GROUP BY brand, year',
+            params
+        )
+        return self.cursor.fetchall()
+
+    def price_histogram(self, log_width, id_range=None):
+        # (year, bucket, cars) counts with bucket = ceil(ln(price) / log_width),
+        # i.e. log-spaced price buckets per model year (bucket is None for
+        # prices <= 0). Needs SQLite's math functions; raises
+        # sqlite3.OperationalError on builds without them.
+        where, params = self._where(id_range=id_range)
+        self.cursor.execute(
+            'SELECT year, CASE WHEN price > 0 THEN CAST(ceil(ln(price) / ?) AS INTEGER) END AS bucket, '
+            f'COUNT(*) FROM cars{where} GROUP BY year, bucket',
+            [log_width] + params
+        )
+        return self.cursor.fetchall()
+
+    def get_generation(self):
+        # (generation, changed_at unix time) of the cars table; the
+        # generation goes up with every write, so caches key on it
+        self.cursor.execute('SELECT generation, changed_at FROM cars_generation WHERE id = 1')
+        return self.cursor.fetchone()
+
+    def get_stats(self):
+        # Inventory statistics: count and total come from the car_stats row,
+        # newest/oldest year are single seeks on idx_cars_year
+        self.cursor.execute(
+            'SELECT total_cars, total_value, '
+            '(SELECT MAX(year) FROM cars), (SELECT MIN(year) FROM cars) '
+            'FROM car_stats WHERE id = 1'
+        )
+        total_cars, total_value, newest_year, oldest_year = self.cursor.fetchone()
+        return {
+            'total_cars': total_cars,
+            'total_value': total_value if total_cars > 0 else 0,
+            'avg_price': total_value / total_cars if total_cars > 0 else 0,
+            'newest_year': newest_year or 0,
+            'oldest_year': oldest_year or 0
+        }
+
+    def check_stats(self, repair=False):
+        # Compare car_stats with a full recount; optionally rebuild it.
+        # Returns True if the summary was already consistent.
+        self.cursor.execute('SELECT COUNT(*), COALESCE(SUM(price), 0) FROM cars')
+        total_cars, total_value = self.cursor.fetchone()
+        self.cursor.execute('SELECT total_cars, total_value FROM car_stats WHERE id = 1')
+        stored = self.cursor.fetchone()
+        consistent = (
+            stored is not None
+            and stored[0] == total_cars
+            and math.isclose(stored[1], total_value, rel_tol=1e-9, abs_tol=0.005)
+        )
+        if not consistent and repair:
+            self.rebuild_stats()
+        return consistent
+
+    def rebuild_stats(self):
+        # Recompute the car_stats row from the cars table
+        self.cursor.execute(
+            'INSERT OR REPLACE INTO car_stats (id, total_cars, total_value) '
+            'SELECT 1, COUNT(*), COALESCE(SUM(price), 0) FROM cars'
+        )
+        self.conn.commit()
+
+    def _has_row(self, condition, value):
+        # Cheap existence probe used for pagination cursors
+        self.cursor.execute(f'SELECT 1 FROM cars WHERE {condition} LIMIT 1', (value,))
+        return self.cursor.fetchone() is not None
+
     def delete_car(self, car_id):
         # Delete a car by its ID
         self.cursor.execute('DELETE FROM cars WHERE id = ?', (car_id,))
@@ -51,6 +977,39 @@ class CarDatabase:
         rows = self.cursor.fetchall()
         return [Car(row[0], row[1], row[2], row[3]) for row in rows]
 
+    def search(self, text, limit=None):
+        # Full-text search over brand and model, best matches first.
+        # Every word must match, and each word also matches as a prefix,
+        # so "bmw x" finds "BMW X5". Returns (id, Car) tuples; all matches
+        # unless a limit is given.
+        terms = re.findall(r'\w+', text)
+        if not terms:
+            return []
+        if limit is None:
+            limit = -1  # SQLite: no limit
+        if not self.has_fts:
+            return self._search_like(terms, limit)
+        match = ' '.join(f'"{term}"*' for term in terms)
+        self.cursor.execute(
+            'SELECT c.id, c.brand, c.model, c.year, c.price '
+            'FROM cars_fts JOIN cars AS c ON c.id = cars_fts.rowid '
+            'WHERE cars_fts MATCH ? ORDER BY cars_fts.rank LIMIT ?',
+            (match, limit)
+        )
+        rows = self.cursor.fetchall()
+        return [(row[0], Car(row[1], row[2], row[3], row[4])) for row in rows]
+
+    def _search_like(self, terms, limit):
+        # Substring fallback for search() when FTS5 is unavailable
+        clauses = ' AND '.join("(brand || ' ' || model) LIKE ?" for _ in terms)
+        self.cursor.execute(
+            f'SELECT id, brand, model, year, price FROM cars WHERE {clauses} '
+            'ORDER BY id LIMIT ?',
+            [f'%{term}%' for term in terms] + [limit]
+        )
+        rows = self.cursor.fetchall()
+        return [(row[0], Car(row[1], row[2], row[3], row[4])) for row in rows]
+
     def close(self):
         # Close the database connection
         self.conn.close()
@@ -0,0 +1,38 @@
+import argparse
+import time
+from .database import open_read_only
+from .feeds import write_file
+
+
+def export(filename, db_name="cars.db"):
+    # Stream every car in the database to a JSON/NDJSON/CSV file (optionally
+    # .gz/.zst). Returns (cars written, seconds taken). The database must
+    # exist; it is opened read-only.
+    db = open_read_only(db_name)
+    try:
+        start = time.perf_counter()
+        count = write_file((car for _, car in db.iter_cars()), filename)
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+    return count, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m cars.export",
+        description="Export the car database to JSON, NDJSON or CSV (add .gz or .zst to compress)."
+    )
+    parser.add_argument("file", help="output file, e.g. cars.csv or cars.ndjson.gz")
+    parser.add_argument("--db", default="cars.db", help="database file (default: cars.db)")
+    args = parser.parse_args(argv)
+
+    try:
+        count, elapsed = export(args.file, args.db)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    print(f"Exported {count:,} cars to {args.file} in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from .car import Car
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for .zst files
+    zstandard = None
+
+# Characters read from a feed file at a time
+CHUNK_SIZE = 64 * 1024
+# Largest single JSON array item iter_json will buffer, in characters
+MAX_ITEM_SIZE = 1024 * 1024
+
+# Field order used by every format
+FIELDS = ("brand", "model", "year", "price")
+
+
+# --- Opening (compression + atomic writes) ---------------------------------
+
+def feed_format(filename):
+    # 'json', 'ndjson' or 'csv' from the extension (ignoring .gz/.zst)
+    name = filename
+    for suffix in (".gz", ".zst"):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "json"
+
+
+def open_feed(filename):
+    # Open a feed for reading as text, decompressing .gz/.zst on the fly
+    # Always UTF-8, as written by the writers below, whatever the locale
+    if filename.endswith(".gz"):
+        return gzip.open(filename, "rt", encoding="utf-8", newline="")
+    if filename.endswith(".zst"):
+        raw = open(filename, "rb")
+        reader = _zstd().ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(reader, encoding="utf-8", newline="")
+    return open(filename, "r", encoding="utf-8", newline="")
+
+
+@contextmanager
+def atomic_feed_writer(filename):
+    # Write a feed through a temp file in the same directory, renamed over
+    # `filename` only once everything was written. Readers never see a
+    # half-written file and a failed export leaves the old file in place.
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".feed")
+    # mkstemp creates the file 0600; give it the mode open() would have
+    os.fchmod(fd, new_file_mode())
+    raw = os.fdopen(fd, "wb")
+    try:
+        if filename.endswith(".gz"):
+            binary = gzip.GzipFile(fileobj=raw, mode="wb")
+        elif filename.endswith(".zst"):
+            binary = _zstd().ZstdCompressor().stream_writer(raw, closefd=False)
+        else:
+            binary = raw
+        f = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+        yield f
+        f.flush()
+        f.detach()
+        if binary is not raw:
+            binary.close()
+        raw.flush()
+        os.fsync(raw.fileno())
+        raw.close()
+        os.replace(tmp, filename)
+    except BaseException:
+        raw.close()
+        os.remove(tmp)
+        raise
+
+
+def new_file_mode():
+    # Permissions of a file created by open(): 0666 less the umask
+    return 0o666 & ~_umask()
+
+
+def _umask():
+    umask = _proc_umask()
+    return _IMPORT_UMASK if umask is None else umask
+
+
+def _proc_umask():
+    # Linux reports the umask in /proc without changing it
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except OSError:
+        pass
+    return None
+
+
+# Elsewhere the only way to read the umask is to set it, which would briefly
+# apply to files other threads create, so that is done once, at import
+_IMPORT_UMASK = None
+if _proc_umask() is None:
+    _IMPORT_UMASK = os.umask(0)
+    os.umask(_IMPORT_UMASK)
+
+
+def _zstd():
+    if zstandard is None:
+        raise RuntimeError("Reading or writing .zst files needs the 'zstandard' package")
+    return zstandard
+
+
+# --- Readers ---------------------------------------------------------------
+
+def iter_json(filename, chunk_size=CHUNK_SIZE):
+    # Yield Car objects from a JSON array file (the format written by
+    # Inventory.save_to_file) without loading the whole file into memory.
+    decoder = json.JSONDecoder()
+    with open_feed(filename) as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{filename} does not contain a JSON array")
+        pos = 1
+        # Characters dropped from the front of the buffer, for error positions
+        offset = 0
+        while True:
+            # Skip whitespace and separators between items
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            try:
+                if pos >= len(buffer):
+                    raise json.JSONDecodeError("Need more data", buffer, pos)
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if not _truncated(e):
+                    raise ValueError(f"{filename}: invalid JSON at character {offset + e.pos}: {e.msg}")
+                if len(buffer) - pos > MAX_ITEM_SIZE:
+                    raise ValueError(f"{filename}: item at character {offset + pos} is over "
+                                     f"{MAX_ITEM_SIZE:,} characters")
+                # Item is split across chunks: drop what we've used, read more
+                more = f.read(chunk_size)
+                if not more:
+                    raise ValueError(f"{filename} ends in the middle of the array")
+                offset += pos
+                buffer = buffer[pos:] + more
+                pos = 0
+                continue
+            yield _car_from_dict(item)
+            pos = end
+
+
+def _truncated(error):
+    # Whether a decode error can be cured by more data: it is at the end
+    # of the buffer, inside a string still open there, or in a token cut
+    # short by the chunk boundary ("tru", "-", "\u00")
+    return (error.pos >= len(error.doc) - 6
+            or error.msg.startswith("Unterminated string"))
+
+
+def iter_ndjson(filename):
+    # Yield Car objects from a file with one JSON object per line
+    with open_feed(filename) as f:
+        for line in f:
+            if line.strip():
+                yield _car_from_dict(json.loads(line))
+
+
+def iter_csv(filename):
+    # Yield Car objects from a CSV file with brand,model,year,price columns
+    with open_feed(filename) as f:
+        for row in csv.DictReader(f):
+            yield Car(row["brand"], row["model"], int(row["year"]), float(row["price"]))
+
+
+def iter_file(filename):
+    # Pick a reader from the file extension
+    readers = {"json": iter_json, "ndjson": iter_ndjson, "csv": iter_csv}
+    return readers[feed_format(filename)](filename)
+
+
+# --- Writers ---------------------------------------------------------------
+# Each writer consumes an iterable of Car objects one at a time, writes
+# atomically and returns the number of cars written.
+
+def write_json(cars, filename):
+    # JSON array, one object per line
+    count = 0
+    with atomic_feed_writer(filename) as f:
+        f.write("[")
+        for car in cars:
+            f.write(",\n  " if count else "\n  ")
+            f.write(json.dumps(_car_to_dict(car)))
+            count += 1
+        f.write("\n]\n" if count else "]\n")
+    return count
+
+
+def write_ndjson(cars, filename):
+    # One JSON object per line
+    count = 0
+    with atomic_feed_writer(filename) as f:
+        for car in cars:
+            f.write(json.dumps(_car_to_dict(car)))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def write_csv(cars, filename):
+    # CSV with a brand,model,year,price header
+    count = 0
+    with atomic_feed_writer(filename) as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for car in cars:
+            writer.writerow((car.brand, car.model, car.year, car.price))
+            count += 1
+    return count
+
+
+def write_file(cars, filename):
+    # Pick a writer from the file extension
+    writers = {"json": write_json, "ndjson": write_ndjson, "csv": write_csv}
+    return writers[feed_format(filename)](cars, filename)
+
+
+def _car_from_dict(item):
+    return Car(item["brand"], item["model"], item["year"], item["price"])
+
+
+def _car_to_dict(car):
+    return {"brand": car.brand, "model": car.model, "year": car.year, "price": car.price}
@@ -0,0 +1,91 @@
+import argparse
+import time
+from datetime import datetime
+from .database import CarDatabase
+
+# Command line access to the car_events log kept by CarDatabase: price
+# history of one car, the inventory as of a past time, and the periodic
+# compaction that keeps as-of queries fast.
+
+
+def parse_time(text):
+    # "2024-05-01", "2024-05-01T12:30:00" (local time) or a unix timestamp
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+
+
+def format_time(ts):
+    if ts == 0:
+        return "before history"
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def show_car(db, car_id):
+    history = db.get_car_history(car_id)
+    if not history:
+        print(f"No history for car {car_id}")
+        return
+    for event in history:
+        car = event['car']
+        detail = "deleted" if car is None else car.get_info()
+        print(f"{format_time(event['ts']):<20} {event['kind']:<7} {detail}")
+
+
+def show_as_of(db, ts, limit):
+    cars = db.inventory_as_of(ts)
+    total = sum(car.price for _, car in cars)
+    print(f"Inventory at {format_time(ts)}: {len(cars):,} cars worth ${total:,.2f}")
+    for car_id, car in cars[:limit]:
+        print(f"  {car_id:>8}  {car.get_info()}")
+    if len(cars) > limit:
+        print(f"  ... {len(cars) - limit:,} more")
+
+
+def compact(db, min_events, keep, every):
+    # Compact once, or every `every` seconds until interrupted
+    while True:
+        if db.compact_events(min_events=min_events, keep=keep) is None:
+            print("History is already compact")
+        if not every:
+            return
+        try:
+            time.sleep(every)
+        except KeyboardInterrupt:
+            return
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m cars.history",
+        description="Price history and time-travel queries over the car change log."
+    )
+    parser.add_argument("--db", default="cars.db", help="database file (default: cars.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    car_parser = commands.add_parser("car", help="every change to one car")
+    car_parser.add_argument("car_id", type=int)
+    as_of_parser = commands.add_parser("as-of", help="the inventory at a past time")
+    as_of_parser.add_argument("when", type=parse_time, help="ISO date/time or unix timestamp")
+    as_of_parser.add_argument("--limit", type=int, default=20, help="cars to list (default: 20)")
+    compact_parser = commands.add_parser("compact", help="snapshot the inventory for faster as-of queries")
+    compact_parser.add_argument("--min-events", type=int, default=1,
+                                help="skip unless this many changes were logged since the last snapshot")
+    compact_parser.add_argument("--keep", type=int, help="snapshots to keep (default: all)")
+    compact_parser.add_argument("--every", type=float, help="keep compacting every N seconds")
+    args = parser.parse_args(argv)
+
+    db = CarDatabase(args.db)
+    try:
+        if args.command == "car":
+            show_car(db, args.car_id)
+        elif args.command == "as-of":
+            show_as_of(db, args.when, args.limit)
+        else:
+            compact(db, args.min_events, args.keep, args.every)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import argparse
+import time
+from .database import CarDatabase
+from .feeds import iter_file
+
+
+def ingest(filename, db_name="cars.db", batch_size=5000, fast=False):
+    # Stream a JSON/NDJSON/CSV feed into the database in batches.
+    # Returns (rows inserted, seconds taken).
+    db = CarDatabase(db_name)
+    try:
+        if fast:
+            db.enable_wal(synchronous="NORMAL")
+        start = time.perf_counter()
+        rows = db.add_cars(iter_file(filename), batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+    return rows, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m cars.ingest",
+        description="Bulk load a dealer feed (JSON, NDJSON or CSV) into the car database."
+    )
+    parser.add_argument("files", nargs="+", help="feed files to load")
+    parser.add_argument("--db", default="cars.db", help="database file (default: cars.db)")
+    parser.add_argument("--batch-size", type=int, default=5000,
+                        help="rows per transaction (default: 5000)")
+    parser.add_argument("--fast", action="store_true",
+                        help="use journal_mode=WAL and synchronous=NORMAL while loading")
+    args = parser.parse_args(argv)
+
+    for filename in args.files:
+        rows, elapsed = ingest(filename, args.db, args.batch_size, args.fast)
+        rate = rows / elapsed if elapsed > 0 else float("inf")
+        print(f"Loaded {rows:,} cars from {filename} in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,66 +1,236 @@
+import os
+from bisect import bisect_left, bisect_right
+from itertools import islice
 from .car import Car
+from .batch import CarBatch
+from .feeds import iter_file, write_file
+from .snapshot import Snapshot, write_snapshot
+
+# Bounds that sort below/above every id in a (value, id) index entry
+_LOWEST = float("-inf")
+_HIGHEST = float("inf")
 
 class Inventory: 
     def __init__(self):
-        # List to store all cars
-        self.cars = []
+        # Cars keyed by a stable id (insertion ordered), plus secondary
+        # indexes: case-folded brand -> ids, and (year, id) / (price, id)
+        # lists kept sorted for bisect range lookups.
+        self._cars = {}
+        self._next_id = 1
+        self._by_brand = {}
+        self._by_year = []
+        self._by_price = []
+        # The sorted indexes are sorted lazily (appends are O(1)) and removed
+        # ids are skipped until the next compaction
+        self._unsorted = False
+        self._removed = 0
+
+    @property
+    def cars(self):
+        # Read-only live view of all cars in insertion order (supports len()
+        # and iteration, not indexing or append). It replaces the old public
+        # list: add and remove cars with add_car()/remove() so the indexes
+        # stay in step, and use list(inventory.cars) for a copy.
+        return self._cars.values()
+
+    def __len__(self):
+        return len(self._cars)
 
     def add_car(self, car):
-        # Add a Car object to the inventory
-        self.cars.append(car)
+        # Add a Car object to the inventory; returns its id
+        car_id = self._next_id
+        self._next_id += 1
+        self._cars[car_id] = car
+        self._index(car_id, car)
+        return car_id
+
+    def _index(self, car_id, car):
+        # Add one car to the secondary indexes
+        self._by_brand.setdefault(car.brand.casefold(), {})[car_id] = None
+        self._by_year.append((car.year, car_id))
+        self._by_price.append((car.price, car_id))
+        self._unsorted = True
+
+    def get(self, car_id):
+        # Car with this id, or None
+        return self._cars.get(car_id)
 
     def list_cars(self):
         # Display all cars
-        if not self.cars:
+        if not self._cars:
             print("No cars in inventory.")
             return
-        for i, car in enumerate(self.cars, 1):
+        for i, car in enumerate(self._cars.values(), 1):
             print(f"{i}. {car.get_info()}")
 
     def find_by_brand(self, brand):
-        # Find all cars matching a brand
+        # Find all cars matching a brand (case-insensitive hash lookup)
+        ids = self._by_brand.get(brand.casefold(), {})
+        return [self._cars[car_id] for car_id in ids]
+
+    def find(self, brand=None, year_range=None, price_range=None):
+        # Cars matching every given filter, as (id, Car) tuples in id order.
+        # Ranges are inclusive (low, high) tuples; either end may be None.
+        # Each index reports how many entries match (a hash lookup or two
+        # bisects); only the most selective one is walked and its cars are
+        # checked against the remaining filters.
+        candidates = []
+        brand_ids = None
+        if brand is not None:
+            brand_ids = self._by_brand.get(brand.casefold(), {})
+            candidates.append((len(brand_ids), brand_ids))
+        if year_range is not None or price_range is not None:
+            self._ensure_sorted()
+        for index, bounds in ((self._by_year, year_range), (self._by_price, price_range)):
+            if bounds is not None:
+                start, end = self._bounds(index, bounds)
+                candidates.append((end - start, (index, start, end)))
+        if not candidates:
+            return list(self._cars.items())
+
+        _, ids = min(candidates, key=lambda candidate: candidate[0])
+        if isinstance(ids, tuple):
+            index, start, end = ids
+            ids = [car_id for _, car_id in index[start:end]]
+        year_low, year_high = year_range or (None, None)
+        price_low, price_high = price_range or (None, None)
         results = []
-        for car in self.cars:
-            if car.brand.lower() == brand.lower():
-                results.append(car)
+        for car_id in ids:
+            car = self._cars.get(car_id)
+            if car is None:
+                continue  # removed; entry not compacted yet
+            if brand_ids is not None and car_id not in brand_ids:
+                continue
+            if year_low is not None and car.year < year_low:
+                continue
+            if year_high is not None and car.year > year_high:
+                continue
+            if price_low is not None and car.price < price_low:
+                continue
+            if price_high is not None and car.price > price_high:
+                continue
+            results.append((car_id, car))
+        results.sort(key=lambda result: result[0])
         return results
-    
+
+    def _bounds(self, index, bounds):
+        # Slice of a sorted (value, id) index whose values lie within bounds
+        low, high = bounds
+        start = 0 if low is None else bisect_left(index, (low, _LOWEST))
+        end = len(index) if high is None else bisect_right(index, (high, _HIGHEST))
+        return start, end
+
+    def _ensure_sorted(self):
+        # Sort pending appends and drop entries of removed cars
+        if self._removed:
+            cars = self._cars
+            self._by_year = [entry for entry in self._by_year if entry[1] in cars]
+            self._by_price = [entry for entry in self._by_price if entry[1] in cars]
+            self._removed = 0
+            self._unsorted = True
+        if self._unsorted:
+            self._by_year.sort()
+            self._by_price.sort()
+            self._unsorted = False
+
+    def reindex(self):
+        # Rebuild the year/price indexes, e.g. after changing Car objects
+        # directly (car.apply_discount(...)) instead of through Inventory
+        self._by_year = [(car.year, car_id) for car_id, car in self._cars.items()]
+        self._by_price = [(car.price, car_id) for car_id, car in self._cars.items()]
+        self._removed = 0
+        self._unsorted = True
+
+    def apply_discount(self, percent, brand=None, year_range=None, price_range=None):
+        # Discount every matching car (filters as in CarDatabase.query)
+        # Returns the number of cars repriced.
+        if not 0 <= percent <= 100:
+            raise ValueError("Discount percent must be between 0 and 100")
+        factor = 1 - percent / 100
+        matches = self.find(brand, year_range, price_range)
+        for _, car in matches:
+            car.price *= factor
+        if matches:
+            self._by_price = [(car.price, car_id) for car_id, car in self._cars.items()]
+            self._unsorted = True
+        return len(matches)
+
+    def remove(self, car_id):
+        # Remove a car by id in O(1); returns the Car or None
+        car = self._cars.pop(car_id, None)
+        if car is None:
+            return None
+        brand_ids = self._by_brand[car.brand.casefold()]
+        del brand_ids[car_id]
+        if not brand_ids:
+            del self._by_brand[car.brand.casefold()]
+        # Sorted index entries are skipped until enough pile up to compact
+        self._removed += 1
+        if self._removed > len(self._cars):
+            self._ensure_sorted()
+        return car
+
     def remove_car(self, index):
         # Remove car by its position (1-based index)
-        if 1 <= index <= len(self.cars):
-            removed = self.cars.pop(index - 1)
+        if 1 <= index <= len(self._cars):
+            car_id = next(islice(self._cars, index - 1, None))
+            removed = self.remove(car_id)
             print(f"Removed: {removed.get_info()}")
         else:
             print("Invalid index. No car removed.")
 
     def save_to_file(self, filename):
-        # Save inventory to a JSON file
-        import json
-        data = []
-        for car in self.cars:
-            data.append({
-                'brand': car.brand,
-                'model': car.model,
-                'year': car.year,
-                'price': car.price
-            })
-        with open(filename, "w") as f:
-            json.dump(data, f, indent=2)
-        print(f"Saved {len(self.cars)} cars to {filename}.")
+        # Save inventory to a file; the format comes from the extension:
+        # .json (default), .ndjson/.jsonl or .csv, optionally .gz/.zst
+        # compressed. Cars are streamed out and the file is replaced
+        # atomically.
+        count = write_file(self._cars.values(), filename)
+        print(f"Saved {count} cars to {filename}.")
 
     def load_from_file(self, filename):
-        # Load inventory from a JSON file
-        import json
-        import os
+        # Load inventory from a file written by save_to_file (or any feed in
+        # a supported format), reading it incrementally
         if not os.path.exists(filename):
             print(f"File {filename} not found.")
             return
-        with open(filename, "r") as f:
-            data = json.load(f)
-        for item in data:
-            car = Car(item["brand"], item["model"], item["year"], item["price"])
+        count = 0
+        for car in iter_file(filename):
             self.add_car(car)
-        print(f"Loaded {len(data)} cars from {filename}.")
+            count += 1
+        print(f"Loaded {count} cars from {filename}.")
+
+    def save_snapshot(self, filename):
+        # Save inventory as a binary snapshot (see cars.snapshot), which
+        # open_snapshot can map back without parsing
+        batch = CarBatch()
+        for car_id, car in self._cars.items():
+            batch.append(car_id, car.brand, car.model, car.year, car.price)
+        count = write_snapshot(batch, filename)
+        print(f"Saved {count} cars to {filename}.")
+
+    @staticmethod
+    def open_snapshot(filename, verify=True):
+        # Memory-map a snapshot read-only. The returned Snapshot exposes the
+        # year/price columns as zero-copy memoryviews and only builds Car
+        # objects for the rows that are read; close it (or use it as a
+        # context manager) when done.
+        return Snapshot(filename, verify=verify)
+
+    def load_snapshot(self, filename):
+        # Load every car from a snapshot into this inventory, keeping ids.
+        # A kept id may belong to a removed car whose sorted index entries
+        # are still pending compaction, so purge those first.
+        if self._removed:
+            self._ensure_sorted()
+        with Snapshot(filename) as snapshot:
+            for car_id, car in snapshot:
+                if car_id in self._cars:
+                    car_id = self._next_id
+                self._cars[car_id] = car
+                self._index(car_id, car)
+                self._next_id = max(self._next_id, car_id + 1)
+            count = len(snapshot)
+        print(f"Loaded {count} cars from {filename}.")
 
 
 # Test our Inventory class
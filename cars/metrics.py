@@ -0,0 +1,310 @@
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+
+# Built-in performance instrumentation: per-statement query timing and row
+# counts, a slow-query log, and latency histograms (routes, templates, API
+# calls), rendered in Prometheus text format for /metrics.
+#
+# Everything is off by default. Call enable() before opening databases:
+# CarDatabase only wraps its cursors in TimedCursor when instrumentation is
+# on at the time it connects, so a disabled process runs the plain sqlite3
+# cursor with no extra work per query.
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Distinct SQL statements tracked; later ones are counted under "other"
+MAX_STATEMENTS = 500
+SLOW_QUERY_LOG_SIZE = 100
+
+# Logger slow queries are reported to
+SLOW_QUERY_LOGGER = "cars.slow_query"
+
+enabled = False
+slow_query_ms = None
+
+_lock = threading.Lock()
+_queries = {}
+_histograms = {}
+_slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+_placeholder_lists = re.compile(r"\?(?:\s*,\s*\?)+")
+_whitespace = re.compile(r"\s+")
+
+
+def enable(slow_ms=None):
+    # Turn instrumentation on; queries slower than slow_ms milliseconds
+    # are logged to the "cars.slow_query" logger and kept for slow_queries()
+    global enabled, slow_query_ms
+    enabled = True
+    slow_query_ms = slow_ms
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    # Forget everything recorded so far
+    with _lock:
+        _queries.clear()
+        _histograms.clear()
+        _slow_queries.clear()
+
+
+class Histogram:
+    # Cumulative-bucket latency histogram, as Prometheus expects
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.total += seconds
+        self.count += 1
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[index] += 1
+                break
+
+    def quantile(self, fraction):
+        # Upper bound of the bucket holding the given quantile (an estimate)
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+def observe(name, seconds, **labels):
+    # Add one latency sample to the histogram `name` with these labels
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+
+@contextmanager
+def timer(name, **labels):
+    # with metrics.timer("cars_api_request_seconds", endpoint="getallmakes"):
+    # (does nothing when instrumentation is off)
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql):
+    # One key per statement shape: collapse whitespace and "?, ?, ?" lists
+    return _placeholder_lists.sub("?...", _whitespace.sub(" ", sql).strip())
+
+
+def record_query(sql, seconds, rows, calls=1):
+    # Add time/rows to a statement's totals; `calls` is 0 when adding the
+    # fetch time of a statement already counted
+    key = normalize_sql(sql)
+    with _lock:
+        stats = _queries.get(key)
+        if stats is None:
+            if len(_queries) >= MAX_STATEMENTS:
+                key = "other"
+                stats = _queries.setdefault(key, [0, 0.0, 0])
+            else:
+                stats = _queries[key] = [0, 0.0, 0]
+        stats[0] += calls
+        stats[1] += seconds
+        stats[2] += rows
+
+
+def record_slow_query(sql, seconds, rows):
+    entry = {'sql': normalize_sql(sql), 'ms': round(seconds * 1000, 3), 'rows': rows, 'at': time.time()}
+    with _lock:
+        _slow_queries.append(entry)
+    # logging is imported here, on the first slow query, rather than by every
+    # script that opens a CarDatabase
+    import logging
+    logging.getLogger(SLOW_QUERY_LOGGER).warning("Slow query (%.1f ms, %d rows): %s", entry['ms'], rows, entry['sql'])
+
+
+def query_stats():
+    # {sql: {'calls', 'seconds', 'rows'}}, slowest total first
+    with _lock:
+        items = [(sql, list(stats)) for sql, stats in _queries.items()]
+    items.sort(key=lambda item: item[1][1], reverse=True)
+    return {sql: {'calls': calls, 'seconds': seconds, 'rows': rows} for sql, (calls, seconds, rows) in items}
+
+
+def slow_queries():
+    with _lock:
+        return list(_slow_queries)
+
+
+def histogram(name, **labels):
+    # The Histogram for these labels, or None
+    with _lock:
+        return _histograms.get((name, tuple(sorted(labels.items()))))
+
+
+class TimedCursor:
+    # Wraps a sqlite3 cursor. execute() time and affected rows are recorded
+    # per statement, and fetch time/rows are added to the statement that
+    # produced them, so a SELECT's cost includes reading its results.
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._sql = None
+        self._seconds = 0.0
+        self._rows = 0
+        self._logged = False
+        self._iterated = 0.0
+        self._iterated_rows = 0
+
+    def execute(self, sql, params=()):
+        start = time.perf_counter()
+        self._cursor.execute(sql, params)
+        self._started(sql, time.perf_counter() - start)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        start = time.perf_counter()
+        self._cursor.executemany(sql, seq_of_params)
+        self._started(sql, time.perf_counter() - start)
+        return self
+
+    def executescript(self, script):
+        # Schema setup; not worth tracking
+        self._cursor.executescript(script)
+        return self
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(time.perf_counter() - start, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+        self._fetched(time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(time.perf_counter() - start, len(rows))
+        return rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        # Row-by-row reads are totalled locally and recorded once the
+        # result is exhausted (or the cursor runs its next statement)
+        start = time.perf_counter()
+        try:
+            row = next(self._cursor)
+        except StopIteration:
+            self._iterated += time.perf_counter() - start
+            self._flush_iterated()
+            raise
+        self._iterated += time.perf_counter() - start
+        self._iterated_rows += 1
+        return row
+
+    def __getattr__(self, name):
+        # lastrowid, rowcount, description, close, ...
+        return getattr(self._cursor, name)
+
+    def _flush_iterated(self):
+        if self._iterated_rows or self._iterated:
+            seconds, rows = self._iterated, self._iterated_rows
+            self._iterated, self._iterated_rows = 0.0, 0
+            self._fetched(seconds, rows)
+
+    def _started(self, sql, seconds):
+        self._flush_iterated()
+        rows = max(self._cursor.rowcount, 0)
+        self._sql, self._seconds, self._rows, self._logged = sql, seconds, rows, False
+        record_query(sql, seconds, rows)
+        self._check_slow()
+
+    def _fetched(self, seconds, rows):
+        if self._sql is None:
+            return
+        self._seconds += seconds
+        self._rows += rows
+        record_query(self._sql, seconds, rows, calls=0)
+        self._check_slow()
+
+    def _check_slow(self):
+        if (slow_query_ms is not None and not self._logged
+                and self._seconds * 1000 >= slow_query_ms):
+            self._logged = True
+            record_slow_query(self._sql, self._seconds, self._rows)
+
+
+def render_prometheus():
+    # All metrics in Prometheus text exposition format (version 0.0.4)
+    lines = [
+        "# HELP cars_db_queries_total SQL statements executed.",
+        "# TYPE cars_db_queries_total counter",
+    ]
+    stats = query_stats()
+    for sql, values in stats.items():
+        lines.append(f'cars_db_queries_total{{sql="{_escape(sql)}"}} {values["calls"]}')
+    lines += [
+        "# HELP cars_db_query_seconds_total Time spent executing and fetching, per statement.",
+        "# TYPE cars_db_query_seconds_total counter",
+    ]
+    for sql, values in stats.items():
+        lines.append(f'cars_db_query_seconds_total{{sql="{_escape(sql)}"}} {values["seconds"]:.6f}')
+    lines += [
+        "# HELP cars_db_query_rows_total Rows returned or changed, per statement.",
+        "# TYPE cars_db_query_rows_total counter",
+    ]
+    for sql, values in stats.items():
+        lines.append(f'cars_db_query_rows_total{{sql="{_escape(sql)}"}} {values["rows"]}')
+    lines += [
+        "# HELP cars_db_slow_queries Slow queries kept in the in-memory log.",
+        "# TYPE cars_db_slow_queries gauge",
+        f"cars_db_slow_queries {len(slow_queries())}",
+    ]
+
+    with _lock:
+        histograms = sorted(_histograms.items())
+        histograms = [(key, (list(h.counts), h.total, h.count)) for key, h in histograms]
+    described = set()
+    for (name, labels), (counts, total, count) in histograms:
+        if name not in described:
+            described.add(name)
+            lines.append(f"# TYPE {name} histogram")
+        label_text = ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels)
+        prefix = f"{label_text}," if label_text else ""
+        cumulative = 0
+        for bound, bucket in zip(BUCKETS, counts):
+            cumulative += bucket
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {count}')
+        suffix = f"{{{label_text}}}" if label_text else ""
+        lines.append(f"{name}_sum{suffix} {total:.6f}")
+        lines.append(f"{name}_count{suffix} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
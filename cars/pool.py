@@ -0,0 +1,152 @@
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from .database import CarDatabase
+
+
+class PoolTimeoutError(Exception):
+    # Raised when no connection becomes free within the pool timeout
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, db_name, size=5, timeout=10.0, wal=True):
+        # Pool of up to `size` CarDatabase connections to one database file.
+        # The schema is created once here, so pooled connections skip it.
+        self.db_name = db_name
+        self.size = size
+        self.timeout = timeout
+        self.wal = wal
+
+        setup = CarDatabase(db_name)
+        if wal:
+            setup.enable_wal()
+        setup.close()
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+        self._metrics = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'created': 0,
+            'discarded': 0,
+            'timeouts': 0,
+        }
+
+    def acquire(self):
+        # Check out a healthy connection, opening a new one if the pool has
+        # room, otherwise waiting up to `timeout` seconds for one to be freed
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        while True:
+            try:
+                db = self._idle.get_nowait()
+            except queue.Empty:
+                db = self._open_or_wait()
+            if self._is_healthy(db):
+                break
+            self._discard(db)
+        with self._lock:
+            self._metrics['checkouts'] += 1
+        return db
+
+    def release(self, db):
+        # Return a connection to the pool, discarding any unfinished transaction
+        try:
+            if db.conn.in_transaction:
+                db.conn.rollback()
+        except sqlite3.Error:
+            self._discard(db)
+            return
+        if self._closed:
+            self._discard(db)
+        else:
+            self._idle.put(db)
+
+    @contextmanager
+    def connection(self):
+        # with pool.connection() as db: ...
+        db = self.acquire()
+        try:
+            yield db
+        finally:
+            self.release(db)
+
+    def stats(self):
+        # Snapshot of pool metrics
+        with self._lock:
+            stats = dict(self._metrics)
+            stats['size'] = self.size
+            stats['open'] = self._created
+        stats['idle'] = self._idle.qsize()
+        stats['in_use'] = stats['open'] - stats['idle']
+        stats['avg_wait_ms'] = (
+            stats['wait_time'] * 1000 / stats['waits'] if stats['waits'] else 0.0
+        )
+        return stats
+
+    def close(self):
+        # Close every idle connection; checked-out ones close on release
+        self._closed = True
+        while True:
+            try:
+                db = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(db)
+
+    def _open_or_wait(self):
+        with self._lock:
+            can_open = self._created < self.size
+            if can_open:
+                self._created += 1
+                self._metrics['created'] += 1
+        if can_open:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        start = time.perf_counter()
+        try:
+            db = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._lock:
+                self._metrics['timeouts'] += 1
+            raise PoolTimeoutError(
+                f"No database connection free after {self.timeout}s (pool size {self.size})"
+            )
+        with self._lock:
+            self._metrics['waits'] += 1
+            self._metrics['wait_time'] += time.perf_counter() - start
+        return db
+
+    def _connect(self):
+        db = CarDatabase(self.db_name, create_schema=False, check_same_thread=False)
+        if self.wal:
+            # journal_mode is stored in the file; synchronous is per connection
+            db.cursor.execute('PRAGMA synchronous=NORMAL')
+        return db
+
+    def _is_healthy(self, db):
+        try:
+            db.conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, db):
+        try:
+            db.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+            self._metrics['discarded'] += 1
@@ -0,0 +1,245 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import quote
+from .database import CarDatabase
+
+# Read replicas: the writer publishes consistent, read-only copies of the
+# database into a directory, and reader processes open the newest one with
+# mode=ro&immutable=1, so their reads take no locks and never wait on the
+# writer.
+#
+# Directory layout:
+#   cars-<generation>-<ns>.db  one file per publish, never modified
+#   CURRENT                    name of the newest file, replaced atomically
+#
+# A reader switches to a new generation by opening the new file; old files
+# are deleted once `keep` newer ones exist (connections still open on a
+# deleted file keep working on POSIX systems).
+POINTER = "CURRENT"
+
+
+class ReplicaError(Exception):
+    # Raised when no replica has been published yet
+    pass
+
+
+def publish(db_name, replica_dir, keep=3, force=False):
+    # Copy db_name into a new generation file using the sqlite backup API
+    # (a consistent snapshot, even while other connections write) and point
+    # CURRENT at it. Returns the new file's path, or None if the database
+    # hasn't changed since the last publish (unless force=True).
+    os.makedirs(replica_dir, exist_ok=True)
+    source = sqlite3.connect(db_name)
+    try:
+        generation = source.execute(
+            'SELECT generation FROM cars_generation WHERE id = 1'
+        ).fetchone()[0]
+        current = current_name(replica_dir)
+        if not force and current is not None and current.startswith(f"cars-{generation}-"):
+            return None
+        # Unique per publish, so a published file is never overwritten
+        name = f"cars-{generation}-{time.time_ns()}.db"
+        path = os.path.join(replica_dir, name)
+
+        tmp = os.path.join(replica_dir, f".tmp-{name}")
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        target = sqlite3.connect(tmp)
+        try:
+            source.backup(target)
+            # A self-contained rollback-journal file: immutable readers
+            # must never look for a -wal file
+            target.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+    _fsync(tmp)
+    os.replace(tmp, path)
+    _write_pointer(replica_dir, name)
+    _prune(replica_dir, keep)
+    return path
+
+
+def current_name(replica_dir):
+    # File name of the newest published generation, or None
+    try:
+        with open(os.path.join(replica_dir, POINTER)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def replica_uri(path):
+    # Read-only, immutable URI: sqlite skips locking and change detection
+    return f"file:{quote(os.path.abspath(path))}?mode=ro&immutable=1"
+
+
+def _write_pointer(replica_dir, name):
+    tmp = os.path.join(replica_dir, f".tmp-{POINTER}")
+    with open(tmp, "w") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(replica_dir, POINTER))
+
+
+def _fsync(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _prune(replica_dir, keep):
+    # Delete all but the `keep` newest generations
+    generations = []
+    for name in os.listdir(replica_dir):
+        if name.startswith("cars-") and name.endswith(".db"):
+            try:
+                generations.append((int(name[:-3].rsplit("-", 1)[1]), name))
+            except ValueError:
+                continue
+    generations.sort()  # by publish time
+    for _, name in generations[:-keep]:
+        os.remove(os.path.join(replica_dir, name))
+
+
+class ReplicaPublisher:
+    # Publishes a new generation every `interval` seconds (when the
+    # database has changed) on a background thread. Run exactly one per
+    # database, next to the writer: `python -m cars.replica publish`.
+    def __init__(self, db_name, replica_dir, interval=5.0, keep=3):
+        self.db_name = db_name
+        self.replica_dir = replica_dir
+        self.interval = interval
+        self.keep = keep
+        self.published = 0
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def publish(self):
+        path = publish(self.db_name, self.replica_dir, keep=self.keep)
+        if path is not None:
+            self.published += 1
+        return path
+
+    def start(self):
+        self.publish()
+        self._thread = threading.Thread(target=self._run, name="cars-replica-publisher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.publish()
+                self.last_error = None
+            except (sqlite3.Error, OSError) as e:
+                # Keep serving the previous generation; try again next time
+                self.last_error = e
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class ReplicaReader:
+    # Hands out read-only CarDatabase connections on the newest published
+    # generation, one per thread. CURRENT is re-read at most every
+    # `check_interval` seconds; when it names a new file, the thread's next
+    # connection() opens that file and closes the old one, so a request
+    # always sees one consistent generation.
+    def __init__(self, replica_dir, check_interval=1.0):
+        self.replica_dir = replica_dir
+        self.check_interval = check_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._name = None
+        self._checked = 0.0
+        self.swaps = 0
+
+    def current(self):
+        # Newest generation's file name (cached for check_interval seconds)
+        now = time.monotonic()
+        if self._name is None or now - self._checked >= self.check_interval:
+            with self._lock:
+                name = current_name(self.replica_dir)
+                if name is None:
+                    raise ReplicaError(f"No replica published in {self.replica_dir}")
+                self._name, self._checked = name, now
+        return self._name
+
+    def connection(self):
+        # This thread's connection on the current generation
+        name = self.current()
+        local = self._local
+        if getattr(local, "name", None) != name:
+            old = getattr(local, "db", None)
+            try:
+                local.db = self._open(name)
+            except sqlite3.OperationalError:
+                # Pruned between reading CURRENT and opening it: re-read
+                self._name = None
+                name = self.current()
+                local.db = self._open(name)
+            local.name = name
+            if old is not None:
+                old.close()
+                self.swaps += 1
+        return local.db
+
+    def _open(self, name):
+        return CarDatabase(replica_uri(os.path.join(self.replica_dir, name)),
+                           create_schema=False, uri=True)
+
+    def close(self):
+        # Close this thread's connection
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+            self._local.name = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m cars.replica",
+        description="Publish read-only replica snapshots of a car database."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish_parser = commands.add_parser("publish", help="publish now, or every --interval seconds")
+    publish_parser.add_argument("--db", default="cars.db")
+    publish_parser.add_argument("--dir", default="replica", help="replica directory")
+    publish_parser.add_argument("--interval", type=float, help="keep publishing every N seconds")
+    publish_parser.add_argument("--keep", type=int, default=3, help="generations to keep")
+    status_parser = commands.add_parser("status", help="show the current generation")
+    status_parser.add_argument("--dir", default="replica", help="replica directory")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        name = current_name(args.dir)
+        print(f"Current replica: {name}" if name else f"No replica published in {args.dir}")
+        return
+
+    path = publish(args.db, args.dir, keep=args.keep)
+    print(f"Published {path}" if path else "Replica is up to date")
+    if args.interval:
+        publisher = ReplicaPublisher(args.db, args.dir, interval=args.interval, keep=args.keep)
+        print(f"Publishing every {args.interval:g}s, Ctrl+C to stop")
+        publisher.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            publisher.stop()
+
+
+if __name__ == "__main__":
+    main()
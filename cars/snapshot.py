@@ -0,0 +1,232 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from .batch import CarBatch
+from .car import Car
+from .feeds import new_file_mode
+
+# File layout (little-endian):
+#   header   see HEADER below; offsets are from the start of the file
+#   ids      int64   x count
+#   years    int32   x count
+#   prices   float64 x count
+#   brands   uint32  x count   (codes into the string table)
+#   models   uint32  x count   (codes into the string table)
+#   strings  uint32 offsets x (string_count + 1), then UTF-8 bytes
+# Each section starts on an 8-byte boundary. The checksum is the CRC-32 of
+# everything after the header.
+MAGIC = b"CARSNAP\0"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIQIIQQQQQQI4x")
+COLUMNS = (("ids", "q"), ("years", "i"), ("prices", "d"), ("brand_codes", "I"), ("model_codes", "I"))
+
+
+class SnapshotError(Exception):
+    # Raised for files that are not valid snapshots
+    pass
+
+
+def write_snapshot(batch, filename):
+    # Write a CarBatch as a snapshot file (atomically: temp file + rename).
+    # Brands and models share one string table; model codes are shifted
+    # past the brand strings.
+    strings = batch.brands + batch.models
+    model_codes = array("I", (code + len(batch.brands) for code in batch.model_codes))
+    columns = [batch.ids, batch.years, batch.prices, batch.brand_codes, model_codes]
+
+    encoded = [value.encode("utf-8") for value in strings]
+    string_offsets = array("I", [0])
+    for value in encoded:
+        string_offsets.append(string_offsets[-1] + len(value))
+
+    sections = [_le_bytes(column) for column in columns]
+    sections.append(_le_bytes(string_offsets) + b"".join(encoded))
+
+    offsets = []
+    body = bytearray()
+    for section in sections:
+        body += b"\0" * (-(HEADER.size + len(body)) % 8)
+        offsets.append(HEADER.size + len(body))
+        body += section
+
+    header = HEADER.pack(MAGIC, VERSION, 0, 0, len(batch), len(strings), 0,
+                         *offsets, zlib.crc32(body))
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".snap")
+    try:
+        os.fchmod(fd, new_file_mode())
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, filename)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return len(batch)
+
+
+class Snapshot:
+    def __init__(self, filename, verify=True):
+        # Memory-map a snapshot. Columns are zero-copy memoryviews over the
+        # mapping; Car objects and strings are only created when a row is
+        # read. verify=True checks the CRC-32 of the whole file.
+        self.filename = filename
+        with open(filename, "rb") as f:
+            # mmap refuses empty files, so check the length before mapping
+            if os.fstat(f.fileno()).st_size < HEADER.size:
+                raise SnapshotError(f"{self.filename} is too short to be a snapshot")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._load(verify)
+        except Exception:
+            self._mmap.close()
+            raise
+
+    def _load(self, verify):
+        if len(self._mmap) < HEADER.size:
+            raise SnapshotError(f"{self.filename} is too short to be a snapshot")
+        (magic, version, _, _, count, string_count, _,
+         ids_at, years_at, prices_at, brands_at, models_at, strings_at,
+         checksum) = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise SnapshotError(f"{self.filename} is not a car snapshot")
+        if version != VERSION:
+            raise SnapshotError(f"Unsupported snapshot version {version}")
+        if verify:
+            # Checksum the mapping in place; slicing the mmap would copy it
+            with memoryview(self._mmap) as view:
+                with view[HEADER.size:] as body:
+                    valid = zlib.crc32(body) == checksum
+            if not valid:
+                raise SnapshotError(f"{self.filename} is corrupt (checksum mismatch)")
+        if sys.byteorder != "little":
+            raise SnapshotError("Snapshots can only be mapped on little-endian machines")
+
+        # Without verify a truncated file is only caught by these bounds
+        sections = [(start, struct.calcsize(code) * count) for (_, code), start
+                    in zip(COLUMNS, (ids_at, years_at, prices_at, brands_at, models_at))]
+        sections.append((strings_at, 4 * (string_count + 1)))
+        if any(start + size > len(self._mmap) for start, size in sections):
+            raise SnapshotError(f"{self.filename} is truncated")
+        strings_end, = struct.unpack_from("<I", self._mmap, strings_at + 4 * string_count)
+        if strings_at + 4 * (string_count + 1) + strings_end > len(self._mmap):
+            raise SnapshotError(f"{self.filename} is truncated")
+
+        view = memoryview(self._mmap)
+        self._views = [view]
+        self.count = count
+        for (name, code), start in zip(COLUMNS, (ids_at, years_at, prices_at, brands_at, models_at)):
+            size = struct.calcsize(code) * count
+            column = view[start:start + size].cast(code)
+            self._views.append(column)
+            setattr(self, name, column)
+        offsets_size = 4 * (string_count + 1)
+        self._string_offsets = view[strings_at:strings_at + offsets_size].cast("I")
+        self._views.append(self._string_offsets)
+        self._strings_at = strings_at + offsets_size
+        self._strings = [None] * string_count
+
+    def string(self, code):
+        # Decode one string-table entry (cached after first use)
+        value = self._strings[code]
+        if value is None:
+            start = self._strings_at + self._string_offsets[code]
+            end = self._strings_at + self._string_offsets[code + 1]
+            value = self._strings[code] = self._mmap[start:end].decode("utf-8")
+        return value
+
+    def car(self, index):
+        # Materialize the Car for one row
+        return Car(self.string(self.brand_codes[index]), self.string(self.model_codes[index]),
+                   self.years[index], self.prices[index])
+
+    def to_batch(self):
+        # Copy into an in-memory CarBatch
+        batch = CarBatch()
+        for index in range(self.count):
+            batch.append(self.ids[index], self.string(self.brand_codes[index]),
+                         self.string(self.model_codes[index]), self.years[index],
+                         self.prices[index])
+        return batch
+
+    def close(self):
+        # Release the column views, then the mapping
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("Snapshot index out of range")
+        return self.ids[index], self.car(index)
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self.ids[index], self.car(index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _le_bytes(column):
+    # Raw little-endian bytes of an array
+    if sys.byteorder == "little":
+        return column.tobytes()
+    swapped = array(column.typecode, column)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+def convert(source, destination):
+    # Build a snapshot from a car database (.db) or any feed file that
+    # Inventory can load (.json, .ndjson, .csv, optionally compressed).
+    # Returns the number of cars written.
+    if source.endswith((".db", ".sqlite", ".sqlite3")):
+        from .database import open_read_only
+        db = open_read_only(source)
+        try:
+            batch = db.get_all_cars(as_batch=True)
+        finally:
+            db.close()
+    else:
+        from .feeds import iter_file
+        batch = CarBatch()
+        for car_id, car in enumerate(iter_file(source), 1):
+            batch.append(car_id, car.brand, car.model, car.year, car.price)
+    return write_snapshot(batch, destination)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m cars.snapshot",
+        description="Convert a car database or JSON/CSV feed into a binary snapshot."
+    )
+    parser.add_argument("source", help="cars.db or a .json/.ndjson/.csv feed")
+    parser.add_argument("destination", help="snapshot file to write, e.g. cars.snap")
+    args = parser.parse_args(argv)
+    try:
+        count = convert(args.source, args.destination)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    print(f"Wrote {count:,} cars to {args.destination}")
+
+
+if __name__ == "__main__":
+    main()
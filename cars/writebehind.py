@@ -0,0 +1,200 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from .database import CarDatabase
+
+_STOP = object()
+
+
+class WriteQueueFullError(Exception):
+    # Raised when the write queue stays full for longer than put_timeout
+    pass
+
+
+class WriteBehindQueue:
+    # Opt-in write-behind mode for high insert rates. Callers enqueue writes
+    # and get a concurrent.futures.Future back straight away; one background
+    # thread owns the sqlite connection and commits whatever has queued up
+    # as one transaction, every max_delay_ms or max_batch writes, whichever
+    # comes first. A write is durable once its future resolves. The queue
+    # is bounded: when it is full, callers block for up to put_timeout
+    # seconds and then get WriteQueueFullError (backpressure).
+    def __init__(self, db_name, max_batch=500, max_delay_ms=20, max_queue=10000, put_timeout=5.0):
+        self.db_name = db_name
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        # Set by the writer thread once it takes nothing more off the queue
+        self._stopped = False
+        self._close_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+        self.failed = 0
+        self.rejected = 0
+        self.largest_batch = 0
+        self.commit_time = 0.0
+        self._ready = Future()
+        self._thread = threading.Thread(target=self._run, name="cars-write-behind", daemon=True)
+        self._thread.start()
+        self._ready.result()  # schema errors surface here, not on first write
+
+    def add_car(self, car):
+        # Future resolving to the new car's id
+        return self._submit('_insert', car)
+
+    def update_car(self, car_id, expected_version=None, **fields):
+        # Future resolving to False if no car has this id (or raising
+        # StaleCarError / ValueError)
+        return self._submit('_update', car_id, expected_version, fields)
+
+    def delete_car(self, car_id):
+        # Future resolving to False if no car has this id
+        return self._submit('_delete', car_id)
+
+    def apply_changes(self, create=(), update=(), delete=()):
+        # Future for an all-or-nothing group, as in CarDatabase.apply_changes
+        return self._submit('_apply', list(create), list(update), list(delete))
+
+    def _submit(self, op, *args):
+        if self._closed:
+            raise RuntimeError("WriteBehindQueue is closed")
+        future = Future()
+        try:
+            self._put((op, args, future), self.put_timeout)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise WriteQueueFullError(
+                f"Write queue full ({self._queue.maxsize} pending) for {self.put_timeout}s"
+            )
+        return future
+
+    def _put(self, item, timeout):
+        self._queue.put(item, timeout=timeout)
+        with self._close_lock:
+            if self._stopped:
+                # close() won the race and the writer has already exited
+                self._fail_pending()
+
+    def _fail_pending(self):
+        while True:
+            try:
+                _, _, future = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if future is not None and not future.done():
+                future.set_exception(RuntimeError("WriteBehindQueue is closed"))
+
+    def flush(self, timeout=None):
+        # Block until everything queued so far is committed
+        if self._closed:
+            return
+        marker = Future()
+        self._put(('_flush', (), marker), timeout)
+        try:
+            marker.result(timeout)
+        except RuntimeError:
+            pass  # closed meanwhile, which commits everything anyway
+
+    def close(self, timeout=None):
+        # Stop accepting writes, commit what is queued and stop the thread
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put((_STOP, (), None))
+        self._thread.join(timeout)
+
+    def stats(self):
+        # Batching counters for monitoring and benchmarks
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'writes': self.writes,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'largest_batch': self.largest_batch,
+                'avg_batch': round(self.writes / self.batches, 2) if self.batches else 0.0,
+                'avg_commit_ms': round(self.commit_time / self.batches * 1000, 3) if self.batches else 0.0,
+                'queued': self._queue.qsize(),
+            }
+
+    def _run(self):
+        # Writer thread: wait for one write, then keep collecting until the
+        # batch is full or max_delay has passed since that first write
+        try:
+            db = CarDatabase(self.db_name)
+            db.enable_wal()
+        except Exception as e:
+            self._ready.set_exception(e)
+            return
+        self._ready.set_result(None)
+
+        stopping = False
+        try:
+            while not stopping:
+                batch = [self._queue.get()]
+                deadline = time.monotonic() + self.max_delay
+                while len(batch) < self.max_batch and batch[-1][0] not in ('_flush', _STOP):
+                    remaining = deadline - time.monotonic()
+                    try:
+                        item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+                stopping = batch[-1][0] is _STOP
+                self._commit(db, [item for item in batch if item[0] not in ('_flush', _STOP)])
+                if batch[-1][0] == '_flush':
+                    batch[-1][2].set_result(None)
+            # close() was called: writes that raced it are still committed,
+            # and any put after this fails its own future (see _put)
+            leftovers = []
+            with self._close_lock:
+                while True:
+                    try:
+                        leftovers.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                self._stopped = True
+            self._commit(db, [item for item in leftovers if item[0] not in ('_flush', _STOP)])
+            for item in leftovers:
+                if item[0] == '_flush':
+                    item[2].set_result(None)
+        finally:
+            with self._close_lock:
+                self._stopped = True
+                self._fail_pending()
+            db.close()
+
+    def _commit(self, db, batch):
+        if not batch:
+            return
+        start = time.perf_counter()
+        try:
+            results = db.run_writes([(op, args) for op, args, _ in batch])
+        except Exception as e:
+            results = [(False, e)] * len(batch)
+        elapsed = time.perf_counter() - start
+        failed = 0
+        for (ok, value), (_, _, future) in zip(results, batch):
+            if ok:
+                future.set_result(value)
+            else:
+                failed += 1
+                future.set_exception(value)
+        with self._lock:
+            self.batches += 1
+            self.writes += len(batch)
+            self.failed += failed
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self.commit_time += elapsed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
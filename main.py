@@ -1,12 +1,16 @@
+import argparse
+import sys
 from cars.car import Car
-from cars.database import CarDatabase
+from cars import cli, metrics
+
+DB_NAME = "cars.db"
 
 def show_menu():
     # Display menu options
     print("\n===== Car Inventory Menu =====")
     print("1. Add a car")
     print("2. View all cars")
-    print("3. Search cars by brand")
+    print("3. Search cars by brand/model")
     print("4. Filter by year")
     print("5. Filter by price range")
     print("6. Delete a car")
@@ -27,6 +31,28 @@ def add_car(db):
         db.add_car(car)
     except ValueError:
         print("Invalid year or price. Please enter valid values.")
+        return
+    check_catalog(brand, model)
+
+def check_catalog(brand, model):
+    # Warn about brands/models the local catalog doesn't know (if synced)
+    from cars.catalog import Catalog
+    catalog = Catalog(DB_NAME)
+    try:
+        if catalog.is_empty():
+            return
+        result = catalog.check(brand, model)
+        if result['brand'] is None:
+            print(f"Warning: '{brand}' is not a known brand.", end=" ")
+            suggestions = result['brand_suggestions']
+        elif result['model'] is None:
+            print(f"Warning: '{model}' is not a known {result['brand']} model.", end=" ")
+            suggestions = result['model_suggestions']
+        else:
+            return
+        print(f"Did you mean {', '.join(suggestions)}?" if suggestions else "")
+    finally:
+        catalog.close()
 
 def view_all_cars(db):
     # Display all cars
@@ -38,16 +64,16 @@ def view_all_cars(db):
     for car_id, car in cars:
         print(f"ID {car_id}: {car.get_info()}")
 
-def search_by_brand(db):
-    # Search cars by brand
-    print("\n--- Search Cars by Brand ---")
-    brand = input("Enter brand: ")
-    cars = db.search_by_brand(brand)
+def search_cars(db):
+    # Full-text search on brand and model (e.g. "bmw x5")
+    print("\n--- Search Cars by Brand/Model ---")
+    text = input("Enter brand and/or model: ")
+    cars = db.search(text)
     if not cars:
-        print(f"No cars found for '{brand}'")
+        print(f"No cars found for '{text}'")
         return
-    for car in cars:
-        print(car.get_info())
+    for car_id, car in cars:
+        print(f"ID {car_id}: {car.get_info()}")
 
 def filter_by_year(db):
     # Filter cars by year 
@@ -56,8 +82,7 @@ def filter_by_year(db):
 
     try:
         year = int(year)
-        cars = db.get_all_cars()
-        filtered = [(car_id, car) for car_id, car in cars if car.year == year]
+        filtered = db.find_by_year(year)
         if not filtered:
             print(f"No cars found from year {year}")
             return
@@ -75,8 +100,7 @@ def filter_by_price(db):
     try:
         min_price = float(min_price)
         max_price = float(max_price)
-        cars = db.get_all_cars()
-        filtered = [(car_id, car) for car_id, car in cars if min_price <= car.price <= max_price]
+        filtered = db.find_by_price_range(min_price, max_price)
 
         if not filtered:
             print(f"No cars found between ${min_price:,.2f} and ${max_price:,.2f}")
@@ -97,9 +121,54 @@ def delete_car(db):
     except ValueError:
         print("Invalid ID. Please enter a valid number.")
 
-def main():
-    # Main program loop
-    db = CarDatabase("cars.db")
+def main(argv=None):
+    # With a command (list, search, add, delete, stats) run it and exit,
+    # e.g. `python main.py list --year 2020 --json`; otherwise start the menu
+    parser = argparse.ArgumentParser(description="Car inventory menu")
+    # A plain flag: with an optional FILE value, `--profile stats` would
+    # swallow the command name
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="profile the session with cProfile and print the top functions "
+             "and SQL statements on exit"
+    )
+    parser.add_argument("--profile-out", metavar="FILE",
+                        help="profile, but save the raw cProfile stats to FILE instead")
+    cli.add_commands(parser.add_subparsers(dest="command"))
+    args = parser.parse_args(argv)
+    session = (lambda: cli.run(args, DB_NAME)) if args.command else run_menu
+    if not (args.profile or args.profile_out):
+        return session()
+
+    # Profiling modules are only loaded when asked for
+    import cProfile
+    metrics.enable()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return session()
+    finally:
+        profiler.disable()
+        print_profile(profiler, args.profile_out)
+
+def print_profile(profiler, filename=None):
+    # Dump cProfile stats and per-statement SQL timings for the session
+    import pstats
+    if filename:
+        profiler.dump_stats(filename)
+        print(f"\nProfile saved to {filename} (view with: python -m pstats {filename})")
+        return
+    print("\n===== Profile (top 20 by cumulative time) =====")
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+    print("===== SQL statements (by total time) =====")
+    for sql, stats in list(metrics.query_stats().items())[:10]:
+        print(f"{stats['seconds'] * 1000:9.2f} ms {stats['calls']:6} calls {stats['rows']:8} rows  {sql[:80]}")
+
+def run_menu():
+    # Main program loop. sqlite3 and the database layer are imported here,
+    # not at the top, so `main.py --help` and the commands start faster
+    from cars.database import CarDatabase
+    db = CarDatabase(DB_NAME)
 
     while True:
         show_menu()
@@ -110,7 +179,7 @@ def main():
         elif choice == "2":
             view_all_cars(db)
         elif choice == "3":
-            search_by_brand(db)
+            search_cars(db)
         elif choice == "4":
             filter_by_year(db)
         elif choice == "5":
@@ -126,4 +195,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,738 @@
+"""
+Test script for Car Inventory Flask Application
+Exercises the web routes through Flask's test client
+"""
+
+from cars.car import Car
+from cars.database import CarDatabase
+from app import app, close_pool, get_write_queue
+import os
+
+TEST_DB = "test_app.db"
+# Batch bodies both API front ends must reject with a 400
+BAD_BATCHES = [
+    {"create": 5},
+    {"update": 5},
+    {"delete": 3},
+    {"update": [{"id": True, "price": 1}]},
+    {"update": [{"id": 1, "version": "x", "price": 1}]},
+    {"update": [{"id": 1, "version": False, "price": 1}]},
+    {"delete": [True]},
+]
+
+
+def make_client(cars=()):
+    """Point the app at a fresh test database and return a test client"""
+    cleanup()
+    db = CarDatabase(TEST_DB)
+    for car in cars:
+        db.add_car(car)
+    db.close()
+    app.config['DATABASE'] = TEST_DB
+    app.config['TESTING'] = True
+    return app.test_client()
+
+
+def cleanup():
+    """Close pooled connections and remove the test database"""
+    close_pool()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(TEST_DB + suffix):
+            os.remove(TEST_DB + suffix)
+
+
+def test_index_pagination():
+    """Test keyset pagination and streaming on the home page"""
+    print("=" * 50)
+    print("TEST 1: Index Pagination")
+    print("=" * 50)
+
+    client = make_client(Car("Brand", f"Model{i}", 2000 + i, 1000 * i) for i in range(1, 8))
+
+    # First page
+    page = client.get("/?limit=3").get_data(as_text=True)
+    assert "Model1" in page and "Model3" in page and "Model4" not in page
+    assert "after=3" in page and "before=" not in page
+    print("✓ First page shows 3 cars and a next link")
+
+    # Middle page
+    page = client.get("/?after=3&limit=3").get_data(as_text=True)
+    assert "Model4" in page and "Model6" in page and "Model3" not in page
+    assert "before=4" in page and "after=6" in page
+    print("✓ Middle page has previous and next links")
+
+    # Going back
+    page = client.get("/?before=4&limit=3").get_data(as_text=True)
+    assert "Model1" in page and "Model3" in page and "Model4" not in page
+    print("✓ Previous link returns the earlier page")
+
+    # Stats cover the whole inventory, not just the page
+    assert "$28,000" in page
+    print("✓ Statistics cover the whole inventory")
+
+    # Streamed response
+    response = client.get("/?stream=1")
+    assert response.is_streamed
+    body = response.get_data(as_text=True)
+    assert all(f"Model{i}" in body for i in range(1, 8))
+    print("✓ Streaming mode renders every car")
+
+    cleanup()
+    print("✅ All pagination tests passed!\n")
+
+
+def test_connection_pool():
+    """Test pooled connections across requests and threads"""
+    print("=" * 50)
+    print("TEST 2: Connection Pool")
+    print("=" * 50)
+
+    from cars.pool import ConnectionPool, PoolTimeoutError
+    import threading
+
+    client = make_client([Car("Audi", "A4", 2022, 45000)])
+
+    # Requests reuse pooled connections instead of opening new ones
+    for _ in range(5):
+        assert client.get("/").status_code == 200
+    stats = client.get("/health/pool").get_json()
+    assert stats["open"] == 1 and stats["checkouts"] >= 5
+    assert stats["in_use"] == 0
+    print(f"✓ Requests share one pooled connection: {stats}")
+
+    cleanup()
+
+    # Pool caps open connections and times out when exhausted
+    pool = ConnectionPool(TEST_DB, size=2, timeout=0.05)
+    first, second = pool.acquire(), pool.acquire()
+    try:
+        pool.acquire()
+        assert False, "pool handed out more connections than its size"
+    except PoolTimeoutError:
+        print("✓ Exhausted pool raises PoolTimeoutError")
+    pool.release(first)
+    pool.release(second)
+
+    # Connections are used safely from several threads
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(20):
+                with pool.connection() as db:
+                    db.get_stats()
+        except Exception as e:
+            errors.append(e)
+
+    pool.timeout = 5
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors
+    stats = pool.stats()
+    assert stats["open"] <= 2 and stats["checkouts"] == 122
+    print(f"✓ Pool works across threads: {stats['checkouts']} checkouts, {stats['waits']} waits")
+
+    # Broken connections are replaced by the health check
+    db = pool.acquire()
+    db.close()
+    pool.release(db)
+    db = pool.acquire()
+    assert db.get_stats()["total_cars"] == 0
+    pool.release(db)
+    print("✓ Health check replaces closed connections")
+
+    pool.close()
+    cleanup()
+    print("✅ All connection pool tests passed!\n")
+
+
+def test_edit_car():
+    """Test that editing keeps the car ID and detects conflicts"""
+    print("=" * 50)
+    print("TEST 3: Edit Car")
+    print("=" * 50)
+
+    client = make_client([Car("BMW", "X5", 2022, 65000), Car("Audi", "A4", 2022, 45000)])
+
+    # GET shows the current car and its version
+    page = client.get("/edit/1").get_data(as_text=True)
+    assert 'value="X5"' in page and 'name="version" value="1"' in page
+    print("✓ Edit form loads the car by ID")
+
+    # POST updates in place
+    form = {"brand": "BMW", "model": "X7", "year": "2023", "price": "90000", "version": "1"}
+    response = client.post("/edit/1", data=form)
+    assert response.status_code == 302
+    db = CarDatabase(TEST_DB)
+    assert db.get_car(1).model == "X7"
+    assert [car_id for car_id, _ in db.get_all_cars()] == [1, 2]
+    db.close()
+    print("✓ Editing keeps the car ID")
+
+    # Resubmitting the old form is rejected
+    form["price"] = "1"
+    response = client.post("/edit/1", data=form)
+    assert response.headers["Location"].endswith("/edit/1")
+    db = CarDatabase(TEST_DB)
+    assert db.get_car(1).price == 90000
+    db.close()
+    print("✓ Stale edits are rejected")
+
+    # Unknown cars redirect home
+    assert client.get("/edit/999").status_code == 302
+    print("✓ Missing car handled")
+
+    cleanup()
+    print("✅ All edit tests passed!\n")
+
+
+def test_catalog_endpoints():
+    """Test the autocomplete endpoints and add-form validation"""
+    print("=" * 50)
+    print("TEST 4: Catalog Endpoints")
+    print("=" * 50)
+
+    from cars.catalog import Catalog
+    from test_cli import FixtureClient
+
+    client = make_client()
+
+    # Before a sync the catalog is empty and nothing is flagged
+    assert client.get("/api/catalog/makes?q=ho").get_json()["matches"] == []
+    client.post("/add", data={"brand": "Hodna", "model": "Civic", "year": "2020", "price": "1"})
+    with client.session_transaction() as session:
+        assert all(category != "warning" for category, _ in session.get("_flashes", []))
+    print("✓ Empty catalog never blocks or warns")
+
+    catalog = Catalog(TEST_DB)
+    catalog.sync(FixtureClient())
+    catalog.close()
+
+    data = client.get("/api/catalog/makes?q=ho").get_json()
+    assert data["matches"] == ["HONDA"]
+    data = client.get("/api/catalog/makes?q=hnoda").get_json()
+    assert data["matches"] == [] and data["suggestions"] == ["HONDA"]
+    data = client.get("/api/catalog/models?make=bmw&q=x").get_json()
+    assert data["matches"] == ["X3", "X5"]
+    print("✓ Autocomplete endpoints return matches and suggestions")
+
+    client.post("/add", data={"brand": "Hodna", "model": "Civic", "year": "2020", "price": "1"})
+    with client.session_transaction() as session:
+        warnings = [message for category, message in session["_flashes"] if category == "warning"]
+    assert warnings and "HONDA" in warnings[0]
+    print("✓ Unknown brands are flagged with a suggestion")
+
+    page = client.get("/add").get_data(as_text=True)
+    assert "brand-options" in page
+    print("✓ Add form wires up autocomplete")
+
+    cleanup()
+    print("✅ All catalog endpoint tests passed!\n")
+
+
+def test_page_cache():
+    """Test cached pages, conditional requests and invalidation"""
+    print("=" * 50)
+    print("TEST 5: Page Cache")
+    print("=" * 50)
+
+    from app import page_cache
+    from cars.cache import CacheBackend, MemoryCache, FileCache
+    import shutil
+
+    client = make_client([Car("Audi", "A4", 2022, 45000)])
+    page_cache.clear()
+    before = page_cache.stats()
+
+    # Second identical request is a cache hit with the same ETag
+    first = client.get("/?limit=10")
+    second = client.get("/?limit=10")
+    assert first.get_data() == second.get_data()
+    assert first.headers["ETag"] == second.headers["ETag"]
+    stats = page_cache.stats()
+    assert stats["hits"] == before["hits"] + 1
+    print("✓ Repeated requests are served from the cache")
+
+    # Conditional request returns 304
+    response = client.get("/?limit=10", headers={"If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 304 and response.get_data() == b""
+    print("✓ Unchanged pages return 304 Not Modified")
+
+    # Last-Modified is whole seconds, so it alone can't prove a page is fresh
+    response = client.get("/?limit=10", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert response.status_code == 200
+
+    # A write bumps the generation and invalidates the page
+    client.post("/add", data={"brand": "Kia", "model": "Rio", "year": "2020", "price": "9000"})
+    client.get("/")  # consumes the flash message
+    response = client.get("/?limit=10", headers={"If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 200 and "Rio" in response.get_data(as_text=True)
+    print("✓ Writes invalidate cached pages")
+
+    # Search results are cached by normalized form parameters
+    form = {"search_type": "year", "year": "2022"}
+    client.post("/search", data=form)
+    hits = page_cache.stats()["hits"]
+    response = client.post("/search", data=form)
+    assert page_cache.stats()["hits"] == hits + 1 and "A4" in response.get_data(as_text=True)
+    print("✓ Search results are cached")
+
+    assert client.get("/health/cache").get_json()["enabled"]
+    cleanup()
+
+    # Backends implement the whole CacheBackend interface
+    try:
+        CacheBackend()
+        assert False, "Should raise TypeError"
+    except TypeError:
+        pass
+
+    # Backends: LRU eviction, TTL expiry and the filesystem backend
+    cache = MemoryCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+    cache = MemoryCache(ttl=-1)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    directory = "test_page_cache"
+    cache = FileCache(directory, max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, key.upper())
+    assert len(cache) == 2 and cache.get("c") == "C"
+    expired = FileCache(directory, ttl=-1)
+    expired.set("old", 1)
+    assert expired.get("old") is None and expired.get("c") == "C" and len(cache) == 2
+    print("✓ Expired files are deleted when read")
+
+    # Two workers evicting from one directory at once don't trip over each other
+    import threading
+    workers = [FileCache(directory, max_entries=20) for _ in range(2)]
+    errors = []
+
+    def fill(worker, prefix):
+        try:
+            for i in range(200):
+                worker.set(f"{prefix}{i}", i)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=fill, args=(worker, n)) for n, worker in enumerate(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors and len(workers[0]) <= 40
+    shutil.rmtree(directory)
+    print("✓ Memory and filesystem backends evict and expire entries")
+
+    print("✅ All page cache tests passed!\n")
+
+
+def test_json_api():
+    """Test the /api/v1/cars JSON API"""
+    print("=" * 50)
+    print("TEST 6: JSON API")
+    print("=" * 50)
+
+    import gzip
+    import json
+
+    client = make_client([
+        Car("BMW", "X5", 2022, 65000),
+        Car("BMW", "M3", 2023, 75000),
+        Car("Audi", "A4", 2022, 45000),
+        Car("Toyota", "Camry", 2021, 28000),
+        Car("Honda", "Civic", 2020, 22000),
+    ])
+
+    # Keyset pagination with a sort and projection
+    url = "/api/v1/cars?sort=-price&fields=model,price&limit=2"
+    seen = []
+    while url:
+        body = client.get(url).get_json()
+        assert all(set(item) == {"model", "price"} for item in body["data"])
+        seen.extend(item["model"] for item in body["data"])
+        cursor = body["next_cursor"]
+        url = f"/api/v1/cars?sort=-price&fields=model,price&limit=2&cursor={cursor}" if cursor else None
+    assert seen == ["M3", "X5", "A4", "Camry", "Civic"]
+    print("✓ Sorted keyset pagination with field projection works")
+
+    # Filters
+    body = client.get("/api/v1/cars?brand=bmw&year_min=2023").get_json()
+    assert [item["model"] for item in body["data"]] == ["M3"]
+    body = client.get("/api/v1/cars?price_min=25000&price_max=50000&fields=id").get_json()
+    assert body["data"] == [{"id": 3}, {"id": 4}]
+    assert client.get("/api/v1/cars?sort=secret").status_code == 400
+    assert client.get("/api/v1/cars?fields=password").status_code == 400
+    from cars.apiargs import encode_cursor
+    for sort, cursor in (("year", 3), ("id", [2022, 1]), ("price", [1, 2, 3]), ("price", [[1], 2]),
+                         ("price", [1000, "x"])):
+        response = client.get(f"/api/v1/cars?sort={sort}&cursor={encode_cursor(cursor)}")
+        assert response.status_code == 400, (sort, cursor)
+    assert client.get("/api/v1/cars?cursor=%%%").status_code == 400
+    assert client.get("/api/v1/cars/1?fields=brand").get_json() == {"brand": "BMW"}
+    assert client.get("/api/v1/cars/99").status_code == 404
+    print("✓ Filters, single-car lookup and validation work")
+
+    # NDJSON export, plain and gzipped
+    response = client.get("/api/v1/cars?format=ndjson&fields=id,brand")
+    assert response.is_streamed
+    lines = response.get_data(as_text=True).splitlines()
+    assert len(lines) == 5
+    assert json.loads(lines[0]) == {"id": 1, "brand": "BMW"}
+    response = client.get("/api/v1/cars?format=ndjson", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(gzip.decompress(response.get_data()).splitlines()) == 5
+    print("✓ NDJSON export streams (optionally gzipped)")
+
+    # Large JSON responses are gzipped
+    response = client.get("/api/v1/cars", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    app.config['API_GZIP_MIN_SIZE'] = 100
+    response = client.get("/api/v1/cars", headers={"Accept-Encoding": "gzip"})
+    app.config['API_GZIP_MIN_SIZE'] = 1024
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(json.loads(gzip.decompress(response.get_data()))["data"]) == 5
+    print("✓ JSON responses are gzip-compressed")
+
+    # Batch writes are all-or-nothing
+    batch = {
+        "create": [{"brand": "Kia", "model": "Rio", "year": 2019, "price": 9000}],
+        "update": [{"id": 1, "version": 1, "price": 60000}],
+        "delete": [5]
+    }
+    body = client.post("/api/v1/cars/batch", json=batch).get_json()
+    assert body == {"created": [6], "updated": 1, "deleted": 1}
+    assert client.get("/api/v1/cars/1").get_json()["price"] == 60000
+    stale = {"create": [{"brand": "Kia", "model": "Soul", "year": 2020, "price": 1}],
+             "update": [{"id": 1, "version": 1, "price": 1}]}
+    assert client.post("/api/v1/cars/batch", json=stale).status_code == 409
+    assert client.post("/api/v1/cars/batch", json={"delete": [5]}).status_code == 404
+    assert client.post("/api/v1/cars/batch", json={"create": [{"brand": "X"}]}).status_code == 400
+    for price in ("NaN", "Infinity"):
+        response = client.post("/api/v1/cars/batch", data=f'{{"create": [{{"brand": "Kia", "model": "Rio", '
+                               f'"year": 2020, "price": {price}}}]}}', content_type="application/json")
+        assert response.status_code == 400
+    for bad in BAD_BATCHES:
+        response = client.post("/api/v1/cars/batch", json=bad)
+        assert response.status_code == 400 and "error" in response.get_json(), bad
+    ids = [item["id"] for item in client.get("/api/v1/cars?fields=id").get_json()["data"]]
+    assert ids == [1, 2, 3, 4, 6]
+    print("✓ Batch create/update/delete runs in one transaction")
+
+    # Unexpected errors on API routes are JSON, not a redirect to /
+    import app as app_module
+    get_read_db = app_module.get_read_db
+    app_module.get_read_db = lambda: 1 / 0
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+    try:
+        response = client.get("/api/v1/cars")
+        assert response.status_code == 500 and response.get_json() == {"error": "Internal server error"}
+    finally:
+        app_module.get_read_db = get_read_db
+        app.config['PROPAGATE_EXCEPTIONS'] = None
+    print("✓ API errors are reported as JSON")
+
+    cleanup()
+    print("✅ All JSON API tests passed!\n")
+
+
+def test_asgi_api():
+    """Test the ASGI entry point backed by AsyncCarDatabase"""
+    print("=" * 50)
+    print("TEST 7: ASGI API")
+    print("=" * 50)
+
+    import asyncio
+    import json
+    import asgi
+
+    make_client([Car("BMW", "X5", 2022, 65000), Car("Audi", "A4", 2021, 45000)])
+    asgi.DATABASE = TEST_DB
+
+    async def call(method, path, query="", body=None):
+        sent = []
+        payload = json.dumps(body).encode() if body is not None else b""
+
+        async def receive():
+            return {"type": "http.request", "body": payload, "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": method, "path": path, "query_string": query.encode()}
+        await asgi.application(scope, receive, send)
+        return sent[0]["status"], json.loads(sent[1]["body"])
+
+    async def scenario():
+        status, body = await call("GET", "/api/v1/cars", "sort=-price&fields=model&limit=1")
+        assert status == 200 and body["data"] == [{"model": "X5"}] and body["next_cursor"]
+        status, body = await call("GET", "/api/v1/cars", f"sort=-price&fields=model&cursor={body['next_cursor']}")
+        assert body["data"] == [{"model": "A4"}] and body["next_cursor"] is None
+        from cars.apiargs import encode_cursor
+        for sort, cursor in (("year", 3), ("id", [2022, 1]), ("price", [1, 2, 3]), ("price", [[1], 2])):
+            status, body = await call("GET", "/api/v1/cars", f"sort={sort}&cursor={encode_cursor(cursor)}")
+            assert status == 400 and body["error"] == "Invalid cursor", (sort, cursor)
+        status, body = await call("GET", "/api/v1/cars/2", "fields=brand,year")
+        assert (status, body) == (200, {"brand": "Audi", "year": 2021})
+        print("✓ List and detail endpoints match the Flask API")
+
+        # Concurrent batch posts are committed together
+        results = await asyncio.gather(*(
+            call("POST", "/api/v1/cars/batch", body={"create": [{"brand": "Kia", "model": f"K{i}", "year": 2020, "price": 9000}]})
+            for i in range(5)
+        ))
+        assert all(status == 200 for status, _ in results)
+        assert sorted(body["created"][0] for _, body in results) == [3, 4, 5, 6, 7]
+        assert asgi.get_db().stats()["largest_batch"] == 5
+        print("✓ Concurrent batch posts share one write transaction")
+
+        assert (await call("GET", "/api/v1/cars/99"))[0] == 404
+        assert (await call("GET", "/api/v1/cars", "sort=model"))[0] == 400
+        assert (await call("POST", "/api/v1/cars/batch", body={"delete": [99]}))[0] == 404
+        for bad in BAD_BATCHES:
+            assert (await call("POST", "/api/v1/cars/batch", body=bad))[0] == 400, bad
+        print("✓ Errors map to the same status codes")
+        await asgi.close_db()
+
+    asyncio.run(scenario())
+    cleanup()
+    print("✅ All ASGI tests passed!\n")
+
+
+def test_write_behind_mode():
+    """Test /add and the batch API with write-behind mode on"""
+    print("=" * 50)
+    print("TEST 8: Write-Behind Mode")
+    print("=" * 50)
+
+    client = make_client()
+    assert client.get("/health/writes").get_json() == {"enabled": False}
+    app.config['WRITE_BEHIND'] = True
+    try:
+        response = client.post("/add", data={"brand": "BMW", "model": "X5", "year": "2022", "price": "65000"})
+        assert response.status_code == 302
+        body = client.post("/api/v1/cars/batch", json={"create": [{"brand": "Kia", "model": "Rio", "year": 2020, "price": 9000}]}).get_json()
+        assert body["created"] == [2]
+        assert client.post("/api/v1/cars/batch", json={"delete": [99]}).status_code == 404
+        stats = client.get("/health/writes").get_json()
+        assert stats["enabled"] and stats["writes"] == 3 and stats["failed"] == 1
+        print("✓ Writes go through the queue and are visible once acknowledged")
+
+        assert "Rio" in client.get("/").get_data(as_text=True)
+        print("✓ Acknowledged writes are committed")
+
+        # A commit slower than WRITE_BEHIND_TIMEOUT is reported as queued
+        app.config['WRITE_BEHIND_TIMEOUT'] = 0
+        response = client.post("/add", data={"brand": "Audi", "model": "A4", "year": "2021", "price": "45000"})
+        assert response.status_code == 202 and "will appear shortly" in response.get_data(as_text=True)
+        response = client.post("/api/v1/cars/batch", json={"delete": [1]})
+        assert response.status_code == 202 and response.get_json()["pending"] is True
+        get_write_queue().flush()
+        assert client.get("/api/v1/cars?fields=model").get_json()["data"] == [{"model": "Rio"}, {"model": "A4"}]
+        print("✓ Write timeouts return 202 and the writes still commit")
+    finally:
+        app.config['WRITE_BEHIND'] = False
+        app.config['WRITE_BEHIND_TIMEOUT'] = 10
+        cleanup()
+    print("✅ All write-behind mode tests passed!\n")
+
+
+def test_metrics_endpoint():
+    """Test route/template latency histograms and /metrics"""
+    print("=" * 50)
+    print("TEST 9: Metrics Endpoint")
+    print("=" * 50)
+
+    from cars import metrics
+
+    assert "disabled" in make_client().get("/metrics").get_data(as_text=True)
+    cleanup()
+    metrics.enable()
+    try:
+        client = make_client([Car("BMW", "X5", 2022, 65000)])
+        client.get("/")
+        client.get("/api/v1/cars/1")
+        client.get("/api/v1/cars/99")
+        text = client.get("/metrics").get_data(as_text=True)
+        assert 'cars_http_request_seconds_count{method="GET",route="/",status="200"} 1' in text
+        assert 'route="/api/v1/cars/<int:car_id>",status="404"' in text
+        assert 'cars_template_render_seconds_count{template="index.html"} 1' in text
+        assert 'cars_db_queries_total{sql="SELECT id, brand, model, year, price, version FROM cars WHERE id = ?"} 2' in text
+        print("✓ /metrics reports routes, templates and queries")
+    finally:
+        metrics.disable()
+        metrics.reset()
+        cleanup()
+    print("✅ All metrics endpoint tests passed!\n")
+
+
+def test_read_replica_mode():
+    """Test serving read-only views from a published replica"""
+    print("=" * 50)
+    print("TEST 10: Read-Replica Mode")
+    print("=" * 50)
+
+    import shutil
+    from cars.replica import publish
+
+    replica_dir = "test_app_replica"
+    shutil.rmtree(replica_dir, ignore_errors=True)
+    client = make_client([Car("BMW", "X5", 2022, 65000)])
+    publish(TEST_DB, replica_dir)
+    app.config['READ_REPLICA_DIR'] = replica_dir
+    app.config['READ_REPLICA_CHECK_INTERVAL'] = 0
+    try:
+        client.post("/add", data={"brand": "Audi", "model": "A4", "year": "2021", "price": "45000"})
+        body = client.get("/api/v1/cars").get_json()
+        assert [car["model"] for car in body["data"]] == ["X5"]
+        print("✓ Reads come from the replica, writes go to the primary")
+
+        publish(TEST_DB, replica_dir)
+        body = client.get("/api/v1/cars").get_json()
+        assert [car["model"] for car in body["data"]] == ["X5", "A4"]
+        assert "A4" in client.get("/").get_data(as_text=True)
+        print("✓ A new publish is picked up without restarting")
+    finally:
+        app.config['READ_REPLICA_DIR'] = None
+        cleanup()
+        shutil.rmtree(replica_dir, ignore_errors=True)
+    print("✅ All read-replica mode tests passed!\n")
+
+
+def test_reports_page():
+    """Test the inventory reports page"""
+    print("=" * 50)
+    print("TEST 11: Reports Page")
+    print("=" * 50)
+
+    client = make_client([
+        Car("Toyota", "Camry", 2022, 25000),
+        Car("Ford", "Mustang", 1969, 45000),
+    ])
+    page = client.get("/reports").get_data(as_text=True)
+    assert "Value by Brand" in page and "Price Percentiles by Year" in page
+    assert "Toyota" in page and "$45,000" in page and "50.0%" in page
+    print("✓ Reports page renders every report")
+
+    client.post("/add", data={"brand": "Kia", "model": "Rio", "year": "2020", "price": "9000"})
+    assert "Kia" in client.get("/reports").get_data(as_text=True)
+    print("✓ Reports are recomputed after a write")
+
+    cleanup()
+    print("✅ All reports page tests passed!\n")
+
+
+def test_change_feed():
+    """Test /changes and the SSE /stream endpoint"""
+    print("=" * 50)
+    print("TEST 12: Change Feed")
+    print("=" * 50)
+
+    import asyncio
+    import threading
+    import asgi
+
+    client = make_client([Car("BMW", "X5", 2022, 65000)])
+    asgi.DATABASE = TEST_DB
+    assert client.get("/changes").get_json() == {'changes': [], 'last_seq': 1, 'more': False}
+    client.post("/edit/1", data={"brand": "BMW", "model": "X5", "year": "2022", "price": "60000", "version": "1"})
+    client.get("/delete/1")
+    body = client.get("/changes?since=0&limit=2").get_json()
+    assert [(c['kind'], c['id']) for c in body['changes']] == [('insert', 1), ('update', 1)]
+    assert body['changes'][1]['car']['price'] == 60000 and body['more']
+    body = client.get(f"/changes?since={body['last_seq']}").get_json()
+    assert body == {'changes': [body['changes'][0]], 'last_seq': 3, 'more': False}
+    assert body['changes'][0]['kind'] == 'delete' and body['changes'][0]['car'] is None
+    assert client.get("/changes?since=x").status_code == 400
+    print("✓ /changes returns the deltas after a seq")
+
+    clients = 200
+
+    async def listen(since, received, disconnect):
+        async def receive():
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            received.append(message.get("body", b"").decode())
+
+        scope = {"type": "http", "method": "GET", "path": "/stream",
+                 "query_string": f"since={since}".encode() if since is not None else b"", "headers": []}
+        await asgi.application(scope, receive, send)
+
+    async def scenario():
+        asgi.get_feed().poll_interval = 0.01
+        disconnect = asyncio.Event()
+        await asgi.get_feed().last_seq()
+        threads = threading.active_count()
+        streams = [[] for _ in range(clients)]
+        tasks = [asyncio.ensure_future(listen(None, received, disconnect)) for received in streams]
+        replay = []
+        tasks.append(asyncio.ensure_future(listen(1, replay, disconnect)))
+        while asgi.get_feed().waiting < clients + 1:
+            await asyncio.sleep(0.01)
+        # At most the database's reader pool, however many clients
+        assert threading.active_count() <= threads + asgi.DB_READERS
+        print(f"✓ {clients} idle streams share one poller and no extra threads")
+
+        await asgi.get_db().add_car(Car("Kia", "Rio", 2020, 9000))
+        while not all("event: add" in "".join(received) for received in streams):
+            await asyncio.sleep(0.01)
+        event = "".join(streams[0])
+        assert "id: 4\nevent: add\n" in event and '"model": "Rio"' in event
+        assert "event: update" in "".join(replay) and "event: delete" in "".join(replay)
+        print("✓ Every stream gets the new event; ?since replays missed ones")
+
+        disconnect.set()
+        await asyncio.gather(*tasks)
+        await asgi.close_db()
+
+    asyncio.run(scenario())
+    cleanup()
+    print("✅ All change feed tests passed!\n")
+
+
+def run_all_tests():
+    """Run all tests"""
+    print("\n" + "=" * 50)
+    print("RUNNING WEB APPLICATION TEST SUITE")
+    print("=" * 50 + "\n")
+
+    try:
+        test_index_pagination()
+        test_connection_pool()
+        test_edit_car()
+        test_catalog_endpoints()
+        test_page_cache()
+        test_json_api()
+        test_asgi_api()
+        test_write_behind_mode()
+        test_metrics_endpoint()
+        test_read_replica_mode()
+        test_reports_page()
+        test_change_feed()
+
+        print("=" * 50)
+        print("🎉 ALL TESTS PASSED SUCCESSFULLY!")
+        print("=" * 50)
+
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+    except Exception as e:
+        print(f"\n❌ UNEXPECTED ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    run_all_tests()
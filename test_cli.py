@@ -142,6 +142,16 @@ def test_inventory_json():
     inv2.load_from_file(test_file)
     assert len(inv2.cars) == 2
     print(f"✓ load_from_file() works: Loaded {len(inv2.cars)} cars")
+
+    # cars is a read-only view; changes go through add_car()/remove()
+    try:
+        inv2.cars.append(Car("Kia", "Rio", 2019, 9000))
+        assert False, "Should raise AttributeError"
+    except AttributeError:
+        pass
+    inv2.add_car(Car("Kia", "Rio", 2019, 9000))
+    assert len(inv2.cars) == 3
+    print("✓ cars is a live read-only view")
     
     # Cleanup
     os.remove(test_file)
@@ -156,26 +166,39 @@ def test_api():
     print("TEST 4: API Integration")
     print("=" * 50)
     
+    import tempfile
+    from cars import api
     from cars.api import fetch_car_makes, fetch_models_by_make
-    
-    # Test fetch_car_makes
-    try:
-        makes = fetch_car_makes()
-        assert isinstance(makes, list)
-        assert len(makes) > 0
-        print(f"✓ fetch_car_makes() works: Got {len(makes)} manufacturers")
-    except Exception as e:
-        print(f"⚠ API test skipped (no internet?): {e}")
-        return
-    
-    # Test fetch_models_by_make
+
+    # The shared client caches in a temporary directory, not the cwd
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["VPIC_CACHE"] = os.path.join(tmp.name, "vpic_cache.db")
     try:
-        models = fetch_models_by_make("honda")
-        assert isinstance(models, list)
-        print(f"✓ fetch_models_by_make() works: Got {len(models)} Honda models")
-    except Exception as e:
-        print(f"⚠ Model fetch failed: {e}")
-    
+        # Test fetch_car_makes
+        try:
+            makes = fetch_car_makes()
+            assert isinstance(makes, list)
+            assert len(makes) > 0
+            print(f"✓ fetch_car_makes() works: Got {len(makes)} manufacturers")
+        except Exception as e:
+            print(f"⚠ API test skipped (no internet?): {e}")
+            return
+
+        # Test fetch_models_by_make
+        try:
+            models = fetch_models_by_make("honda")
+            assert isinstance(models, list)
+            print(f"✓ fetch_models_by_make() works: Got {len(models)} Honda models")
+        except Exception as e:
+            print(f"⚠ Model fetch failed: {e}")
+    finally:
+        if api._default_client is not None:
+            api._default_client.close()
+            api._default_client = None
+        del os.environ["VPIC_CACHE"]
+        tmp.cleanup()
+    assert not os.path.exists("vpic_cache.db")
+
     print("✅ All API tests passed!\n")
 
 
@@ -223,6 +246,1402 @@ def test_edge_cases():
     print("✅ All edge case tests passed!\n")
 
 
+def test_query_filters():
+    """Test SQL-side year/price/brand filtering"""
+    print("=" * 50)
+    print("TEST 6: Query Filters")
+    print("=" * 50)
+
+    test_db = "test_query.db"
+    if os.path.exists(test_db):
+        os.remove(test_db)
+
+    db = CarDatabase(test_db)
+    db.add_car(Car("BMW", "M3", 2023, 75000))
+    db.add_car(Car("BMW", "X5", 2022, 65000))
+    db.add_car(Car("Audi", "A4", 2022, 45000))
+    db.add_car(Car("Toyota", "Camry", 2021, 28000))
+
+    # Test find_by_year
+    cars = db.find_by_year(2022)
+    assert [car.model for _, car in cars] == ["X5", "A4"]
+    assert all(car_id > 0 for car_id, _ in cars)
+    print(f"✓ find_by_year() works: {len(cars)} cars from 2022")
+
+    # Test find_by_price_range (inclusive, sorted by price)
+    cars = db.find_by_price_range(28000, 65000)
+    assert [car.price for _, car in cars] == [28000, 45000, 65000]
+    print(f"✓ find_by_price_range() works: {len(cars)} cars found")
+
+    # Test combined query
+    cars = db.query(brand="bmw", year_range=(2022, None), order_by="price")
+    assert [car.model for _, car in cars] == ["X5", "M3"]
+    cars = db.query(order_by="year", limit=2, offset=1)
+    assert [car.year for _, car in cars] == [2022, 2022]
+    print("✓ query() works with brand, ranges, ordering and paging")
+
+    # Test invalid sort column is rejected
+    try:
+        db.query(order_by="price; DROP TABLE cars")
+        assert False, "query() accepted an unknown order_by"
+    except ValueError:
+        print("✓ query() rejects unknown order_by")
+
+    # Test indexes are in place
+    db.cursor.execute("EXPLAIN QUERY PLAN SELECT id FROM cars WHERE year = 2022")
+    plan = " ".join(str(row[-1]) for row in db.cursor.fetchall())
+    assert "idx_cars_year" in plan
+    print("✓ Year filter uses idx_cars_year")
+
+    db.close()
+    os.remove(test_db)
+
+    print("✅ All query filter tests passed!\n")
+
+
+def test_inventory_stats():
+    """Test the trigger-maintained statistics summary"""
+    print("=" * 50)
+    print("TEST 7: Inventory Statistics")
+    print("=" * 50)
+
+    test_db = "test_stats.db"
+    if os.path.exists(test_db):
+        os.remove(test_db)
+
+    db = CarDatabase(test_db)
+
+    # Empty inventory
+    stats = db.get_stats()
+    assert stats == {'total_cars': 0, 'total_value': 0, 'avg_price': 0,
+                     'newest_year': 0, 'oldest_year': 0}
+    print("✓ Empty inventory statistics are zero")
+
+    # Triggers keep the summary current
+    db.add_car(Car("Ford", "Mustang", 1969, 45000))
+    db.add_car(Car("Tesla", "Model 3", 2023, 42000))
+    db.add_car(Car("BMW", "X5", 2022, 63000))
+    db.delete_car(3)
+    db.cursor.execute("UPDATE cars SET price = 40000 WHERE id = 2")
+    db.conn.commit()
+    stats = db.get_stats()
+    assert stats['total_cars'] == 2
+    assert stats['total_value'] == 85000
+    assert stats['avg_price'] == 42500
+    assert stats['newest_year'] == 2023 and stats['oldest_year'] == 1969
+    print(f"✓ Statistics follow inserts, deletes and updates: {stats}")
+
+    # Consistency check and rebuild
+    assert db.check_stats()
+    db.cursor.execute("UPDATE car_stats SET total_cars = 99")
+    db.conn.commit()
+    assert not db.check_stats(repair=True)
+    assert db.check_stats()
+    assert db.get_stats()['total_cars'] == 2
+    print("✓ check_stats() detects and repairs drift")
+
+    db.close()
+
+    # Reopening keeps the summary (no reseeding)
+    db = CarDatabase(test_db)
+    assert db.get_stats()['total_cars'] == 2
+    db.close()
+    os.remove(test_db)
+
+    print("✅ All statistics tests passed!\n")
+
+
+def test_bulk_ingest():
+    """Test batched inserts and streaming feed readers"""
+    print("=" * 50)
+    print("TEST 8: Bulk Ingest")
+    print("=" * 50)
+
+    from cars.inventory import Inventory
+    from cars.feeds import iter_json, iter_csv, iter_file
+    from cars.ingest import ingest
+
+    test_db = "test_ingest.db"
+    test_json = "test_feed.json"
+    test_csv = "test_feed.csv"
+    for path in (test_db, test_json, test_csv):
+        if os.path.exists(path):
+            os.remove(path)
+
+    # add_cars takes a generator and commits per batch
+    db = CarDatabase(test_db)
+    count = db.add_cars((Car("Kia", f"Rio {i}", 2015, 9000 + i) for i in range(25)), batch_size=10)
+    assert count == 25
+    assert db.get_stats()['total_cars'] == 25
+    print(f"✓ add_cars() works: {count} cars in batches of 10")
+    db.close()
+
+    # JSON arrays written by Inventory are read item by item, even when an
+    # item straddles a chunk boundary
+    inv = Inventory()
+    for i in range(50):
+        inv.add_car(Car("Honda", f"Civic {i}", 2000 + i % 20, 15000.5 + i))
+    inv.save_to_file(test_json)
+    cars = list(iter_json(test_json, chunk_size=7))
+    assert len(cars) == 50
+    assert cars[49].model == "Civic 49" and cars[49].price == 15049.5
+    print(f"✓ iter_json() streams {len(cars)} cars")
+
+    # A malformed item fails where it is, not at the end of the file
+    from cars import feeds
+    bad_json = "test_bad_feed.json"
+    with open(bad_json, "w") as f:
+        f.write('[{"brand": "Kia", "model": "Rio", "year": 2019, "price": 9000},\n'
+                ' {"brand": "Kia", "model": "Rio", year: 2019}' + ',\n{}' * 1000 + ']')
+    try:
+        list(iter_json(bad_json, chunk_size=16))
+        assert False, "malformed item was accepted"
+    except ValueError as e:
+        assert "invalid JSON at character 98" in str(e), e
+    with open(bad_json, "w") as f:
+        f.write('[{"brand": "' + "x" * 5000)
+    item_size, feeds.MAX_ITEM_SIZE = feeds.MAX_ITEM_SIZE, 1000
+    try:
+        list(iter_json(bad_json, chunk_size=64))
+        assert False, "oversized item was accepted"
+    except ValueError as e:
+        assert "over 1,000 characters" in str(e), e
+    finally:
+        feeds.MAX_ITEM_SIZE = item_size
+    os.remove(bad_json)
+    print("✓ Malformed and oversized items are reported")
+
+    # CSV feeds
+    with open(test_csv, "w") as f:
+        f.write("brand,model,year,price\nAudi,A4,2022,45000\nBMW,M3,2023,75000.50\n")
+    cars = list(iter_csv(test_csv))
+    assert [car.year for car in cars] == [2022, 2023]
+    assert cars[1].price == 75000.5
+    assert len(list(iter_file(test_csv))) == 2
+    print("✓ iter_csv() works")
+
+    # End-to-end ingest
+    rows, elapsed = ingest(test_json, test_db, batch_size=16, fast=True)
+    assert rows == 50
+    db = CarDatabase(test_db)
+    assert db.get_stats()['total_cars'] == 75
+    db.close()
+    print(f"✓ ingest() works: {rows} rows in {elapsed:.3f}s")
+
+    for path in (test_db, test_json, test_csv):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    print("✓ Cleanup successful")
+
+    print("✅ All bulk ingest tests passed!\n")
+
+
+def test_full_text_search():
+    """Test FTS5 brand/model search"""
+    print("=" * 50)
+    print("TEST 9: Full-Text Search")
+    print("=" * 50)
+
+    test_db = "test_search.db"
+    if os.path.exists(test_db):
+        os.remove(test_db)
+
+    db = CarDatabase(test_db)
+    db.add_car(Car("BMW", "X5", 2022, 65000))
+    db.add_car(Car("BMW", "M3", 2023, 75000))
+    db.add_car(Car("Tesla", "Model 3", 2023, 42000))
+    db.add_car(Car("Škoda", "Octavia", 2020, 22000))
+
+    # Multi-term query matches brand and model together
+    results = db.search("bmw x5")
+    assert [car.model for _, car in results] == ["X5"]
+    assert results[0][0] == 1
+    print("✓ Multi-term search works: 'bmw x5'")
+
+    # Prefix matching and case-insensitivity
+    assert len(db.search("bm")) == 2
+    assert [car.brand for _, car in db.search("tes mod")] == ["Tesla"]
+    assert [car.brand for _, car in db.search("skoda")] == ["Škoda"]
+    print("✓ Prefix and accent-insensitive search works")
+
+    # Index follows updates and deletes
+    db.cursor.execute("UPDATE cars SET model = 'X7' WHERE id = 1")
+    db.conn.commit()
+    assert db.search("x5") == []
+    assert len(db.search("x7")) == 1
+    db.delete_car(2)
+    assert [car.model for _, car in db.search("bmw")] == ["X7"]
+    print("✓ Search index stays in sync with the cars table")
+
+    # Limit and empty queries
+    assert len(db.search("bmw tesla")) == 0
+    assert db.search("  ") == []
+    assert len(db.search("3", limit=1)) == 1
+    db.add_cars(Car("Kia", f"Rio {i}", 2015, 9000) for i in range(60))
+    assert len(db.search("kia")) == 60 and len(db.search("kia", limit=10)) == 10
+    print("✓ Limits and empty queries handled")
+
+    db.close()
+    os.remove(test_db)
+
+    print("✅ All full-text search tests passed!\n")
+
+
+def test_update_car():
+    """Test primary-key lookup and in-place updates"""
+    print("=" * 50)
+    print("TEST 10: Update Car")
+    print("=" * 50)
+
+    from cars.database import StaleCarError
+
+    test_db = "test_update.db"
+    if os.path.exists(test_db):
+        os.remove(test_db)
+
+    db = CarDatabase(test_db)
+    db.add_car(Car("BMW", "X5", 2022, 65000))
+    db.add_car(Car("Audi", "A4", 2022, 45000))
+
+    # Test get_car
+    car = db.get_car(2)
+    assert car.brand == "Audi" and car.price == 45000
+    assert db.get_car(999) is None
+    print("✓ get_car() works")
+
+    # Test update_car keeps the id and bumps the version
+    car, version = db.get_car_with_version(1)
+    assert version == 1
+    assert db.update_car(1, expected_version=version, model="X7", price=80000)
+    car, version = db.get_car_with_version(1)
+    assert (car.model, car.price, version) == ("X7", 80000, 2)
+    assert [car_id for car_id, _ in db.get_all_cars()] == [1, 2]
+    assert db.get_stats()['total_value'] == 125000
+    print("✓ update_car() updates in place and bumps the version")
+
+    # Test stale version is rejected and nothing changes
+    try:
+        db.update_car(1, expected_version=1, price=1)
+        assert False, "update_car() accepted a stale version"
+    except StaleCarError:
+        pass
+    assert db.get_car(1).price == 80000
+    print("✓ Stale updates raise StaleCarError")
+
+    # Test missing cars and unknown fields
+    assert db.update_car(999, price=1) is False
+    try:
+        db.update_car(1, id=5)
+        assert False, "update_car() accepted an unknown column"
+    except ValueError:
+        pass
+    print("✓ Missing cars and unknown fields handled")
+
+    db.close()
+    os.remove(test_db)
+
+    print("✅ All update tests passed!\n")
+
+
+def test_car_batch():
+    """Test slotted Car and columnar CarBatch results"""
+    print("=" * 50)
+    print("TEST 11: Columnar Results")
+    print("=" * 50)
+
+    from cars.batch import CarBatch
+
+    # Car has no per-instance __dict__
+    car = Car("Toyota", "Camry", 2022, 25000)
+    assert not hasattr(car, "__dict__")
+    print("✓ Car uses __slots__")
+
+    test_db = "test_batch.db"
+    if os.path.exists(test_db):
+        os.remove(test_db)
+
+    db = CarDatabase(test_db)
+    db.add_car(Car("BMW", "X5", 2022, 65000))
+    db.add_car(Car("BMW", "M3", 2023, 75000))
+    db.add_car(Car("Audi", "A4", 2022, 45000))
+
+    # Batch gives the same rows as the list form
+    batch = db.get_all_cars(as_batch=True)
+    assert isinstance(batch, CarBatch) and len(batch) == 3
+    as_list = [(car_id, car.get_info()) for car_id, car in db.get_all_cars()]
+    assert [(car_id, car.get_info()) for car_id, car in batch] == as_list
+    print("✓ get_all_cars(as_batch=True) matches the list result")
+
+    # Strings are stored once, numbers in typed arrays
+    assert batch.brands == ["BMW", "Audi"]
+    assert list(batch.brand_codes) == [0, 0, 1]
+    assert batch.column("brand") == ["BMW", "BMW", "Audi"]
+    assert list(batch.column("year")) == [2022, 2023, 2022]
+    assert batch[-1][1].model == "A4" and batch[0][0] == 1
+    print("✓ Columns are dictionary-encoded and typed")
+
+    # Query methods can return batches too
+    batch = db.find_by_year(2022, as_batch=True)
+    assert list(batch.ids) == [1, 3]
+    batch = db.query(brand="bmw", order_by="price", as_batch=True)
+    assert list(batch.prices) == [65000.0, 75000.0]
+    print("✓ Query methods return CarBatch on request")
+
+    db.close()
+    os.remove(test_db)
+
+    print("✅ All columnar result tests passed!\n")
+
+
+def test_bulk_discount():
+    """Test set-based repricing with audit and undo"""
+    print("=" * 50)
+    print("TEST 12: Bulk Discounts")
+    print("=" * 50)
+
+    from cars.inventory import Inventory
+
+    test_db = "test_discount.db"
+    if os.path.exists(test_db):
+        os.remove(test_db)
+
+    db = CarDatabase(test_db)
+    db.add_car(Car("BMW", "X5", 2019, 60000))
+    db.add_car(Car("BMW", "M3", 2023, 80000))
+    db.add_car(Car("Audi", "A4", 2019, 40000))
+
+    # "10% off all 2019 BMWs" in one UPDATE
+    change_id, count = db.apply_discount(10, brand="bmw", year_range=(2019, 2019))
+    assert count == 1
+    assert db.get_car(1).price == 54000
+    assert db.get_car(2).price == 80000 and db.get_car(3).price == 40000
+    assert db.get_stats()['total_value'] == 174000
+    print("✓ apply_discount() reprices only matching cars")
+
+    # Audit log records the run
+    changes = db.get_price_changes()
+    assert changes[0]['id'] == change_id and changes[0]['cars'] == 1
+    assert changes[0]['filters']['brand'] == "bmw"
+    print("✓ Bulk runs are recorded in the audit log")
+
+    # Undo restores the old prices exactly once
+    assert db.undo_price_change(change_id) == 1
+    assert db.get_car(1).price == 60000
+    assert db.undo_price_change(change_id) == 0
+    assert db.get_price_changes()[0]['undone_at'] is not None
+    print("✓ undo_price_change() restores prices")
+
+    # Columnar and in-memory versions
+    batch = db.get_all_cars(as_batch=True)
+    assert batch.apply_discount(50, year_range=(2019, None), price_range=(None, 50000)) == 1
+    assert list(batch.prices) == [60000, 80000, 20000]
+    assert batch.apply_discount(10) == 3
+    assert batch.prices[1] == 72000
+    inv = Inventory()
+    for _, car in db.get_all_cars():
+        inv.add_car(car)
+    assert inv.apply_discount(25, brand="BMW") == 2
+    assert [car.price for car in inv.cars] == [45000, 60000, 40000]
+    print("✓ CarBatch and Inventory discounts work")
+
+    # Out-of-range percentages are rejected
+    try:
+        db.apply_discount(150)
+        assert False, "apply_discount() accepted 150%"
+    except ValueError:
+        print("✓ Invalid percentages rejected")
+
+    db.close()
+    os.remove(test_db)
+
+    print("✅ All bulk discount tests passed!\n")
+
+
+def test_api_client():
+    """Test the vPIC client against a local stub server"""
+    print("=" * 50)
+    print("TEST 13: API Client")
+    print("=" * 50)
+
+    from cars.api import VpicClient, ApiError
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    import json
+    import threading
+
+    requests_seen = []
+    failures = {"/api/vehicles/getmodelsformake/flaky": 2}
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            requests_seen.append((path, self.client_address[1]))
+            if failures.get(path, 0) > 0:
+                failures[path] -= 1
+                self.reply(503, {"Message": "busy"})
+            elif path == "/api/vehicles/getallmakes":
+                self.reply(200, {"Results": [{"Make_Name": f"MAKE{i}"} for i in range(25)]})
+            elif path.startswith("/api/vehicles/getmodelsformake/"):
+                make = path.rsplit("/", 1)[1]
+                self.reply(200, {"Results": [{"Model_Name": f"{make}-{i}"} for i in range(8)]})
+            else:
+                self.reply(404, {"Message": "not found"})
+
+        def reply(self, status, data):
+            body = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/api/vehicles"
+    import tempfile
+    tmp = tempfile.TemporaryDirectory()
+    cache_file = os.path.join(tmp.name, "vpic_cache.db")
+
+    try:
+        client = VpicClient(base_url, cache_path=cache_file, backoff=0.01, max_workers=4)
+
+        # Full results, no truncation
+        makes = client.get_all_makes()
+        assert len(makes) == 25
+        assert len(client.get_models_for_make("honda")) == 8
+        print(f"✓ Client returns all {len(makes)} makes")
+
+        # Keep-alive: both requests used one connection
+        ports = {port for _, port in requests_seen}
+        assert len(ports) == 1
+        print("✓ Requests reuse a keep-alive connection")
+
+        # Cached responses don't hit the server
+        count = len(requests_seen)
+        changes = client.cache.conn.total_changes
+        client.get_all_makes()
+        assert len(requests_seen) == count
+        assert client.cache.conn.total_changes == changes  # a fresh hit writes nothing
+        print("✓ Responses are served from the on-disk cache")
+
+        # Concurrent fetch with retries on 503
+        models = client.get_models_for_makes(["bmw", "audi", "flaky", "kia", "ford"])
+        assert sorted(models) == ["audi", "bmw", "flaky", "ford", "kia"]
+        assert models["flaky"][0]["Model_Name"] == "flaky-0"
+        print("✓ Concurrent fetch works and retries failed requests")
+
+        # Repeated fetches reuse the pool's threads and their connections
+        for batch in range(10):
+            client.get_models_for_makes([f"make{batch}-{i}" for i in range(4)])
+        assert len(client._connections) <= 4 + 1
+        print("✓ Repeated concurrent fetches don't leak connections")
+
+        # Permanent errors raise ApiError
+        try:
+            client._get_json("/missing")
+            assert False, "404 did not raise"
+        except ApiError:
+            print("✓ HTTP errors raise ApiError")
+        client.close()
+
+        # TTL expiry and LRU eviction
+        client = VpicClient(base_url, cache_path=cache_file, ttl=60, max_cache_entries=2)
+        client.get_models_for_makes(["a", "b", "c"])
+        assert len(client.cache) == 2
+        client.cache.ttl = -1
+        client.cache.set("old", "{}")
+        assert client.cache.get("old") is None
+        print("✓ Cache evicts old and expired entries")
+        client.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+        tmp.cleanup()
+
+    print("✅ All API client tests passed!\n")
+
+
+class FixtureClient:
+    """Stand-in for VpicClient that serves recorded vPIC responses"""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.model_requests = []
+
+    def _load(self, name):
+        import json
+        with open(os.path.join("fixtures", "vpic", name)) as f:
+            return json.load(f)["Results"]
+
+    def get_all_makes(self):
+        return self._load("getallmakes.json")
+
+    def get_models_for_makes(self, make_names):
+        results = {}
+        for name in make_names:
+            if name == self.fail_on:
+                raise ConnectionError(f"network dropped while fetching {name}")
+            self.model_requests.append(name)
+            results[name] = self._load(f"getmodelsformake_{name.lower()}.json")
+        return results
+
+
+def test_catalog():
+    """Test the local makes/models catalog"""
+    print("=" * 50)
+    print("TEST 14: Makes/Models Catalog")
+    print("=" * 50)
+
+    from cars.catalog import Catalog
+
+    test_db = "test_catalog.db"
+    if os.path.exists(test_db):
+        os.remove(test_db)
+
+    catalog = Catalog(test_db)
+    assert catalog.is_empty()
+
+    # A sync interrupted part-way keeps the batches already committed
+    try:
+        catalog.sync(FixtureClient(fail_on="KIA"), batch_size=3)
+        assert False, "sync did not fail"
+    except ConnectionError:
+        pass
+    assert catalog.find_model("tesla", "model s") == "Model S"
+    assert catalog.find_model("honda", "civic") is None
+    print("✓ Interrupted sync keeps completed batches")
+
+    # Resuming only fetches makes that weren't synced yet
+    client = FixtureClient()
+    makes, synced = catalog.sync(client, batch_size=3)
+    assert makes == 10 and synced == 4
+    assert "TESLA" not in client.model_requests and "HONDA" in client.model_requests
+    client = FixtureClient()
+    assert catalog.sync(client) == (10, 0)
+    assert catalog.sync(client, max_age=0)[1] == 10
+    print("✓ Sync is incremental and resumable")
+
+    # Exact, prefix and fuzzy lookups
+    assert catalog.find_make("Mercedes-Benz") == "MERCEDES-BENZ"
+    assert catalog.complete_makes("m") == ["MAZDA", "MERCEDES-BENZ"]
+    assert catalog.complete_models("tesla", "model") == ["Model 3", "Model S", "Model X", "Model Y"]
+    assert catalog.suggest_makes("Hodna") == ["HONDA"]
+    assert catalog.suggest_models("toyota", "Carolla")[0] == "Corolla"
+    print("✓ Exact, prefix and fuzzy lookups work")
+
+    # check() combines them
+    result = catalog.check("toyta", "Camry")
+    assert result["brand"] is None and result["brand_suggestions"] == ["TOYOTA"]
+    result = catalog.check("bmw", "X7")
+    assert result["brand"] == "BMW" and result["model"] is None
+    assert "X5" in result["model_suggestions"]
+    assert catalog.check("Audi", "a4")["model"] == "A4"
+    print("✓ check() validates brand and model")
+
+    catalog.close()
+    os.remove(test_db)
+
+    print("✅ All catalog tests passed!\n")
+
+
+def test_streaming_export():
+    """Test streaming export/import in every format"""
+    print("=" * 50)
+    print("TEST 15: Streaming Export/Import")
+    print("=" * 50)
+
+    from cars.inventory import Inventory
+    from cars.feeds import write_json, iter_file
+    from cars.export import export
+    import gzip
+
+    inv = Inventory()
+    inv.add_car(Car("Honda", "Civic", 2023, 28000.5))
+    inv.add_car(Car("Škoda", "Octavia, Combi", 2021, 22000))
+    inv.add_car(Car("Toyota", "Corolla", 2022, 25000))
+
+    # Every format round-trips, with and without gzip
+    for filename in ("test_export.json", "test_export.ndjson", "test_export.csv",
+                     "test_export.json.gz", "test_export.csv.gz"):
+        inv.save_to_file(filename)
+        loaded = Inventory()
+        loaded.load_from_file(filename)
+        assert [car.get_info() for car in loaded.cars] == [car.get_info() for car in inv.cars]
+        os.remove(filename)
+    print("✓ JSON, NDJSON and CSV round-trip (plain and gzip)")
+
+    # Feeds are read as UTF-8 even where the locale says otherwise
+    import subprocess
+    import sys
+    inv.save_to_file("test_export.csv")
+    result = subprocess.run(
+        [sys.executable, "-c", "from cars.feeds import iter_file; "
+         "print(ascii([car.brand for car in iter_file('test_export.csv')]))"],
+        env=dict(os.environ, LC_ALL="C", PYTHONUTF8="0"), capture_output=True, text=True
+    )
+    assert result.stdout.strip() == ascii(["Honda", "Škoda", "Toyota"]), result.stderr
+    os.remove("test_export.csv")
+    print("✓ Non-ASCII brands round-trip under a non-UTF-8 locale")
+
+    # Compressed files really are gzip
+    write_json(inv.cars, "test_export.json.gz")
+    with gzip.open("test_export.json.gz", "rt") as f:
+        assert f.read().startswith("[\n  {")
+    os.remove("test_export.json.gz")
+    print("✓ .gz files are gzip-compressed")
+
+    # A failed export leaves the previous file untouched
+    inv.save_to_file("test_export.csv")
+
+    def broken_cars():
+        yield Car("Kia", "Rio", 2019, 9000)
+        raise RuntimeError("feed interrupted")
+
+    try:
+        write_json(broken_cars(), "test_export.csv")
+        assert False, "export did not fail"
+    except RuntimeError:
+        pass
+    assert len(list(iter_file("test_export.csv"))) == 3
+    assert not [name for name in os.listdir(".") if name.startswith(".tmp-")]
+    print("✓ Writes are atomic")
+
+    # ...but the file gets the same permissions as a plain open()
+    from cars.feeds import new_file_mode
+    umask = os.umask(0o022)
+    try:
+        inv.save_to_file("test_export.csv")
+        assert os.stat("test_export.csv").st_mode & 0o777 == 0o644
+        os.umask(0o027)
+        assert new_file_mode() == 0o640 and os.umask(0o027) == 0o027  # read, not changed
+    finally:
+        os.umask(umask)
+    os.remove("test_export.csv")
+    print("✓ Exported files follow the umask")
+
+    # Database export streams through iter_cars
+    test_db = "test_export.db"
+    if os.path.exists(test_db):
+        os.remove(test_db)
+    db = CarDatabase(test_db)
+    db.add_cars(inv.cars)
+    db.close()
+    count, _ = export("test_export.ndjson", test_db)
+    assert count == 3 and len(list(iter_file("test_export.ndjson"))) == 3
+    os.remove("test_export.ndjson")
+    os.remove(test_db)
+    try:
+        export("test_export.ndjson", test_db)
+        assert False, "Should raise FileNotFoundError"
+    except FileNotFoundError:
+        assert not os.path.exists(test_db) and not os.path.exists("test_export.ndjson")
+    print("✓ Database export works (and never creates the database)")
+
+    print("✅ All streaming export tests passed!\n")
+
+
+def test_inventory_indexes():
+    """Test indexed Inventory lookups and id-based removal"""
+    print("=" * 50)
+    print("TEST 16: Inventory Indexes")
+    print("=" * 50)
+
+    from cars.inventory import Inventory
+
+    inv = Inventory()
+    ids = [
+        inv.add_car(Car("BMW", "X5", 2019, 60000)),
+        inv.add_car(Car("bmw", "M3", 2023, 80000)),
+        inv.add_car(Car("Audi", "A4", 2019, 40000)),
+        inv.add_car(Car("Toyota", "Camry", 2021, 28000)),
+    ]
+    assert ids == [1, 2, 3, 4]
+    print("✓ add_car() returns stable ids")
+
+    # Hash and range lookups, and their intersection
+    assert [car.model for car in inv.find_by_brand("BMW")] == ["X5", "M3"]
+    assert [car_id for car_id, _ in inv.find(year_range=(2019, 2021))] == [1, 3, 4]
+    assert [car_id for car_id, _ in inv.find(price_range=(None, 40000))] == [3, 4]
+    assert [car_id for car_id, _ in inv.find(brand="bmw", year_range=(2020, None))] == [2]
+    assert inv.find(brand="tesla") == []
+    assert len(inv.find()) == 4
+    print("✓ find() intersects brand, year and price indexes")
+
+    # O(1) removal by id keeps the other ids stable
+    assert inv.remove(1).model == "X5"
+    assert inv.remove(1) is None
+    assert [car_id for car_id, _ in inv.find(year_range=(2019, 2019))] == [3]
+    assert [car.model for car in inv.find_by_brand("bmw")] == ["M3"]
+    inv.remove_car(1)  # positional removal still works
+    assert len(inv) == 2 and inv.get(3).model == "A4"
+    print("✓ Removal by id and by position keep indexes consistent")
+
+    # Price index follows discounts
+    assert inv.apply_discount(50, price_range=(30000, None)) == 1
+    assert [car_id for car_id, _ in inv.find(price_range=(None, 25000))] == [3]
+    inv.get(4).apply_discount(50)
+    inv.reindex()
+    assert [car_id for car_id, _ in inv.find(price_range=(None, 15000))] == [4]
+    print("✓ Price index stays correct after repricing")
+
+    print("✅ All inventory index tests passed!\n")
+
+
+def test_inventory_snapshot():
+    """Test the memory-mapped binary snapshot format"""
+    print("=" * 50)
+    print("TEST 17: Inventory Snapshot")
+    print("=" * 50)
+
+    from cars.inventory import Inventory
+    from cars.snapshot import SnapshotError, convert
+
+    snap_file = "test_inventory.snap"
+    json_file = "test_snapshot.json"
+    db_file = "test_snapshot.db"
+    for f in (snap_file, json_file, db_file):
+        if os.path.exists(f):
+            os.remove(f)
+
+    inv = Inventory()
+    inv.add_car(Car("BMW", "X5", 2019, 60000.5))
+    inv.add_car(Car("Škoda", "Octavia", 2021, 25000))
+    inv.add_car(Car("BMW", "M3", 2023, 80000))
+    inv.remove(1)
+    inv.save_snapshot(snap_file)
+
+    # Zero-copy columns, lazy rows, ids preserved
+    with Inventory.open_snapshot(snap_file) as snap:
+        assert len(snap) == 2
+        assert list(snap.years) == [2021, 2023]
+        assert list(snap.prices) == [25000.0, 80000.0]
+        assert snap[0][0] == 2 and snap[0][1].brand == "Škoda"
+        assert [(car_id, car.model) for car_id, car in snap] == [(2, "Octavia"), (3, "M3")]
+        assert snap.to_batch().to_list()[1][1].model == "M3"
+    print("✓ open_snapshot() maps columns and builds Cars lazily")
+
+    loaded = Inventory()
+    loaded.load_snapshot(snap_file)
+    assert [car_id for car_id, _ in loaded.find(brand="bmw")] == [3]
+    assert loaded.add_car(Car("Audi", "A4", 2020, 30000)) == 4
+
+    # Reusing the id of a removed car leaves no stale index entries
+    three = Inventory()
+    for model in ("Rio", "Soul", "Ceed"):
+        three.add_car(Car("Kia", model, 2020, 9000))
+    three.save_snapshot(snap_file)
+    target = Inventory()
+    for model in ("A3", "A4", "A6"):
+        target.add_car(Car("Audi", model, 2021, 30000))
+    target.remove(2)
+    target.load_snapshot(snap_file)
+    assert [car_id for car_id, _ in target.find(year_range=(2000, 2030))] == [1, 2, 3, 4, 5]
+    assert [car.model for _, car in target.find(year_range=(2021, 2021))] == ["A3", "A6"]
+    print("✓ load_snapshot() restores ids and indexes")
+
+    # Converters from a JSON feed and from a database
+    inv.save_to_file(json_file)
+    assert convert(json_file, snap_file) == 2
+    with Inventory.open_snapshot(snap_file) as snap:
+        assert [car.model for _, car in snap] == ["Octavia", "M3"]
+    db = CarDatabase(db_file)
+    db.add_car(Car("Ford", "Focus", 2015, 9000))
+    db.close()
+    assert convert(db_file, snap_file) == 1
+    with Inventory.open_snapshot(snap_file) as snap:
+        assert snap[0][1].brand == "Ford" and snap.years[0] == 2015
+    print("✓ Converts JSON feeds and car databases")
+
+    # Sources are opened read-only: nothing is created or migrated
+    import sqlite3
+    try:
+        convert("test_missing.db", snap_file)
+        assert False, "Should raise FileNotFoundError"
+    except FileNotFoundError:
+        assert not os.path.exists("test_missing.db")
+    foreign = sqlite3.connect(db_file)
+    foreign.execute("DROP TABLE cars")
+    foreign.commit()
+    tables = foreign.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+    foreign.close()
+    try:
+        convert(db_file, snap_file)
+        assert False, "Should raise ValueError"
+    except ValueError:
+        pass
+    foreign = sqlite3.connect(db_file)
+    assert foreign.execute("SELECT COUNT(*) FROM sqlite_master").fetchone() == tables
+    foreign.close()
+    print("✓ Missing and foreign databases are rejected untouched")
+
+    # Corruption is detected by the header checks and checksum
+    with open(snap_file, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+    try:
+        Inventory.open_snapshot(snap_file)
+        assert False, "Should raise SnapshotError"
+    except SnapshotError:
+        pass
+    inv.save_snapshot(snap_file)
+    with open(snap_file, "rb") as f:
+        data = f.read()
+    for content, verify in ((b"not a snapshot" * 10, True), (b"", True), (data[:100], True),
+                            (data[:-8], False)):
+        with open(snap_file, "wb") as f:
+            f.write(content)
+        try:
+            Inventory.open_snapshot(snap_file, verify=verify)
+            assert False, "Should raise SnapshotError"
+        except SnapshotError:
+            pass
+    print("✓ Rejects corrupt, foreign, empty and truncated files")
+
+    umask = os.umask(0o022)
+    try:
+        inv.save_snapshot(snap_file)
+        assert os.stat(snap_file).st_mode & 0o777 == 0o644
+    finally:
+        os.umask(umask)
+    print("✓ Snapshot files follow the umask")
+
+    for f in (snap_file, json_file, db_file):
+        if os.path.exists(f):
+            os.remove(f)
+    print("✅ All snapshot tests passed!\n")
+
+
+def test_async_database():
+    """Test AsyncCarDatabase reads, batched writes and error isolation"""
+    print("=" * 50)
+    print("TEST 18: Async Database")
+    print("=" * 50)
+
+    import asyncio
+    from cars.aio import AsyncCarDatabase
+    from cars.database import StaleCarError
+
+    test_db = "test_async.db"
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(test_db + suffix):
+            os.remove(test_db + suffix)
+
+    async def scenario():
+        async with AsyncCarDatabase(test_db, readers=2) as db:
+            # Writes issued together are committed as one batch
+            ids = await asyncio.gather(*(
+                db.add_car(Car("BMW", f"M{i}", 2000 + i, 1000.0 * (i + 1))) for i in range(20)
+            ))
+            assert ids == list(range(1, 21))
+            assert db.stats()["batches"] == 1 and db.stats()["largest_batch"] == 20
+            print("✓ Concurrent add_car() calls share one transaction")
+
+            # A failing write only fails its own caller
+            results = await asyncio.gather(
+                db.update_car(1, expected_version=7, price=1.0),
+                db.update_car(2, price=5.0),
+                db.delete_car(3),
+                db.delete_car(999),
+                db.apply_changes(delete=[4, 999]),
+                return_exceptions=True
+            )
+            assert isinstance(results[0], StaleCarError)
+            assert results[1:4] == [True, True, False]
+            assert isinstance(results[4], LookupError)
+            assert (await db.get_car(2)).price == 5.0
+            assert await db.get_car(3) is None
+            assert await db.get_car(4) is not None  # apply_changes rolled back
+            print("✓ Errors are isolated per write")
+
+            # Reads run on reader threads with their own connections
+            assert len(await db.get_all_cars()) == 19
+            assert [row[0] for row in await db.select_rows(["id"], limit=3)] == [1, 2, 4]
+            assert [car.year for _, car in await db.query(year_range=(2018, None))] == [2018, 2019]
+            assert (await db.get_stats())["total_cars"] == 19
+            print("✓ Reads see committed writes")
+
+            pending = asyncio.ensure_future(db.add_car(Car("Audi", "A4", 2020, 30000)))
+            await asyncio.sleep(0)
+            await db.flush()
+            await asyncio.sleep(0)
+            assert pending.done() and pending.result() == 21
+        print("✓ flush()/close() commit queued writes")
+
+    asyncio.run(scenario())
+    db = CarDatabase(test_db)
+    assert db.get_stats()["total_cars"] == 20
+    db.close()
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(test_db + suffix):
+            os.remove(test_db + suffix)
+    print("✅ All async database tests passed!\n")
+
+
+def test_write_behind():
+    """Test the write-behind batching queue"""
+    print("=" * 50)
+    print("TEST 19: Write-Behind Queue")
+    print("=" * 50)
+
+    import threading
+    from cars.database import StaleCarError
+    from cars.writebehind import WriteBehindQueue, WriteQueueFullError
+
+    test_db = "test_write_behind.db"
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(test_db + suffix):
+            os.remove(test_db + suffix)
+
+    # Writes from several threads are grouped into a few transactions
+    writes = WriteBehindQueue(test_db, max_batch=50, max_delay_ms=50)
+    futures = []
+    lock = threading.Lock()
+
+    def feed(dealer):
+        for i in range(25):
+            future = writes.add_car(Car(f"Dealer{dealer}", f"M{i}", 2020, 1000.0 + i))
+            with lock:
+                futures.append(future)
+
+    threads = [threading.Thread(target=feed, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ids = sorted(future.result(5) for future in futures)
+    assert ids == list(range(1, 101))
+    stats = writes.stats()
+    assert stats["writes"] == 100 and stats["batches"] < 100
+    print(f"✓ 100 inserts committed in {stats['batches']} transactions")
+
+    # Updates, deletes and failures resolve their own futures
+    stale = writes.update_car(1, expected_version=9, price=1.0)
+    updated = writes.update_car(2, price=5.0)
+    deleted = writes.delete_car(3)
+    missing = writes.delete_car(999)
+    writes.flush()
+    assert isinstance(stale.exception(), StaleCarError)
+    assert updated.result() is True and deleted.result() is True and missing.result() is False
+    print("✓ A failing write does not affect the rest of its batch")
+
+    # close() commits what is still queued
+    last = writes.add_car(Car("Audi", "A4", 2021, 30000))
+    writes.close()
+    assert last.result(0) == 101
+    try:
+        writes.add_car(Car("Audi", "A6", 2021, 50000))
+        assert False, "Should raise RuntimeError"
+    except RuntimeError:
+        pass
+    db = CarDatabase(test_db)
+    assert db.get_stats()["total_cars"] == 100
+    assert db.get_car(2).price == 5.0
+    db.close()
+    print("✓ close() flushes pending writes")
+
+    # A write that passed the closed check just as close() ran is failed,
+    # not left pending forever
+    from concurrent.futures import Future
+    late = Future()
+    writes._put(('_insert', (Car("Audi", "A8", 2021, 90000),), late), None)
+    assert isinstance(late.exception(0), RuntimeError)
+    writes.flush()  # returns at once after close()
+    print("✓ Writes racing close() fail their futures")
+
+    # Backpressure: while another connection holds the write lock, the
+    # writer stalls and a full queue rejects writes after put_timeout
+    import sqlite3
+    import time
+    writes = WriteBehindQueue(test_db, max_delay_ms=0, max_queue=1, put_timeout=0.05)
+    blocker = sqlite3.connect(test_db)
+    blocker.execute("BEGIN IMMEDIATE")
+    first = writes.add_car(Car("Kia", "Rio", 2019, 9000))
+    time.sleep(0.1)  # the writer is now waiting for the lock
+    second = writes.add_car(Car("Kia", "Soul", 2019, 9500))
+    try:
+        writes.add_car(Car("Kia", "Ceed", 2019, 9900))
+        assert False, "Should raise WriteQueueFullError"
+    except WriteQueueFullError:
+        pass
+    blocker.rollback()
+    blocker.close()
+    writes.close()
+    assert (first.result(0), second.result(0)) == (102, 103)
+    assert writes.stats()["rejected"] == 1
+    print("✓ Full queue raises WriteQueueFullError")
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(test_db + suffix):
+            os.remove(test_db + suffix)
+    print("✅ All write-behind tests passed!\n")
+
+
+def test_metrics():
+    """Test query instrumentation, slow-query log and Prometheus output"""
+    print("=" * 50)
+    print("TEST 20: Metrics")
+    print("=" * 50)
+
+    import sqlite3
+    from cars import metrics
+
+    test_db = "test_metrics.db"
+    if os.path.exists(test_db):
+        os.remove(test_db)
+
+    # Disabled: plain sqlite3 cursors, nothing recorded
+    metrics.reset()
+    db = CarDatabase(test_db)
+    assert type(db.cursor) is sqlite3.Cursor
+    db.get_all_cars()
+    db.close()
+    assert metrics.query_stats() == {}
+    print("✓ Disabled instrumentation leaves the cursor untouched")
+
+    metrics.enable(slow_ms=0)
+    try:
+        db = CarDatabase(test_db)
+        db.add_cars(Car("BMW", f"M{i}", 2000 + i, 1000.0 * i) for i in range(10))
+        assert len(db.get_all_cars()) == 10
+        assert len(list(db.select_rows(["id"], limit=4))) == 4
+        db.close()
+
+        stats = metrics.query_stats()
+        select_all = stats["SELECT id, brand, model, year, price FROM cars"]
+        assert select_all["calls"] == 1 and select_all["rows"] == 10 and select_all["seconds"] > 0
+        insert = [values for sql, values in stats.items() if sql.startswith("INSERT INTO cars ")][0]
+        assert insert["rows"] == 10
+        assert any(values["rows"] == 4 for sql, values in stats.items() if "LIMIT" in sql)
+        print("✓ Per-statement calls, time and rows are recorded")
+
+        assert any(entry["sql"].startswith("SELECT id, brand") for entry in metrics.slow_queries())
+        print("✓ Queries over the threshold go to the slow-query log")
+
+        metrics.observe("cars_test_seconds", 0.003, route="/x")
+        metrics.observe("cars_test_seconds", 20, route="/x")
+        assert metrics.histogram("cars_test_seconds", route="/x").quantile(0.5) == 0.005
+        text = metrics.render_prometheus()
+        assert 'cars_db_queries_total{sql="SELECT id, brand, model, year, price FROM cars"} 1' in text
+        assert 'cars_test_seconds_bucket{route="/x",le="0.005"} 1' in text
+        assert 'cars_test_seconds_bucket{route="/x",le="+Inf"} 2' in text
+        assert 'cars_test_seconds_count{route="/x"} 2' in text
+        print("✓ Histograms render in Prometheus text format")
+    finally:
+        metrics.disable()
+        metrics.reset()
+
+    if os.path.exists(test_db):
+        os.remove(test_db)
+    print("✅ All metrics tests passed!\n")
+
+
+def test_read_replica():
+    """Test publishing read-only replicas and swapping generations"""
+    print("=" * 50)
+    print("TEST 21: Read Replica")
+    print("=" * 50)
+
+    import shutil
+    import sqlite3
+    from cars.replica import ReplicaError, ReplicaReader, current_name, publish
+
+    test_db = "test_replica.db"
+    replica_dir = "test_replica"
+    shutil.rmtree(replica_dir, ignore_errors=True)
+    if os.path.exists(test_db):
+        os.remove(test_db)
+
+    db = CarDatabase(test_db)
+    db.enable_wal()
+    db.add_car(Car("BMW", "X5", 2022, 65000))
+
+    reader = ReplicaReader(replica_dir, check_interval=0)
+    try:
+        reader.connection()
+        assert False, "Should raise ReplicaError"
+    except ReplicaError:
+        pass
+
+    first = publish(test_db, replica_dir)
+    assert first and os.path.basename(first) == current_name(replica_dir)
+    assert publish(test_db, replica_dir) is None  # unchanged
+    replica = reader.connection()
+    assert [car.model for _, car in replica.get_all_cars()] == ["X5"]
+    assert replica.search("x5")[0][1].brand == "BMW"
+    try:
+        replica.cursor.execute("DELETE FROM cars")
+        assert False, "Replica should be read-only"
+    except sqlite3.OperationalError:
+        pass
+    print("✓ Published snapshot opens read-only and immutable")
+
+    # Writes on the primary only show up after the next publish
+    db.add_car(Car("Audi", "A4", 2021, 45000))
+    assert len(reader.connection().get_all_cars()) == 1
+    publish(test_db, replica_dir)
+    assert len(reader.connection().get_all_cars()) == 2
+    assert reader.swaps == 1
+    print("✓ Readers swap to the new generation")
+
+    for year in range(2000, 2004):
+        db.add_car(Car("Kia", "Rio", year, 9000))
+        publish(test_db, replica_dir, keep=2)
+    files = [name for name in os.listdir(replica_dir) if name.endswith(".db")]
+    assert len(files) == 2 and current_name(replica_dir) in files
+    assert len(reader.connection().get_all_cars()) == 6
+    print("✓ Old generations are pruned")
+
+    reader.close()
+    db.close()
+    shutil.rmtree(replica_dir, ignore_errors=True)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(test_db + suffix):
+            os.remove(test_db + suffix)
+    print("✅ All read replica tests passed!\n")
+
+
+def test_analytics():
+    """Test the parallel inventory reports"""
+    print("=" * 50)
+    print("TEST 22: Analytics Reports")
+    print("=" * 50)
+
+    from datetime import datetime
+    from cars import analytics
+
+    test_db = "test_analytics.db"
+    if os.path.exists(test_db):
+        os.remove(test_db)
+    this_year = datetime.now().year
+    db = CarDatabase(test_db)
+    db.add_cars([Car("Toyota", "Camry", this_year, 30000 + i * 100) for i in range(100)])
+    db.add_cars([Car("Toyota", "Corolla", this_year - 5, 15000)] * 50)
+    db.add_cars([Car("Ford", "Mustang", this_year - 40, 60000)] * 10)
+    db.close()
+
+    reports = analytics.run_reports(test_db, workers=1)
+    assert reports['total_cars'] == 160
+    toyota, ford = reports['by_brand']
+    assert toyota['brand'] == "Toyota" and toyota['cars'] == 150
+    assert toyota['total_value'] == sum(30000 + i * 100 for i in range(100)) + 50 * 15000
+    assert ford['min_price'] == ford['max_price'] == 60000
+    print("✓ Value by brand")
+
+    newest = [row for row in reports['price_percentiles'] if row['year'] == this_year][0]
+    assert abs(newest['p50'] - 34900) / 34900 <= analytics.PERCENTILE_ACCURACY
+    assert abs(newest['p90'] - 38900) / 38900 <= analytics.PERCENTILE_ACCURACY
+    print("✓ Price percentiles per year within the sketch accuracy")
+
+    ages = [point['age'] for point in reports['depreciation']]
+    assert ages == [0, 5, 40]
+    assert reports['depreciation'][1]['retained'] == 15000 / 34950
+    assert reports['vintage'] == {'cars': 10, 'share': 10 / 160}
+    assert ford['vintage_share'] == 1.0 and toyota['vintage'] == 0
+    print("✓ Depreciation by age and vintage share")
+
+    # Many small id ranges over a process pool give the same answer
+    min_chunk = analytics.MIN_CHUNK_IDS
+    analytics.MIN_CHUNK_IDS = 10
+    try:
+        assert len(analytics.split_ids((1, 160), 2)) == 8
+        parallel = analytics.run_reports(test_db, workers=2)
+    finally:
+        analytics.MIN_CHUNK_IDS = min_chunk
+    for key in ('by_brand', 'price_percentiles', 'depreciation', 'vintage'):
+        assert parallel[key] == reports[key], key
+    print("✓ Process pool results match a single pass")
+
+    # Empty inventories and a newest cohort averaging $0 still print
+    import io
+    from contextlib import redirect_stdout
+    os.remove(test_db)
+    CarDatabase(test_db).close()
+    output = io.StringIO()
+    with redirect_stdout(output):
+        analytics.print_reports(analytics.run_reports(test_db, workers=1))
+    assert output.getvalue().startswith("0 cars worth $0.00")
+    db = CarDatabase(test_db)
+    db.add_cars([Car("Kia", "Rio", this_year, 0), Car("Kia", "Rio", this_year - 10, 5000)])
+    db.close()
+    reports = analytics.run_reports(test_db, workers=1)
+    assert [point['retained'] for point in reports['depreciation']] == [None, None]
+    output = io.StringIO()
+    with redirect_stdout(output):
+        analytics.print_reports(reports)
+    assert "n/a" in output.getvalue()
+    print("✓ Empty and zero-priced cohorts print without errors")
+
+    os.remove(test_db)
+    print("✅ All analytics tests passed!\n")
+
+
+def test_change_history():
+    """Test the car_events log, as-of queries and compaction"""
+    print("=" * 50)
+    print("TEST 23: Change History")
+    print("=" * 50)
+
+    import sqlite3
+    import time
+
+    test_db = "test_history.db"
+    if os.path.exists(test_db):
+        os.remove(test_db)
+
+    # Cars that predate the log are backfilled as inserted at ts 0
+    conn = sqlite3.connect(test_db)
+    conn.execute("CREATE TABLE cars (id INTEGER PRIMARY KEY AUTOINCREMENT, brand TEXT NOT NULL, "
+                 "model TEXT NOT NULL, year INTEGER NOT NULL, price REAL NOT NULL)")
+    conn.execute("INSERT INTO cars (brand, model, year, price) VALUES ('Ford', 'Focus', 2015, 9000)")
+    conn.commit()
+    conn.close()
+    db = CarDatabase(test_db)
+    assert db.get_price_history(1) == [(0, 9000)]
+    print("✓ Existing cars are backfilled")
+
+    def tick():
+        # Let the clock move past the last logged event
+        time.sleep(0.01)
+        stamp = time.time()
+        time.sleep(0.01)
+        return stamp
+
+    db.add_car(Car("Toyota", "Camry", 2022, 25000))
+    before_edit = tick()
+    db.update_car(2, price=24000)
+    db.update_car(2, model="Camry")  # no change, nothing logged
+    db.apply_discount(10, brand="Toyota")
+    before_delete = tick()
+    db.delete_car(1)
+    db.cursor.execute("UPDATE cars SET price = 1 WHERE id = 2")
+    db.conn.rollback()  # rolled back with its transaction
+
+    history = db.get_car_history(2)
+    assert [event['kind'] for event in history] == ['insert', 'update', 'update']
+    assert [price for _, price in db.get_price_history(2)] == [25000, 24000, 21600]
+    assert db.get_price_history(1)[-1][1] is None
+    print("✓ Every add/update/delete is logged in its transaction")
+
+    as_of = db.inventory_as_of(before_edit)
+    assert [(car_id, car.price) for car_id, car in as_of] == [(1, 9000), (2, 25000)]
+    as_of = db.inventory_as_of(before_delete)
+    assert [(car_id, car.price) for car_id, car in as_of] == [(1, 9000), (2, 21600)]
+    assert [car_id for car_id, _ in db.inventory_as_of(time.time())] == [2]
+    assert db.inventory_as_of(-1) == []
+    print("✓ Inventory as of a past time")
+
+    # Compaction: as-of results are unchanged, only later events replay
+    snapshot = db.compact_events()
+    assert snapshot is not None and db.compact_events() is None
+    db.add_car(Car("Kia", "Rio", 2020, 9000))
+    after_compact = tick()
+    db.update_car(3, price=8000)
+    assert [(car_id, car.price) for car_id, car in db.inventory_as_of(after_compact)] == [(2, 21600), (3, 9000)]
+    assert [car_id for car_id, _ in db.inventory_as_of(before_delete)] == [1, 2]
+    db.compact_events(keep=1)
+    db.cursor.execute("SELECT COUNT(*) FROM car_event_snapshots")
+    assert db.cursor.fetchone()[0] == 1
+    assert [car_id for car_id, _ in db.inventory_as_of(before_edit)] == [1, 2]
+    assert [car.price for _, car in db.inventory_as_of(time.time())] == [21600, 8000]
+    print("✓ Compacted snapshots give the same answers")
+
+    db.close()
+    os.remove(test_db)
+    print("✅ All change history tests passed!\n")
+
+
+def test_startup():
+    """Test lazy package imports, the startup budget and the non-interactive CLI"""
+    print("=" * 50)
+    print("TEST 24: Startup and CLI")
+    print("=" * 50)
+
+    import io
+    import json
+    import subprocess
+    import sys
+    from contextlib import redirect_stdout
+    from cars import cli
+
+    def import_time(module):
+        # Cumulative ms per module from a fresh `python -X importtime`
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                capture_output=True, text=True, check=True)
+        loaded = {}
+        for line in result.stderr.splitlines():
+            fields = line[len("import time:"):].split("|")
+            if len(fields) == 3 and fields[1].strip().isdigit():
+                loaded[fields[2].strip()] = int(fields[1]) / 1000
+        return loaded
+
+    loaded = import_time("cars")
+    assert "cars.database" not in loaded and "sqlite3" not in loaded
+    loaded = import_time("cars.car")
+    assert "cars.database" not in loaded and "json" not in loaded
+    import cars
+    assert cars.CarDatabase is CarDatabase and "Inventory" in dir(cars)
+    print("✓ The package loads its modules on first use")
+
+    # Generous budgets: catch Flask, sqlite3 or the whole package sneaking back in
+    for module in ("cars.cli", "main"):
+        loaded = min((import_time(module) for _ in range(3)), key=lambda times: times[module])
+        assert not {"flask", "sqlite3", "cars.database", "cars.catalog", "cars.inventory"} & set(loaded)
+        assert loaded[module] < 100, (module, loaded[module])
+        print(f"✓ {module} imports in {loaded[module]:.1f} ms")
+
+    test_db = "test_startup.db"
+    if os.path.exists(test_db):
+        os.remove(test_db)
+
+    def run(*argv):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            status = cli.main(["--db", test_db, *argv])
+        return status, output.getvalue()
+
+    assert run("add", "Toyota", "Camry", "2020", "25000")[0] == 0
+    run("add", "Honda", "Civic", "2019", "18000")
+    run("add", "Ford", "Focus", "2020", "15000")
+    status, output = run("list", "--year", "2020", "--sort", "price", "--json")
+    assert status == 0
+    assert [car["model"] for car in json.loads(output)] == ["Focus", "Camry"]
+    assert json.loads(run("list", "--max-price", "10000", "--json")[1]) == []
+    assert "ID 2: 2019 Honda Civic" in run("search", "civic")[1]
+    assert json.loads(run("stats", "--json")[1])["total_cars"] == 3
+    print("✓ list, search, add and stats commands")
+
+    assert run("delete", "2")[0] == 0
+    assert run("delete", "2")[0] == 1
+    assert [car["id"] for car in json.loads(run("list", "--json")[1])] == [1, 3]
+    print("✓ delete reports a missing ID with exit status 1")
+
+    # --profile is a flag, so a following command is still a command
+    import main
+    from cars import metrics
+    db_name, main.DB_NAME = main.DB_NAME, test_db
+    output = io.StringIO()
+    try:
+        with redirect_stdout(output):
+            assert main.main(["--profile", "stats"]) == 0
+    finally:
+        main.DB_NAME = db_name
+        metrics.disable()
+        metrics.reset()
+    assert "Total cars: 2" in output.getvalue() and "Profile (top 20" in output.getvalue()
+    print("✓ --profile runs the given command under the profiler")
+
+    os.remove(test_db)
+    print("✅ All startup tests passed!\n")
+
+
 def run_all_tests():
     """Run all tests"""
     print("\n" + "=" * 50)
@@ -235,7 +1654,44 @@ def run_all_tests():
         test_inventory_json()
         test_api()
         test_edge_cases()
-        
+        test_query_filters()
+
+        test_inventory_stats()
+
+        test_bulk_ingest()
+
+        test_full_text_search()
+
+        test_update_car()
+
+        test_car_batch()
+
+        test_bulk_discount()
+
+        test_api_client()
+
+        test_catalog()
+
+        test_streaming_export()
+
+        test_inventory_indexes()
+
+        test_inventory_snapshot()
+
+        test_async_database()
+
+        test_write_behind()
+
+        test_metrics()
+
+        test_read_replica()
+
+        test_analytics()
+
+        test_change_history()
+
+        test_startup()
+
         print("=" * 50)
         print("🎉 ALL TESTS PASSED SUCCESSFULLY!")
         print("=" * 50)